@@ -0,0 +1,153 @@
+# admission.py
+"""
+Admission control untuk /ask agar beban berlebih ditolak lebih awal, bukan menumpuk
+sampai timeout frontend (90 detik) lalu di-retry pengguna.
+
+- Maksimal ADMISSION_MAX_IN_FLIGHT request diproses bersamaan; sisanya menunggu di
+  antrean berukuran ADMISSION_MAX_QUEUE.
+- Sadar waktu antre: perkiraan waktu tunggu dihitung dari posisi antrean dan rata-rata
+  durasi request (EWMA). Jika perkiraan atau waktu tunggu nyata melewati
+  ADMISSION_MAX_QUEUE_WAIT, request ditolak 503 dengan Retry-After.
+- Adil per klien: satu klien maksimal ADMISSION_PER_CLIENT request (diproses + antre),
+  kelebihannya ditolak 429. Saat slot kosong, klien dengan request aktif paling sedikit
+  didahulukan.
+"""
+import itertools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    from metrics import ADMISSION_QUEUE_WAIT, ADMISSION_QUEUED, ADMISSION_REJECTIONS
+except ImportError:  # diimpor sebagai Backend.admission dari root proyek
+    from Backend.metrics import ADMISSION_QUEUE_WAIT, ADMISSION_QUEUED, ADMISSION_REJECTIONS
+
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "8"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "24"))
+ADMISSION_MAX_QUEUE_WAIT = float(os.getenv("ADMISSION_MAX_QUEUE_WAIT", "20"))
+ADMISSION_PER_CLIENT = int(os.getenv("ADMISSION_PER_CLIENT", "2"))
+
+# Bobot sampel terbaru untuk rata-rata durasi request
+SERVICE_TIME_ALPHA = 0.2
+INITIAL_SERVICE_TIME = 5.0
+
+
+class Rejected(Exception):
+    """Request ditolak admission control; diubah menjadi response 429/503 oleh main.py."""
+
+    def __init__(self, status_code, reason, retry_after):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+        ADMISSION_REJECTIONS.labels(reason).inc()
+
+
+class _Ticket:
+    __slots__ = ("seq", "client", "admitted")
+
+    def __init__(self, seq, client):
+        self.seq = seq
+        self.client = client
+        self.admitted = False
+
+
+class AdmissionController:
+    def __init__(self, max_in_flight=ADMISSION_MAX_IN_FLIGHT, max_queue=ADMISSION_MAX_QUEUE,
+                 max_queue_wait=ADMISSION_MAX_QUEUE_WAIT, per_client=ADMISSION_PER_CLIENT):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_queue_wait = max_queue_wait
+        self.per_client = per_client
+        self.service_time = INITIAL_SERVICE_TIME
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting = []
+        self._per_client = {}
+        self._seq = itertools.count()
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    @property
+    def queued(self):
+        return len(self._waiting)
+
+    def _estimated_wait(self, position):
+        return (position + 1) * self.service_time / self.max_in_flight
+
+    def _admit_waiting(self):
+        # Pilih klien dengan request aktif paling sedikit, lalu yang paling lama menunggu
+        while self._waiting and self._in_flight < self.max_in_flight:
+            ticket = min(self._waiting, key=lambda t: (self._per_client.get(t.client, 0), t.seq))
+            self._waiting.remove(ticket)
+            ticket.admitted = True
+            self._in_flight += 1
+        ADMISSION_QUEUED.set(len(self._waiting))
+        self._cond.notify_all()
+
+    def _acquire(self, client):
+        with self._cond:
+            if self._per_client.get(client, 0) >= self.per_client:
+                raise Rejected(429, "client_limit", self.service_time)
+
+            if self._in_flight < self.max_in_flight and not self._waiting:
+                self._in_flight += 1
+                self._per_client[client] = self._per_client.get(client, 0) + 1
+                return 0.0
+
+            if len(self._waiting) >= self.max_queue:
+                raise Rejected(503, "queue_full", self._estimated_wait(len(self._waiting)))
+            estimate = self._estimated_wait(len(self._waiting))
+            if estimate > self.max_queue_wait:
+                raise Rejected(503, "queue_wait", estimate)
+
+            ticket = _Ticket(next(self._seq), client)
+            self._waiting.append(ticket)
+            ADMISSION_QUEUED.set(len(self._waiting))
+            self._per_client[client] = self._per_client.get(client, 0) + 1
+            started = time.monotonic()
+            deadline = started + self.max_queue_wait
+            while not ticket.admitted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(ticket)
+                    ADMISSION_QUEUED.set(len(self._waiting))
+                    self._release_client(client)
+                    raise Rejected(503, "queue_timeout", self._estimated_wait(len(self._waiting)))
+                self._cond.wait(remaining)
+            return time.monotonic() - started
+
+    def _release_client(self, client):
+        remaining = self._per_client.get(client, 0) - 1
+        if remaining > 0:
+            self._per_client[client] = remaining
+        else:
+            self._per_client.pop(client, None)
+
+    def _release(self, client, service_seconds):
+        with self._cond:
+            self._in_flight -= 1
+            self._release_client(client)
+            self.service_time += SERVICE_TIME_ALPHA * (service_seconds - self.service_time)
+            self._admit_waiting()
+
+    @contextmanager
+    def slot(self, client):
+        """
+        Menunggu giliran untuk `client` lalu menjalankan isi blok.
+        Menghasilkan lama waktu antre (detik); melempar Rejected jika beban berlebih.
+        """
+        queue_seconds = self._acquire(client)
+        ADMISSION_QUEUE_WAIT.observe(queue_seconds)
+        started = time.monotonic()
+        try:
+            yield queue_seconds
+        finally:
+            self._release(client, time.monotonic() - started)
+
+
+admission = AdmissionController()
@@ -1,6 +1,13 @@
 # Di bagian atas file, pastikan ada baris ini
 import os
-from neo4j import GraphDatabase
+import threading
+
+try:
+    from replay import wrap_driver
+    from tracing import trace_driver
+except ImportError:  # diimpor sebagai Backend.config dari root proyek
+    from Backend.replay import wrap_driver
+    from Backend.tracing import trace_driver
 
 # --- KONFIGURASI NEO4J (CARA YANG BENAR UNTUK DOCKER) ---
 # Ambil detail koneksi dari environment variable yang diatur oleh Docker Compose.
@@ -8,19 +15,59 @@ from neo4j import GraphDatabase
 NEO4J_URI = os.getenv("NEO4J_URI", "neo4j://localhost:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "12345678")
+# Database (atau alias) yang dibaca backend. Untuk blue/green ini adalah alias yang dialihkan
+# secara atomik ke build korpus baru (lihat process_data/versions.py); kosong = database default.
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE") or None
+# Jumlah proses worker (gunicorn memakai WEB_CONCURRENCY yang sama, lihat gunicorn.conf.py)
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+# Total koneksi Neo4j untuk semua worker; setiap worker mendapat bagian yang sama agar
+# N worker tidak menghabiskan koneksi server. NEO4J_MAX_POOL_SIZE menimpa pembagian ini.
+NEO4J_TOTAL_CONNECTIONS = int(os.getenv("NEO4J_TOTAL_CONNECTIONS", "100"))
+# Ukuran connection pool driver per proses (default driver Neo4j: 100), diekspos juga di /metrics
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE") or max(1, NEO4J_TOTAL_CONNECTIONS // WEB_CONCURRENCY))
 
 # --- Konfigurasi index embedding (tidak perlu diubah) ---
 INDEX_NAME = "ayat_embeddings"
-DIMENSION = 3584
+# Harus sama dengan dimensi model embedder (gte-qwen2-7b-instruct: 3584), lihat groq_embedder.py
+DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "3584"))
 LABEL = "Tafsir"
 EMBEDDING_PROPERTY = "embedding"
 
 # --- Koneksi ke Neo4j (menggunakan variabel yang sudah benar) ---
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+# Driver dibuat saat pertama kali dipakai (get_driver), bukan saat config diimpor,
+# sehingga impor modul tetap cepat dan tidak gagal walau Neo4j belum hidup.
+# Dalam mode fixture (lihat replay.py) driver direkam atau diganti replay tanpa koneksi.
+# Jika TRACE_EXPORTER aktif (lihat tracing.py) setiap query Cypher dicatat sebagai span.
+_driver = None
+_driver_lock = threading.Lock()
+
+def _create_neo4j_driver():
+    from neo4j import GraphDatabase
+    return GraphDatabase.driver(
+        NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD), max_connection_pool_size=NEO4J_MAX_POOL_SIZE
+    )
+
+def get_driver():
+    global _driver
+    if _driver is None:
+        with _driver_lock:
+            if _driver is None:
+                _driver = trace_driver(wrap_driver(_create_neo4j_driver))
+    return _driver
+
+def __getattr__(name):
+    # Kompatibilitas untuk skrip lama: `from config import driver` tetap bekerja
+    if name == "driver":
+        return get_driver()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # --- Konfigurasi lain (tidak perlu diubah) ---
 DIMENSION_STRUCTURAL = 128
 # PERINGATAN KEAMANAN: Jangan pernah menaruh API Key langsung di kode seperti ini.
 # Gunakan environment variable seperti pada konfigurasi Neo4j.
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_MODEL = "llama-3.3-70b-versatile"
\ No newline at end of file
+GROQ_MODEL = "llama-3.3-70b-versatile"
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+
+# --- Anggaran token untuk konteks retrieval di dalam prompt ---
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
@@ -2,9 +2,15 @@
 """
 Unified entry for the answer generation pipeline.
 """
+import logging
+
 from generation.prompt_builder import build_prompt
 from generation.groq_client import call_groq_api
 from config import GROQ_API_KEY, GROQ_MODEL
+from token_count import estimate_tokens
+from tracing import span
+
+logger = logging.getLogger(__name__)
 
 def generate_answer(query_text, context, history=None):
     """
@@ -12,11 +18,17 @@ def generate_answer(query_text, context, history=None):
 
     Args:
         query_text (str): The user's question.
-        context (str): Retrieved chunk context.
+        context (str | ContextBundle): Retrieved chunk context.
         history (list): Optional list of previous (question, answer) pairs.
 
     Returns:
         str: Generated answer.
     """
-    prompt = build_prompt(query_text, context, history or [])
-    return call_groq_api(prompt)
+    with span("prompt_build", history_turns=len(history or [])) as s:
+        prompt = build_prompt(query_text, context, history or [])
+        context_tokens = context.tokens if hasattr(context, "tokens") else estimate_tokens(context)
+        prompt_tokens = estimate_tokens(prompt)
+        s.set_attributes(prompt_tokens=prompt_tokens, context_tokens=context_tokens)
+    logger.info("Prompt ke Groq: ~%d token (konteks ~%d token)", prompt_tokens, context_tokens)
+    with span("generation"):
+        return call_groq_api(prompt)
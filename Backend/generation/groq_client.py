@@ -2,8 +2,13 @@
 """
 Send completion request to Groq's LLM API using config values.
 """
-import requests
-from config import GROQ_API_KEY, GROQ_MODEL
+import logging
+
+from config import GROQ_API_KEY, GROQ_MODEL, GROQ_API_URL
+from tracing import span
+from upstream import UpstreamBusy, post_json
+
+logger = logging.getLogger(__name__)
 
 def call_groq_api(prompt):
     """
@@ -15,21 +20,28 @@ def call_groq_api(prompt):
     Returns:
         str: Generated response or fallback message.
     """
-    try:
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={"Authorization": f"Bearer {GROQ_API_KEY}"},
-            json={
-                "model": GROQ_MODEL,
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.3,
-                "max_tokens": 10000
-            },
-            timeout=120
-        )
-        response.raise_for_status()
-        return response.json()["choices"][0]["message"]["content"]
+    with span("llm", model=GROQ_MODEL, prompt_chars=len(prompt)) as s:
+        try:
+            data = post_json(
+                "groq",
+                GROQ_API_URL,
+                headers={"Authorization": f"Bearer {GROQ_API_KEY}"},
+                json={
+                    "model": GROQ_MODEL,
+                    "messages": [{"role": "user", "content": prompt}],
+                    "temperature": 0.3,
+                    "max_tokens": 10000
+                },
+                timeout=120
+            )
+            usage = data.get("usage") or {}
+            s.set_attributes(prompt_tokens=usage.get("prompt_tokens"), completion_tokens=usage.get("completion_tokens"))
+            return data["choices"][0]["message"]["content"]
 
-    except Exception as e:
-        print(f"❌ Groq API error: {str(e)}")
-        return "⚠️ Gagal mendapatkan respons dari AI."
+        except UpstreamBusy:
+            # Diteruskan ke /ask agar dijawab 503, bukan jawaban gagal biasa
+            raise
+        except Exception as e:
+            logger.error("Groq API error: %s", e)
+            s.set_attribute("error", str(e))
+            return "⚠️ Gagal mendapatkan respons dari AI."
@@ -1,13 +1,11 @@
-def build_prompt(query_text, context, history=[]):
-    """
-    Prompt builder to guide LLM to generate clean, well-formatted Qur'an-Hadith explanations.
-    """
-    history_text = ""
-    if history:
-        for idx, (q, a) in enumerate(history, 1):
-            history_text += f"[{idx}] ❓ {q}\n[{idx}] 💡 {a}\n"
+# generation/prompt_builder.py
+"""
+Prompt builder untuk LLM. Instruksi statis (~3 KB) dirangkai sekali saat import,
+sehingga setiap panggilan hanya menyambungkan bagian yang dinamis.
+"""
 
-    return f"""
+# Bagian statis template, dipisah di titik-titik sisipan yang dinamis
+_INSTRUCTIONS_HEAD = """
 Anda adalah asisten AI yang ahli dalam tafsir Al-Qur’an dan Hadis. Anda diminta menjawab pertanyaan pengguna secara **ilmiah, natural, dan rapi**, berdasarkan potongan-potongan ayat atau hadis yang tersedia.
 
 ❗ Format penulisan jawaban:
@@ -34,7 +32,8 @@ Ayat ini menjelaskan...
 🎯 **KESIMPULAN DI AKHIR JAWABAN:**
 Setelah menjelaskan semua referensi, **buatlah satu paragraf kesimpulan yang ringkas dan jelas**.
 
-- Kesimpulan ini harus **secara langsung menjawab pertanyaan pengguna** (`{query_text}`).
+- Kesimpulan ini harus **secara langsung menjawab pertanyaan pengguna** (`"""
+_INSTRUCTIONS_TAIL = """`).
 - **Rangkum poin-poin utama** dari referensi yang telah Anda jelaskan, **secara spesifik sesuai sumbernya**:
   - Jika hanya ada **ayat Al-Qur’an**, gunakan frasa seperti: *"Berdasarkan ayat yang telah dijelaskan..."*
   - Jika hanya ada **hadis**, gunakan frasa seperti: *"Merujuk pada hadis yang telah disebutkan..."*
@@ -56,11 +55,32 @@ Jika pengguna mengucapkan terima kasih, balas dengan:
 Pertanyaan yang mengandung unsur **provokatif, politik, atau sensitif secara sosial/agama tidak akan dijawab oleh sistem.**
 
 Berikut ini adalah riwayat chat sebelumnya:
-{history_text}
+"""
+_CONTEXT_INTRO = """
 
 Gunakan **hanya informasi yang paling relevan** dari potongan konteks di bawah ini untuk menjawab pertanyaan. Jika sebuah ayat atau hadis dalam konteks tidak relevan dengan pertanyaan pengguna, jangan dimasukkan dalam jawaban.
-{context}
+"""
+_QUESTION_INTRO = """
 
 Pertanyaan pengguna:
-{query_text}
 """
+_PROMPT_END = """
+"""
+
+
+def build_history_text(history):
+    return "".join(f"[{idx}] ❓ {q}\n[{idx}] 💡 {a}\n" for idx, (q, a) in enumerate(history, 1))
+
+
+def build_prompt(query_text, context, history=[]):
+    """
+    Prompt builder to guide LLM to generate clean, well-formatted Qur'an-Hadith explanations.
+    `context` boleh berupa string atau ContextBundle; bundle dirender langsung ke dalam prompt.
+    """
+    parts = [_INSTRUCTIONS_HEAD, query_text, _INSTRUCTIONS_TAIL, build_history_text(history or []), _CONTEXT_INTRO]
+    if isinstance(context, str):
+        parts.append(context)
+    else:
+        parts.extend(context.render_parts())
+    parts += [_QUESTION_INTRO, query_text, _PROMPT_END]
+    return "".join(parts)
@@ -1,9 +1,48 @@
 # embedder.py
+"""
+Query/document embedders. EMBEDDER_BACKEND selects the implementation:
+- "ollama" (default): OllamaEmbedder, calls an Ollama server (OLLAMA_HOST).
+- "local": LocalEmbedder (local_embedder.py), runs a sentence-transformers model
+  in-process on CPU through ONNX Runtime or PyTorch (EMBEDDER_RUNTIME).
+EMBEDDER_MODEL overrides the model name of either backend.
 
+Every embedder exposes `model`, `embed_query(text)`, `embed_text(text)` and `embed_texts(texts)`.
+The shared instance is built on first use by get_embedder(), not at import time.
+"""
+
+import logging
 import os
+import threading
 import requests
 from neo4j_graphrag.embeddings.base import Embedder as BaseEmbedder
 
+try:
+    from replay import wrap_embedder
+    from upstream import post_json
+    from micro_batcher import MicroBatcher
+    from metrics import EMBEDDING_BATCH_SIZE
+except ImportError:  # diimpor sebagai Backend.groq_embedder dari root proyek
+    from Backend.replay import wrap_embedder
+    from Backend.upstream import post_json
+    from Backend.micro_batcher import MicroBatcher
+    from Backend.metrics import EMBEDDING_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Query embeddings arriving within EMBED_BATCH_WINDOW_MS are sent to Ollama as one
+# /api/embed call of at most EMBED_BATCH_MAX texts. A window of 0 disables batching.
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+EMBED_BATCH_MAX = int(os.getenv("EMBED_BATCH_MAX", "16"))
+# Timeout koneksi dan baca (detik) per panggilan Ollama. upstream.py memegang slot
+# OLLAMA_MAX_CONCURRENCY selama panggilan, jadi Ollama yang hang tidak boleh menahannya selamanya.
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "60"))
+
+BACKEND_OLLAMA = "ollama"
+BACKEND_LOCAL = "local"
+EMBEDDER_BACKEND = os.getenv("EMBEDDER_BACKEND", BACKEND_OLLAMA).strip().lower()
+EMBEDDER_MODEL = os.getenv("EMBEDDER_MODEL") or None
+
 class OllamaEmbedder(BaseEmbedder):
     def __init__(self, model_name="gte-qwen2-7b-instruct"):
         """
@@ -17,32 +56,99 @@ class OllamaEmbedder(BaseEmbedder):
         self.host = ollama_host
         self.max_tokens = 8192
         self.chunk_overlap = 128
-        print(f"--- Ollama Embedder initialized to connect to {self.host} ---") # Log untuk debugging
+        self._batcher = None
+        if EMBED_BATCH_WINDOW_MS > 0:
+            self._batcher = MicroBatcher(self._embed_batch, max_batch=EMBED_BATCH_MAX,
+                                         window_ms=EMBED_BATCH_WINDOW_MS, name="ollama-embed-batcher",
+                                         on_batch=EMBEDDING_BATCH_SIZE.observe)
+        logger.info("Ollama Embedder initialized to connect to %s", self.host)
 
     def _embed(self, text: str):
         """Helper function to get embeddings from the Ollama API."""
         try:
-            response = requests.post(
+            # Retries connection errors, timeouts and 429/5xx before raising (see upstream.py)
+            data = post_json(
+                "ollama",
                 f"{self.host}/api/embeddings",
                 json={
                     "model": self.model,
                     "prompt": text
-                }
+                },
+                timeout=(OLLAMA_CONNECT_TIMEOUT, OLLAMA_TIMEOUT)
             )
-            response.raise_for_status()  # This will raise an exception for HTTP errors (4xx or 5xx)
-            return response.json()["embedding"]
+            return data["embedding"]
         except requests.exceptions.RequestException as e:
-            print(f"Error connecting to Ollama at {self.host}: {e}")
+            logger.error("Error connecting to Ollama at %s: %s", self.host, e)
             # Re-raise the exception to be handled by the calling code
             raise
 
+    def _embed_batch(self, texts: list):
+        """
+        Embeds several texts in one call via /api/embed.
+        Its vectors are L2-normalised, which ranks identically under the cosine vector index.
+        """
+        try:
+            data = post_json(
+                "ollama",
+                f"{self.host}/api/embed",
+                json={
+                    "model": self.model,
+                    "input": texts
+                },
+                timeout=(OLLAMA_CONNECT_TIMEOUT, OLLAMA_TIMEOUT)
+            )
+            return data["embeddings"]
+        except requests.exceptions.RequestException as e:
+            logger.error("Error connecting to Ollama at %s: %s", self.host, e)
+            raise
+
     def embed_text(self, text: str):
         """Embeds a single piece of text."""
         return self._embed(text)
 
+    def embed_texts(self, texts: list):
+        """Embeds many texts, EMBED_BATCH_MAX per /api/embed call."""
+        vectors = []
+        for start in range(0, len(texts), EMBED_BATCH_MAX):
+            vectors.extend(self._embed_batch(texts[start:start + EMBED_BATCH_MAX]))
+        return vectors
+
     def embed_query(self, query: str):
-        """Embeds a single query."""
-        return self._embed(query)
+        """Embeds a single query, coalesced with concurrent queries by the micro-batcher."""
+        if self._batcher is None:
+            return self._embed(query)
+        return self._batcher.submit(query)
+
+
+def create_embedder(backend=EMBEDDER_BACKEND, model_name=EMBEDDER_MODEL, **kwargs):
+    """Builds the embedder for `backend`; extra kwargs go to LocalEmbedder (runtime, onnx_file, threads, ...)."""
+    if backend == BACKEND_OLLAMA:
+        return OllamaEmbedder(model_name) if model_name else OllamaEmbedder()
+    if backend == BACKEND_LOCAL:
+        try:
+            from local_embedder import LocalEmbedder
+        except ImportError:
+            from Backend.local_embedder import LocalEmbedder
+        kwargs.setdefault("batch_window_ms", EMBED_BATCH_WINDOW_MS)
+        kwargs.setdefault("max_batch", EMBED_BATCH_MAX)
+        return LocalEmbedder(model_name, **kwargs) if model_name else LocalEmbedder(**kwargs)
+    raise ValueError(f"Unknown EMBEDDER_BACKEND: {backend!r} (expected 'ollama' or 'local')")
+
+# The embedder used across the application, created lazily on first use
+# (dibungkus record/replay jika GRAPHRAG_FIXTURE_MODE aktif)
+_embedder = None
+_embedder_lock = threading.Lock()
+
+def get_embedder():
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                _embedder = wrap_embedder(create_embedder)
+    return _embedder
 
-# Instantiate the embedder to be used across the application
-Embedder = OllamaEmbedder()
\ No newline at end of file
+def __getattr__(name):
+    # Backwards compatible `from groq_embedder import Embedder`
+    if name == "Embedder":
+        return get_embedder()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
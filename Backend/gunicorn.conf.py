@@ -0,0 +1,43 @@
+# gunicorn.conf.py
+"""
+Mode multi-worker untuk backend:
+
+    gunicorn -c gunicorn.conf.py main:app
+
+- WEB_CONCURRENCY worker uvicorn (default: jumlah core, maksimal 4). Nilainya ditulis ke
+  environment agar config.py membagi NEO4J_TOTAL_CONNECTIONS rata ke setiap worker.
+- Cache embedding, jawaban dan korpus dipakai bersama lewat SQLite WAL di CACHE_DIR
+  (lihat shared_cache.py); cache jawaban dan korpus dikosongkan sekali saat server mulai.
+- Metrik Prometheus dari semua worker digabung lewat PROMETHEUS_MULTIPROC_DIR.
+
+Batas admission (ADMISSION_*) dan konkurensi upstream (*_MAX_CONCURRENCY) berlaku per worker.
+"""
+import os
+import shutil
+import tempfile
+
+workers = int(os.environ.setdefault("WEB_CONCURRENCY", str(min(4, os.cpu_count() or 1))))
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = os.getenv("BIND", "0.0.0.0:8000")
+# Panggilan LLM bisa lama; worker tidak boleh dibunuh sebelum admission menolak request
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# Harus di-set sebelum prometheus_client diimpor oleh worker
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "graphrag-prometheus"))
+
+
+def on_starting(server):
+    # Sisa metrik dari run sebelumnya akan ikut terjumlah jika tidak dihapus
+    multiproc_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+    from shared_cache import reset_volatile_caches
+    reset_volatile_caches()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
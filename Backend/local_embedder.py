@@ -0,0 +1,92 @@
+# local_embedder.py
+"""
+Embedder in-process di CPU menggunakan sentence-transformers, tanpa server Ollama.
+
+- runtime "onnx"  : model ONNX lewat ONNX Runtime (butuh `optimum[onnxruntime]`).
+                    EMBEDDER_ONNX_FILE memilih file ONNX di repo model, misal
+                    "onnx/model_qint8_avx512_vnni.onnx" untuk versi int8 terkuantisasi.
+- runtime "torch" : model PyTorch biasa.
+
+Jumlah thread CPU diatur EMBEDDER_THREADS (default semua core). Banyak teks di-encode
+sekaligus dalam batch EMBEDDER_BATCH_SIZE; query yang datang bersamaan digabung oleh
+MicroBatcher yang sama dengan embedder Ollama.
+
+PENTING: vektor query harus berasal dari model yang sama dengan vektor di index Neo4j.
+Mengganti model berarti meng-embed ulang korpus dan membuat ulang index dengan
+EMBEDDING_DIMENSION yang sesuai.
+"""
+import logging
+import os
+
+from neo4j_graphrag.embeddings.base import Embedder as BaseEmbedder
+
+try:
+    from micro_batcher import MicroBatcher
+except ImportError:  # diimpor sebagai Backend.local_embedder dari root proyek
+    from Backend.micro_batcher import MicroBatcher
+
+logger = logging.getLogger(__name__)
+
+RUNTIME_ONNX = "onnx"
+RUNTIME_TORCH = "torch"
+
+DEFAULT_LOCAL_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+EMBEDDER_RUNTIME = os.getenv("EMBEDDER_RUNTIME", RUNTIME_ONNX)
+EMBEDDER_ONNX_FILE = os.getenv("EMBEDDER_ONNX_FILE") or None
+EMBEDDER_THREADS = int(os.getenv("EMBEDDER_THREADS", str(os.cpu_count() or 1)))
+EMBEDDER_BATCH_SIZE = int(os.getenv("EMBEDDER_BATCH_SIZE", "32"))
+# Prefiks untuk model seperti E5 ("query: " / "passage: "); kosong untuk model lain
+EMBEDDER_QUERY_PREFIX = os.getenv("EMBEDDER_QUERY_PREFIX", "")
+EMBEDDER_DOCUMENT_PREFIX = os.getenv("EMBEDDER_DOCUMENT_PREFIX", "")
+
+
+class LocalEmbedder(BaseEmbedder):
+    def __init__(self, model_name=DEFAULT_LOCAL_MODEL, runtime=EMBEDDER_RUNTIME, onnx_file=EMBEDDER_ONNX_FILE,
+                 threads=EMBEDDER_THREADS, batch_size=EMBEDDER_BATCH_SIZE, batch_window_ms=0.0, max_batch=16):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = model_name if not onnx_file else f"{model_name}@{onnx_file}"
+        self.runtime = runtime
+        self.batch_size = batch_size
+
+        model_kwargs = {}
+        if runtime == RUNTIME_ONNX:
+            import onnxruntime
+            session_options = onnxruntime.SessionOptions()
+            session_options.intra_op_num_threads = threads
+            session_options.inter_op_num_threads = 1
+            model_kwargs = {"provider": "CPUExecutionProvider", "session_options": session_options}
+            if onnx_file:
+                model_kwargs["file_name"] = onnx_file
+        else:
+            import torch
+            torch.set_num_threads(threads)
+
+        self._model = SentenceTransformer(model_name, device="cpu", backend=runtime, model_kwargs=model_kwargs)
+        self.dimension = self._model.get_sentence_embedding_dimension()
+
+        self._batcher = None
+        if batch_window_ms > 0:
+            self._batcher = MicroBatcher(self._encode_queries, max_batch=max_batch,
+                                         window_ms=batch_window_ms, name="local-embed-batcher")
+        logger.info("Local embedder %s (%s, %d thread, dimensi %d) siap", self.model, runtime, threads, self.dimension)
+
+    def _encode(self, texts):
+        vectors = self._model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True,
+                                     convert_to_numpy=True, show_progress_bar=False)
+        return vectors.tolist()
+
+    def _encode_queries(self, queries):
+        return self._encode([EMBEDDER_QUERY_PREFIX + query for query in queries])
+
+    def embed_text(self, text: str):
+        return self._encode([EMBEDDER_DOCUMENT_PREFIX + text])[0]
+
+    def embed_texts(self, texts: list):
+        """Meng-encode banyak dokumen sekaligus, memakai semua thread CPU yang dikonfigurasi."""
+        return self._encode([EMBEDDER_DOCUMENT_PREFIX + text for text in texts])
+
+    def embed_query(self, query: str):
+        if self._batcher is None:
+            return self._encode_queries([query])[0]
+        return self._batcher.submit(query)
@@ -0,0 +1,94 @@
+# logging_setup.py
+"""
+Konfigurasi logging backend.
+
+- Modul memakai `logger = logging.getLogger(__name__)` dengan format lazy
+  (`logger.debug("skor %.4f", skor)`), sehingga string tidak dibangun jika level mati.
+- Handler root berupa QueueHandler: thread request hanya memasukkan record ke antrean,
+  penulisan ke stdout dilakukan QueueListener di thread terpisah.
+- Setiap record membawa `request_id` dari contextvar yang di-set middleware main.py.
+
+Diatur lewat environment variable:
+    LOG_LEVEL  = level default (default INFO)
+    LOG_LEVELS = level per modul, misal "retrieval.context_builder=DEBUG,retrieval.topic_detector=WARNING"
+    LOG_FORMAT = "json" | "text" (default json)
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from contextvars import ContextVar
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+
+request_id_var = ContextVar("request_id", default="-")
+
+# Atribut bawaan LogRecord; sisanya (dari `extra=`) ikut ditulis sebagai field JSON
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_listener = None
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _parse_levels(spec):
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging():
+    """Memasang handler antrean di root logger. Aman dipanggil lebih dari sekali."""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    # request_id harus diambil di thread pemanggil, sebelum record masuk antrean
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+    for name, level in _parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -1,12 +1,105 @@
 # backend/main.py
-from fastapi import FastAPI
+import math
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import List, Tuple
 
 # Import fungsi inti Anda dari folder retrieval
-from retrieval.query_processor import process_user_query
+from retrieval.query_processor import answer_query, set_answer_cache
+from retrieval.embedding import set_query_cache
+from retrieval.traversal import set_corpus_cache
+from config import NEO4J_MAX_POOL_SIZE
+from metrics import NEO4J_POOL_MAX, REQUEST_LATENCY, REQUESTS_IN_FLIGHT, render_metrics
+from logging_setup import request_id_var, setup_logging
+from admission import Rejected, admission
+from upstream import UpstreamBusy
+from replay import FIXTURE_MODE
+import shared_cache
+
+setup_logging()
+
+def install_shared_caches():
+    """
+    Memasang cache embedding, jawaban dan korpus di SQLite bersama (shared_cache.py),
+    sehingga semua worker gunicorn berbagi cache yang sama. Nonaktif dalam mode fixture.
+    """
+    if not shared_cache.SHARED_CACHE or FIXTURE_MODE:
+        return
+    from groq_embedder import get_embedder
+
+    shared_cache.reset_volatile_caches()
+    set_query_cache(shared_cache.EmbeddingCache(shared_cache.cache_path(shared_cache.EMBEDDING_CACHE),
+                                                get_embedder().model))
+    if shared_cache.ANSWER_CACHE_TTL > 0:
+        set_answer_cache(shared_cache.SharedCache(shared_cache.cache_path(shared_cache.ANSWER_CACHE),
+                                                  ttl=shared_cache.ANSWER_CACHE_TTL))
+    if shared_cache.CORPUS_CACHE_TTL > 0:
+        set_corpus_cache(shared_cache.SharedCache(shared_cache.cache_path(shared_cache.CORPUS_CACHE),
+                                                  ttl=shared_cache.CORPUS_CACHE_TTL))
 
-app = FastAPI(title="Chatbot RAG Backend")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Dijalankan di setiap worker setelah fork, bukan saat modul diimpor
+    install_shared_caches()
+    yield
+
+app = FastAPI(title="Chatbot RAG Backend", lifespan=lifespan)
+NEO4J_POOL_MAX.set(NEO4J_MAX_POOL_SIZE)
+
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+    """
+    Mencatat latensi dan jumlah request yang sedang berjalan untuk /metrics,
+    serta memasang request ID (dari header X-Request-ID atau baru) untuk korelasi log.
+    """
+    if request.url.path == "/metrics":
+        return await call_next(request)
+
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex[:12]
+    token = request_id_var.set(request_id)
+    REQUESTS_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+        request_id_var.reset(token)
+        # Pakai pola route (bukan path mentah) agar label tidak meledak
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        REQUEST_LATENCY.labels(request.method, path, str(status)).observe(time.perf_counter() - started)
+
+@app.exception_handler(Rejected)
+async def rejected_handler(request: Request, exc: Rejected):
+    """Beban berlebih: 429 untuk klien yang melewati batasnya, 503 untuk antrean penuh/terlalu lama."""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": "Server sedang sibuk, silakan coba lagi nanti.", "reason": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(UpstreamBusy)
+async def upstream_busy_handler(request: Request, exc: UpstreamBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Layanan AI sedang sibuk, silakan coba lagi nanti.", "reason": f"{exc.upstream}_busy"},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+@app.get("/metrics")
+def metrics():
+    """Metrik Prometheus (latensi, cache, error upstream, routing, pool Neo4j)."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 # Definisikan model data untuk menerima request
 class QueryRequest(BaseModel):
@@ -15,11 +108,17 @@ class QueryRequest(BaseModel):
 
 # Definisikan endpoint API
 @app.post("/ask")
-def ask_question(request: QueryRequest):
+def ask_question(request: QueryRequest, http_request: Request):
     """
     Endpoint utama untuk memproses pertanyaan dari frontend.
     Menerima pertanyaan dan riwayat chat, lalu mengembalikan jawaban.
+    Saat beban berlebih request ditolak dengan 429/503 + Retry-After (lihat admission.py).
     """
+    # Frontend mengirim X-Client-ID per sesi; tanpa header, alamat IP dipakai sebagai klien
+    client = http_request.headers.get("X-Client-ID") or (http_request.client.host if http_request.client else "anonim")
+
     # Panggil fungsi logika inti Anda dengan data dari request
-    answer = process_user_query(request.question, request.history)
+    # Pertanyaan identik yang sedang diproses bersamaan berbagi satu eksekusi pipeline;
+    # hanya eksekusi itu yang mengambil slot admission (cache hit dan follower tidak)
+    answer = answer_query(request.question, request.history, admit=lambda: admission.slot(client))
     return {"answer": answer}
\ No newline at end of file
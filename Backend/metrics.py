@@ -0,0 +1,101 @@
+# metrics.py
+"""
+Metrik Prometheus untuk backend, diekspos di endpoint /metrics (lihat main.py).
+
+- graphrag_http_request_duration_seconds : latensi request HTTP (termasuk /ask)
+- graphrag_http_requests_in_flight       : request yang sedang diproses
+- graphrag_stage_duration_seconds        : durasi setiap span pipeline (ask, retrieval,
+                                           embedding, cypher, llm, ...) dari tracing.py
+- graphrag_stage_in_progress             : span yang sedang berjalan; stage="cypher"
+                                           adalah jumlah query Neo4j yang memakai koneksi pool
+- graphrag_neo4j_pool_max_size           : ukuran maksimal connection pool Neo4j
+- graphrag_cache_requests_total          : hit/miss cache (query_embedding, answer, corpus)
+- graphrag_upstream_errors_total         : error Groq/Ollama per alasan
+- graphrag_upstream_retries_total        : retry ke Groq/Ollama
+- graphrag_route_total                   : jalur kata kunci vs vektor
+- graphrag_topic_decisions_total         : keputusan deteksi perubahan topik
+- graphrag_coalesced_requests_total      : request /ask yang menjalankan pipeline (leader)
+                                           vs ikut hasil request identik (follower)
+- graphrag_upstream_waiting              : panggilan yang menunggu slot konkurensi upstream
+- graphrag_embedding_batch_size          : jumlah teks per panggilan embedding batch ke Ollama
+- graphrag_admission_*                   : antrean, waktu antre dan penolakan /ask (admission.py)
+
+Jika PROMETHEUS_MULTIPROC_DIR di-set (beberapa worker), metrik digabung dari semua proses.
+"""
+import os
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+
+try:
+    from tracing import add_span_observer
+except ImportError:  # diimpor sebagai Backend.metrics dari root proyek
+    from Backend.tracing import add_span_observer
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+REQUEST_LATENCY = Histogram(
+    "graphrag_http_request_duration_seconds", "Latensi request HTTP",
+    ["method", "path", "status"], buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "graphrag_http_requests_in_flight", "Request HTTP yang sedang diproses",
+    multiprocess_mode="livesum",
+)
+STAGE_LATENCY = Histogram(
+    "graphrag_stage_duration_seconds", "Durasi setiap tahap pipeline",
+    ["stage"], buckets=LATENCY_BUCKETS,
+)
+STAGES_IN_PROGRESS = Gauge(
+    "graphrag_stage_in_progress", "Tahap pipeline yang sedang berjalan",
+    ["stage"], multiprocess_mode="livesum",
+)
+STAGE_ERRORS = Counter("graphrag_stage_errors_total", "Tahap pipeline yang gagal dengan exception", ["stage"])
+NEO4J_POOL_MAX = Gauge(
+    "graphrag_neo4j_pool_max_size", "Ukuran maksimal connection pool Neo4j",
+    multiprocess_mode="liveall",
+)
+CACHE_REQUESTS = Counter("graphrag_cache_requests_total", "Hit/miss cache", ["cache", "result"])
+UPSTREAM_ERRORS = Counter("graphrag_upstream_errors_total", "Error panggilan ke Groq/Ollama", ["upstream", "reason"])
+UPSTREAM_RETRIES = Counter("graphrag_upstream_retries_total", "Retry panggilan ke Groq/Ollama", ["upstream"])
+ROUTES = Counter("graphrag_route_total", "Jalur retrieval yang dipakai", ["route"])
+TOPIC_DECISIONS = Counter("graphrag_topic_decisions_total", "Hasil deteksi perubahan topik", ["decision"])
+COALESCED_REQUESTS = Counter("graphrag_coalesced_requests_total", "Request yang digabung dengan request identik", ["role"])
+UPSTREAM_WAITING = Gauge(
+    "graphrag_upstream_waiting", "Panggilan yang menunggu slot konkurensi upstream",
+    ["upstream"], multiprocess_mode="livesum",
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "graphrag_embedding_batch_size", "Jumlah teks per panggilan embedding batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+ADMISSION_QUEUED = Gauge("graphrag_admission_queued", "Request /ask di antrean admission", multiprocess_mode="livesum")
+ADMISSION_QUEUE_WAIT = Histogram(
+    "graphrag_admission_queue_wait_seconds", "Lama request /ask menunggu di antrean", buckets=LATENCY_BUCKETS,
+)
+ADMISSION_REJECTIONS = Counter("graphrag_admission_rejections_total", "Request /ask yang ditolak", ["reason"])
+
+
+class _StageObserver:
+    """Meneruskan setiap span dari tracing.py ke histogram dan gauge tahap."""
+
+    def span_started(self, name):
+        STAGES_IN_PROGRESS.labels(name).inc()
+
+    def span_finished(self, name, seconds, failed):
+        STAGES_IN_PROGRESS.labels(name).dec()
+        STAGE_LATENCY.labels(name).observe(seconds)
+        if failed:
+            STAGE_ERRORS.labels(name).inc()
+
+
+add_span_observer(_StageObserver())
+
+
+def render_metrics():
+    """Mengembalikan (body, content_type) untuk response /metrics."""
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
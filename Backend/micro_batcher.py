@@ -0,0 +1,90 @@
+# micro_batcher.py
+"""
+Micro-batching untuk panggilan model yang lebih efisien dalam batch (misal embedding Ollama).
+
+Permintaan yang datang dalam jendela waktu singkat (window_ms) dikumpulkan sampai
+max_batch item, dikirim sebagai satu panggilan `batch_fn(items)`, lalu hasilnya
+dibagikan kembali ke setiap pemanggil yang menunggu. Item identik dalam satu batch
+hanya dikirim sekali.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Batas waktu menunggu hasil di submit(); pemanggil tidak boleh tergantung selamanya
+MICRO_BATCH_TIMEOUT = float(os.getenv("MICRO_BATCH_TIMEOUT", "60"))
+
+class MicroBatcher:
+    def __init__(self, batch_fn, max_batch=16, window_ms=5.0, name="micro-batcher", on_batch=None,
+                 timeout=MICRO_BATCH_TIMEOUT):
+        """
+        - batch_fn : fungsi list[item] -> list[hasil] dengan urutan yang sama.
+        - on_batch : callback opsional yang menerima ukuran setiap batch (untuk metrik).
+        - timeout  : detik maksimal submit() menunggu hasil (None = tanpa batas).
+        """
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self.name = name
+        self.on_batch = on_batch
+        self.timeout = timeout
+        self._queue = queue.SimpleQueue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._start_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._worker.start()
+
+    def submit(self, item):
+        """
+        Mengantrekan satu item dan menunggu hasilnya (exception dari batch_fn ikut dilempar,
+        concurrent.futures.TimeoutError jika hasil tidak datang dalam `timeout` detik).
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future))
+        return future.result(timeout=self.timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _dispatch(self, batch):
+        unique = list(dict.fromkeys(item for item, _ in batch))
+        if self.on_batch is not None:
+            self.on_batch(len(unique))
+        results = list(self.batch_fn(unique))
+        if len(results) != len(unique):
+            raise RuntimeError(f"{self.name}: batch_fn mengembalikan {len(results)} hasil untuk {len(unique)} item")
+        return dict(zip(unique, results))
+
+    def _run(self):
+        # Seluruh dispatch di dalam try: satu batch yang gagal tidak boleh mematikan worker,
+        # karena semua submit() berikutnya akan menunggu tanpa ada yang memproses antrean.
+        while True:
+            batch = self._collect()
+            try:
+                results = self._dispatch(batch)
+            except BaseException as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for item, future in batch:
+                if not future.done():
+                    future.set_result(results[item])
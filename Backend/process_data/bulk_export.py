@@ -0,0 +1,259 @@
+# process_data/bulk_export.py
+"""
+Offline bulk import: write the complete graph as CSV files for `neo4j-admin database
+import full` instead of sending every ayat and hadith through a bolt transaction.
+
+The graph is identical to what insert_data.py builds (same chunk keys, properties,
+embeddings and relationships, see chunking.py), so sync.py and retrieval work on an
+imported database unchanged. Embeddings come from the embedding store where
+possible (see embedding_store.py), so after the first build the export and the
+import are limited by disk speed.
+
+    python -m process_data.bulk_export --out import/                      # 1. tulis CSV
+    neo4j-admin database import full ... (perintah dicetak oleh langkah 1)  # 2. import offline
+    python -m process_data.bulk_export --create-indexes --database <db>   # 3. indeks
+
+The :ID columns only exist during the import (per-label ID spaces); node properties
+are written as separate typed columns so MATCH on e.g. Surah.number keeps using ints.
+"""
+import argparse
+import csv
+import gzip
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+# Root repo juga, untuk Backend.config saat dijalankan dari folder Backend
+sys.path.insert(1, os.path.dirname(project_root))
+
+from process_data.data_loader import QURAN_AYAT_COUNT, iter_quran_surahs, iter_hadith_babs
+from process_data.chunking import (build_ayah, build_hadith, bab_text, content_hash, ensure_chunk_key_index,
+                                   hadith_units, kitab_text, surah_properties)
+from process_data.embedding import checkpoint_embedding_store, embed_chunk, open_embedding_store
+from process_data.hadith_registry import HADITH_SOURCES_FILE, load_hadith_registry, select_collections
+from process_data.reset import create_vector_index
+from Backend.config import NEO4J_DATABASE, get_driver
+from tqdm import tqdm
+
+EXPORT_EMBED_WORKERS = int(os.getenv("EXPORT_EMBED_WORKERS", os.getenv("HADITH_EMBED_WORKERS", "4")))
+# Pemisah elemen array (embedding:float[]), harus sama dengan --array-delimiter saat import
+ARRAY_DELIMITER = ";"
+
+CHUNK_PROPERTIES = ["surah_number:int", "ayat_number:int", "surah_name", "hadith_number:int",
+                    "source_name", "kitab_name", "bab_name", "chunk_index:int", "char_start:int", "char_end:int"]
+NODE_HEADERS = {
+    "Quran": [":ID(Quran)", "name"],
+    "Surah": [":ID(Surah)", "number:int", "name", "name_latin", "number_of_ayah:int"],
+    "Ayat": [":ID(Ayat)", "surah_number:int", "number:int", "text", "translation", "tafsir"],
+    "Hadis": [":ID(Hadis)", "name"],
+    "HadithSource": [":ID(HadithSource)", "name"],
+    "Kitab": [":ID(Kitab)", "name", "source_name", "content_hash", "embedding:float[]"],
+    "Bab": [":ID(Bab)", "name", "kitab_name", "source_name", "content_hash", "embedding:float[]"],
+    "Chunk": [":ID(Chunk)", "key", "id", "source", "text", "content_hash", "embedding:float[]"] + CHUNK_PROPERTIES,
+}
+# (nama file, tipe relasi, ID space awal, ID space akhir)
+RELATIONSHIPS = [
+    ("quran_has_surah", "HAS_SURAH", "Quran", "Surah"),
+    ("surah_has_ayat", "HAS_AYAT", "Surah", "Ayat"),
+    ("ayat_has_chunk", "HAS_CHUNK", "Ayat", "Chunk"),
+    ("chunk_has_chunk", "HAS_CHUNK", "Chunk", "Chunk"),
+    ("hadis_has_source", "HAS_SOURCE", "Hadis", "HadithSource"),
+    ("source_has_kitab", "HAS_KITAB", "HadithSource", "Kitab"),
+    ("kitab_has_bab", "HAS_BAB", "Kitab", "Bab"),
+    ("bab_contains_hadith_chunk", "CONTAINS_HADITH_CHUNK", "Bab", "Chunk"),
+]
+
+def _array(vector):
+    return ARRAY_DELIMITER.join(repr(float(x)) for x in vector)
+
+class CsvGraphWriter:
+    """Satu file CSV per label node dan per pasangan relasi, dengan header neo4j-admin."""
+
+    def __init__(self, out_dir, compress=False):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.extension = ".csv.gz" if compress else ".csv"
+        self.files = {}
+        self.writers = {}
+        self.counts = {}
+        self.seen = set()
+        for label, header in NODE_HEADERS.items():
+            self._open(f"nodes_{label.lower()}", header)
+        for name, _, start, end in RELATIONSHIPS:
+            self._open(f"rels_{name}", [f":START_ID({start})", f":END_ID({end})"])
+
+    def _open(self, name, header):
+        path = os.path.join(self.out_dir, name + self.extension)
+        file = gzip.open(path, "wt", encoding="utf-8", newline="") if self.extension.endswith(".gz") \
+            else open(path, "w", encoding="utf-8", newline="")
+        self.files[name] = file
+        self.writers[name] = csv.writer(file)
+        self.writers[name].writerow(header)
+        self.counts[name] = 0
+
+    def _write(self, name, row):
+        self.writers[name].writerow(row)
+        self.counts[name] += 1
+
+    def has_node(self, label, node_id):
+        return (label, node_id) in self.seen
+
+    def node(self, label, node_id, *values):
+        """Menulis node sekali saja; node yang sama (misal Kitab di beberapa bab) dilewati."""
+        if (label, node_id) in self.seen:
+            return False
+        self.seen.add((label, node_id))
+        self._write(f"nodes_{label.lower()}", [node_id, *values])
+        return True
+
+    def relationship(self, name, start_id, end_id):
+        self._write(f"rels_{name}", [start_id, end_id])
+
+    def chunk_chain(self, anchor_rel, anchor_id, chunks, embeddings):
+        for chunk, embedding in zip(chunks, embeddings):
+            props = chunk["props"]
+            self._write("nodes_chunk", [
+                chunk["key"], chunk["key"], chunk["key"], chunk["source"], chunk["text"], chunk["content_hash"],
+                _array(embedding), *(props.get(column.split(":")[0]) for column in CHUNK_PROPERTIES),
+            ])
+        for previous, chunk in zip(chunks, chunks[1:]):
+            self.relationship("chunk_has_chunk", previous["key"], chunk["key"])
+        self.relationship(anchor_rel, anchor_id, chunks[0]["key"])
+
+    def close(self):
+        for file in self.files.values():
+            file.close()
+
+    def import_command(self, database):
+        """Perintah neo4j-admin untuk file yang ditulis writer ini."""
+        nodes = [f"--nodes={label}={os.path.join(self.out_dir, f'nodes_{label.lower()}{self.extension}')}"
+                 for label in NODE_HEADERS]
+        relationships = [f"--relationships={rel_type}={os.path.join(self.out_dir, f'rels_{name}{self.extension}')}"
+                         for name, rel_type, _, _ in RELATIONSHIPS]
+        return ["neo4j-admin", "database", "import", "full", *nodes, *relationships,
+                f"--array-delimiter={ARRAY_DELIMITER}", "--multiline-fields=true", "--overwrite-destination=true",
+                database]
+
+def _embed_all(executor, chunks):
+    return list(executor.map(embed_chunk, [c["text"] for c in chunks], [c["key"] for c in chunks]))
+
+def export_quran(writer, executor, quran_json_path):
+    writer.node("Quran", "Al-Quran", "Al-Quran")
+    progress = tqdm(total=QURAN_AYAT_COUNT, desc="Ekspor Ayat", unit="ayat")
+    for surah in iter_quran_surahs(quran_json_path):
+        props = surah_properties(surah)
+        writer.node("Surah", props["number"], props["number"], props["name"], props["name_latin"], props["number_of_ayah"])
+        writer.relationship("quran_has_surah", "Al-Quran", props["number"])
+
+        ayahs = []
+        for ayah_key, ayah_text in surah["text"].items():
+            try:
+                ayahs.append(build_ayah(surah, ayah_key, ayah_text))
+            except ValueError as e:
+                print(str(e))
+        # Semua chunk satu surah di-embed bersamaan oleh worker embedding
+        embeddings = iter(_embed_all(executor, [c for ayah in ayahs for c in ayah["chunks"]]))
+        for ayah in ayahs:
+            if writer.node("Ayat", ayah["unit"], ayah["surah_number"], ayah["ayat_number"], ayah["ayat"]["text"],
+                           ayah["ayat"]["translation"], ayah["ayat"]["tafsir"]):
+                writer.relationship("surah_has_ayat", props["number"], ayah["unit"])
+            chunk_embeddings = [next(embeddings) for _ in ayah["chunks"]]
+            writer.chunk_chain("ayat_has_chunk", ayah["unit"], ayah["chunks"], chunk_embeddings)
+        progress.update(len(surah["text"]))
+        checkpoint_embedding_store()
+    progress.close()
+
+def export_hadith_collection(writer, executor, collection):
+    """Mengembalikan jumlah hadis yang gagal (dilewati, seperti pada insert_data)."""
+    source_name = collection.name
+    writer.node("Hadis", "Hadis", "Hadis")
+    writer.node("HadithSource", source_name, source_name)
+    writer.relationship("hadis_has_source", "Hadis", source_name)
+
+    unit_for = hadith_units(source_name)
+    failed = 0
+    progress = tqdm(desc=f"Ekspor {source_name}", unit="hadis")
+    for kitab_name, bab_item in iter_hadith_babs(collection.path):
+        bab_name = bab_item['bab']
+        kitab_id = f"{source_name}|{kitab_name}"
+        bab_id = f"{kitab_id}|{bab_name}"
+        if not writer.has_node("Kitab", kitab_id):
+            text = kitab_text(source_name, kitab_name)
+            writer.node("Kitab", kitab_id, kitab_name, source_name, content_hash(text), _array(embed_chunk(text)))
+            writer.relationship("source_has_kitab", source_name, kitab_id)
+        if not writer.has_node("Bab", bab_id):
+            text = bab_text(kitab_name, bab_name)
+            writer.node("Bab", bab_id, bab_name, kitab_name, source_name, content_hash(text), _array(embed_chunk(text)))
+            writer.relationship("kitab_has_bab", kitab_id, bab_id)
+
+        # Semua chunk satu bab di-embed bersamaan; hadis yang gagal dilewati
+        pending = []
+        for hadith_item in bab_item['hadiths']:
+            unit = unit_for(hadith_item.get('hadith_number'))
+            try:
+                hadith = build_hadith(unit, source_name, kitab_name, bab_name, hadith_item)
+            except KeyError as e:
+                failed += 1
+                tqdm.write(f"      ❌ Hadis tanpa {e} di {source_name}, Bab '{bab_name}' dilewati.")
+                continue
+            pending.append((hadith, [executor.submit(embed_chunk, c["text"], c["key"]) for c in hadith["chunks"]]))
+        for hadith, futures in pending:
+            try:
+                embeddings = [future.result() for future in futures]
+            except Exception as e:
+                failed += 1
+                tqdm.write(f"      ❌ Gagal memproses hadis #{hadith['hadith_number']} ({source_name}): {e}")
+                continue
+            writer.chunk_chain("bab_contains_hadith_chunk", bab_id, hadith["chunks"], embeddings)
+            progress.update()
+        checkpoint_embedding_store()
+    progress.close()
+    return failed
+
+def create_indexes(database=NEO4J_DATABASE):
+    """Langkah setelah neo4j-admin import: indeks key chunk dan indeks vektor."""
+    with get_driver().session(database=database) as session:
+        ensure_chunk_key_index(session)
+        create_vector_index(session)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ekspor graf lengkap ke CSV untuk neo4j-admin import")
+    parser.add_argument("--out", default=os.path.join(project_root, "import"), help="Direktori output CSV")
+    parser.add_argument("--database", default=NEO4J_DATABASE or "neo4j", help="Database tujuan import")
+    parser.add_argument("--sources", default=HADITH_SOURCES_FILE, help="File registry koleksi hadis")
+    parser.add_argument("--embed-workers", type=int, default=EXPORT_EMBED_WORKERS, help="Worker embedding")
+    parser.add_argument("--compress", action="store_true", help="Tulis .csv.gz (lebih kecil, lebih banyak CPU)")
+    parser.add_argument("--create-indexes", action="store_true",
+                        help="Hanya buat indeks di database yang sudah di-import")
+    args = parser.parse_args()
+
+    if args.create_indexes:
+        try:
+            create_indexes(args.database)
+        finally:
+            get_driver().close()
+        sys.exit(0)
+
+    started = time.perf_counter()
+    writer = CsvGraphWriter(args.out, args.compress)
+    failed = 0
+    store = open_embedding_store()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.embed_workers), thread_name_prefix="export-embed") as executor:
+            export_quran(writer, executor, os.path.join(project_root, 'quran.json'))
+            for collection in select_collections(load_hadith_registry(args.sources)):
+                failed += export_hadith_collection(writer, executor, collection)
+    finally:
+        writer.close()
+        if store is not None:
+            store.save()
+
+    print(f"\n✅ Ekspor selesai dalam {time.perf_counter() - started:.0f} detik ({failed} hadis gagal):")
+    for name, count in writer.counts.items():
+        print(f"   {name}: {count}")
+    print("\nHentikan database tujuan, jalankan import, lalu buat indeksnya:\n")
+    print("   " + " \\\n      ".join(writer.import_command(args.database)))
+    print(f"\n   python -m process_data.bulk_export --create-indexes --database {args.database}")
@@ -2,20 +2,134 @@
 """
 Module for processing religious texts, including the Quran and Hadith,
 and structuring them as a graph in Neo4j.
+
+Every Chunk gets a deterministic `key` and a `content_hash` (sha256 of its text):
+
+    quran:<surah>:<ayat>:<source>:<n>
+    hadith:<source_name>:<hadith_number>:<source>:<n>
+
+The part before `:<source>:<n>` is the "unit" (one ayat or one hadith chain). Chunks
+are written with MERGE on `key`, so the same writer serves a full build and an
+incremental sync (see sync.py), where only changed chunks carry a new embedding.
+
+Long bodies (tafsir, long hadith translations) are split by chunk_text into pieces
+of about CHUNK_TARGET_TOKENS tokens on sentence and paragraph boundaries. Each chunk
+records `chunk_index` and its `char_start`/`char_end` in the source body, so retrieval
+can return the matching piece and its neighbours instead of the whole body.
 """
 
-from uuid import uuid4
+import os
+import re
+from collections import Counter
+from tqdm import tqdm
 from process_data.embedding import embed_chunk
+from process_data.embedding_store import content_hash
+from Backend.groq_embedder import BACKEND_LOCAL, EMBEDDER_BACKEND, EMBEDDER_MODEL
+from Backend.local_embedder import DEFAULT_LOCAL_MODEL
+from Backend.token_count import estimate_tokens
+
+# Chunk di-embed, jadi yang membatasi adalah konteks model embedding, bukan LLM. Token dihitung
+# dengan tokenizer HuggingFace EMBEDDER_TOKENIZER; backend "local" memakai tokenizer modelnya
+# sendiri. Tanpa tokenizer (nama model Ollama bukan nama HuggingFace) dipakai estimasi heuristik
+# token_count.py yang sengaja berlebih. Marginnya: gte-qwen2 (Ollama) menerima 8192 token, jauh
+# di atas CHUNK_TARGET_TOKENS; MiniLM default backend "local" hanya 128 token (max_seq_length),
+# jadi dengan model itu set CHUNK_TARGET_TOKENS di bawah ~100. Tag "[tafsir Al-Baqarah:255] " di awal
+# chunk (sekitar 16 token) tidak ikut dihitung.
+EMBEDDER_TOKENIZER = os.getenv("EMBEDDER_TOKENIZER") or (
+    (EMBEDDER_MODEL or DEFAULT_LOCAL_MODEL) if EMBEDDER_BACKEND == BACKEND_LOCAL else None)
+
+# Ukuran chunk dalam token model embedding (lihat EMBEDDER_TOKENIZER di atas)
+CHUNK_TARGET_TOKENS = int(os.getenv("CHUNK_TARGET_TOKENS", "384"))
+# Kalimat terakhir sebuah chunk (sampai sekian token) diulang di awal chunk berikutnya
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "48"))
+
+_PARAGRAPH_BREAK = re.compile(r"\s*\n\s*")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+# Teks Arab: tanda akhir kalimat Arab dan tanda waqaf mushaf (ۖ ۗ ۘ ۙ ۚ ۛ) juga menjadi batas
+_ARABIC_SENTENCE_BREAK = re.compile(r"(?<=[.!?\u061F\u06D4\u061B\u06D6-\u06DB])\s+")
+_WHITESPACE = re.compile(r"\s+")
+
+def _spans(text, pattern, start, end):
+    """Bagian text[start:end] di antara kecocokan `pattern`, sebagai (start, end) tanpa spasi di tepi."""
+    spans = []
+    cursor = start
+    for match in pattern.finditer(text, start, end):
+        spans.append((cursor, match.start()))
+        cursor = match.end()
+    spans.append((cursor, end))
+    trimmed = []
+    for span_start, span_end in spans:
+        piece = text[span_start:span_end]
+        if piece.strip():
+            trimmed.append((span_start + len(piece) - len(piece.lstrip()), span_end - len(piece) + len(piece.rstrip())))
+    return trimmed
 
-def chunk_text(text, max_tokens=8192, overlap=128):
-    words = text.split()
+def _segments(text, arabic, target_tokens):
+    """
+    Kalimat sebagai (start, end, awal_paragraf). Kalimat yang lebih panjang dari
+    target_tokens dipecah lagi per kata.
+    """
+    sentence_break = _ARABIC_SENTENCE_BREAK if arabic else _SENTENCE_BREAK
+    segments = []
+    for paragraph_start, paragraph_end in _spans(text, _PARAGRAPH_BREAK, 0, len(text)):
+        new_paragraph = True
+        for start, end in _spans(text, sentence_break, paragraph_start, paragraph_end):
+            if estimate_tokens(text[start:end], EMBEDDER_TOKENIZER) <= target_tokens:
+                segments.append((start, end, new_paragraph))
+                new_paragraph = False
+                continue
+            piece_start, piece_end, used = None, None, 0
+            for word_start, word_end in _spans(text, _WHITESPACE, start, end):
+                cost = estimate_tokens(text[word_start:word_end], EMBEDDER_TOKENIZER) + 1
+                if piece_start is not None and used + cost > target_tokens:
+                    segments.append((piece_start, piece_end, new_paragraph))
+                    new_paragraph = False
+                    piece_start, used = None, 0
+                if piece_start is None:
+                    piece_start = word_start
+                piece_end = word_end
+                used += cost
+            segments.append((piece_start, piece_end, new_paragraph))
+            new_paragraph = False
+    return segments
+
+def chunk_text(text, target_tokens=CHUNK_TARGET_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS, arabic=False):
+    """
+    Split text into chunks of about `target_tokens` tokens.
+
+    Chunks end on sentence boundaries (Arabic sentence and waqf marks when `arabic`)
+    and a new paragraph starts a new chunk once the current one is half full. Up to
+    `overlap_tokens` tokens of whole trailing sentences are repeated at the start of
+    the next chunk.
+
+    Returns:
+        list: (char_start, char_end) of every chunk in `text`.
+    """
+    segments = _segments(text, arabic, target_tokens)
+    costs = [estimate_tokens(text[start:end], EMBEDDER_TOKENIZER) for start, end, _ in segments]
     chunks = []
-    start = 0
-    while start < len(words):
-        end = min(start + max_tokens, len(words))
-        chunk = " ".join(words[start:end])
-        chunks.append(chunk)
-        start += max_tokens - overlap
+    first = 0
+    while first < len(segments):
+        last, used = first, costs[first]
+        while last + 1 < len(segments):
+            if used + costs[last + 1] > target_tokens:
+                break
+            if segments[last + 1][2] and used >= target_tokens // 2:
+                break
+            last += 1
+            used += costs[last]
+        chunks.append((segments[first][0], segments[last][1]))
+        if last + 1 >= len(segments):
+            break
+
+        next_first, carried = last + 1, 0
+        while next_first - 1 > first and carried + costs[next_first - 1] <= overlap_tokens:
+            next_first -= 1
+            carried += costs[next_first]
+        # Overlap tidak boleh membuat chunk berikutnya tanpa kalimat baru
+        if carried + costs[last + 1] > target_tokens:
+            next_first = last + 1
+        first = next_first
     return chunks
 
 def extract_ayah_number(ayah_key: str) -> int:
@@ -24,12 +138,191 @@ def extract_ayah_number(ayah_key: str) -> int:
     except Exception:
         raise ValueError(f"❌ Gagal parsing ayat: {ayah_key}")
 
-def process_hadith_source(data, source_name, session):
+def unit_of(key):
+    """quran:1:2:tafsir:0 -> quran:1:2"""
+    return key.rsplit(":", 2)[0]
+
+def _chunk(unit, source, index, text, props, span=None):
+    props = dict(props, chunk_index=index)
+    if span is not None:
+        props.update(char_start=span[0], char_end=span[1])
+    return {"key": f"{unit}:{source}:{index}", "source": source, "text": text,
+            "content_hash": content_hash(text), "props": props, "embedding": None}
+
+def _body_chunks(unit, source, body, tag, props):
+    """Chunk text/translation/tafsir sebuah unit; teks Arab disegmentasi dengan aturan Arab."""
+    return [_chunk(unit, source, index, f"{tag}{body[start:end]}", props, (start, end))
+            for index, (start, end) in enumerate(chunk_text(body, arabic=source == "text"))]
+
+# =====================================================================
+# == MEMBANGUN UNIT (tanpa akses database) ==
+# =====================================================================
+def surah_properties(surah):
+    return {
+        "number": int(surah["number"]),
+        "name": surah["name"],
+        "name_latin": surah["name_latin"],
+        "number_of_ayah": int(surah["number_of_ayah"]),
+    }
+
+def build_ayah(surah, ayah_key, ayah_text):
+    """
+    Satu ayat sebagai unit: properti node :Ayat dan rantai chunk
+    info -> text -> translation -> tafsir (text/translation/tafsir bisa beberapa chunk).
+    """
+    surah_number = int(surah["number"])
+    surah_name_latin = surah["name_latin"]
+    ayah_num = extract_ayah_number(ayah_key)
+    translation = surah.get("translations", {}).get("id", {}).get("text", {}).get(ayah_key, "")
+    tafsir = surah.get("tafsir", {}).get("id", {}).get("kemenag", {}).get("text", {}).get(ayah_key, "")
+
+    unit = f"quran:{surah_number}:{ayah_num}"
+    props = {"ayat_number": ayah_num, "surah_name": surah_name_latin, "surah_number": surah_number}
+    chunks = [_chunk(unit, "info", 0, f"[INFO {surah_name_latin}:{ayah_num}] Surah {surah_name_latin} Ayat {ayah_num}", props)]
+    for source, body in (("text", ayah_text), ("translation", translation), ("tafsir", tafsir)):
+        if body.strip():
+            chunks.extend(_body_chunks(unit, source, body, f"[{source} {surah_name_latin}:{ayah_num}] ", props))
+
+    return {
+        "unit": unit,
+        "surah_number": surah_number,
+        "ayat_number": ayah_num,
+        "ayat": {"text": ayah_text, "translation": translation, "tafsir": tafsir},
+        "chunks": chunks,
+    }
+
+def hadith_units(source_name):
+    """Nama unit per hadis; nomor yang muncul lebih dari sekali diberi akhiran -2, -3, ..."""
+    seen = Counter()
+    def unit_for(hadith_number):
+        seen[hadith_number] += 1
+        suffix = f"-{seen[hadith_number]}" if seen[hadith_number] > 1 else ""
+        return f"hadith:{source_name}:{hadith_number}{suffix}"
+    return unit_for
+
+def build_hadith(unit, source_name, kitab_name, bab_name, hadith_item):
+    """Satu hadis sebagai unit: rantai chunk info -> text (Arab) -> translation."""
+    hadith_number = hadith_item['hadith_number']
+    arabic_text = hadith_item.get('arabic_text') or ""
+    translation_text = hadith_item.get('translation') or ""
+
+    props = {"hadith_number": hadith_number, "source_name": source_name}
+    info_props = dict(props, kitab_name=kitab_name, bab_name=bab_name)
+    chunks = [_chunk(unit, "info", 0, (
+        f"[INFO {source_name} No. {hadith_number}] "
+        f"Konteks hadis dari Kitab {kitab_name}, Bab tentang '{bab_name}'."
+    ), info_props)]
+    if arabic_text.strip():
+        chunks.extend(_body_chunks(unit, "text", arabic_text, f"[Teks Arab {source_name} No. {hadith_number}]: ", props))
+    if translation_text.strip():
+        chunks.extend(_body_chunks(unit, "translation", translation_text,
+                                   f"[Terjemahan {source_name} No. {hadith_number}]: ", props))
+    return {"unit": unit, "hadith_number": hadith_number, "chunks": chunks}
+
+def kitab_text(source_name, kitab_name):
+    return f"Kitab {kitab_name} dari {source_name}"
+
+def bab_text(kitab_name, bab_name):
+    return f"Bab tentang '{bab_name}' dalam Kitab {kitab_name}."
+
+# =====================================================================
+# == MENULIS KE NEO4J ==
+# =====================================================================
+AYAT_ANCHOR = ("MATCH (anchor:Ayat {surah_number: $surah_number, number: $ayat_number})", "HAS_CHUNK")
+BAB_ANCHOR = ("MATCH (anchor:Bab {name: $bab_name, kitab_name: $kitab_name, source_name: $source_name})",
+              "CONTAINS_HADITH_CHUNK")
+
+def write_unit(tx, unit, chunks, anchor, anchor_params):
     """
-    - Membuat node :Kitab dan :Bab dengan embeddingnya sendiri.
-    - Untuk setiap hadis, membuat rantai Chunk: (:Chunk {source:info})->(:Chunk {source:text})->(:Chunk {source:translation})
-    - Node info hadis terhubung ke node :Bab.
+    Upsert rantai chunk satu unit (MERGE pada key) lalu menyusun ulang relasinya:
+    anchor -[HAS_CHUNK|CONTAINS_HADITH_CHUNK]-> chunk pertama -[:HAS_CHUNK]-> chunk berikutnya.
+    - chunk["embedding"] di-SET jika ada; selain itu embedding lama dibiarkan. Embedding
+      yang dipakai ulang dari chunk lain dibaca sebelum transaksi (lihat sync.py), bukan
+      disalin dari node yang bisa saja sudah ditulis ulang di transaksi yang sama.
     """
+    anchor_match, anchor_rel = anchor
+    tx.run("""
+        UNWIND $chunks AS c
+        MERGE (n:Chunk {key: c.key})
+        ON CREATE SET n.id = c.key
+        SET n += c.props, n.text = c.text, n.source = c.source, n.content_hash = c.content_hash
+        FOREACH (_ IN CASE WHEN c.embedding IS NULL THEN [] ELSE [1] END | SET n.embedding = c.embedding)
+    """, {"chunks": [{
+        "key": c["key"], "source": c["source"], "text": c["text"], "content_hash": c["content_hash"],
+        "props": c["props"], "embedding": c["embedding"],
+    } for c in chunks]})
+
+    keys = [c["key"] for c in chunks]
+    tx.run("""
+        MATCH (a:Chunk)-[r:HAS_CHUNK]->(:Chunk)
+        WHERE a.key STARTS WITH $prefix
+        DELETE r
+    """, {"prefix": unit + ":"})
+    tx.run("""
+        UNWIND range(0, size($keys) - 2) AS i
+        MATCH (a:Chunk {key: $keys[i]}), (b:Chunk {key: $keys[i + 1]})
+        MERGE (a)-[:HAS_CHUNK]->(b)
+    """, {"keys": keys})
+    tx.run(f"""
+        MATCH (info:Chunk {{key: $key}})
+        OPTIONAL MATCH ()-[r:{anchor_rel}]->(info)
+        DELETE r
+    """, {"key": keys[0]})
+    tx.run(f"""
+        {anchor_match}
+        MATCH (info:Chunk {{key: $key}})
+        MERGE (anchor)-[:{anchor_rel}]->(info)
+    """, dict(anchor_params, key=keys[0]))
+
+def ensure_chunk_key_index(session):
+    session.run("CREATE INDEX chunk_key IF NOT EXISTS FOR (c:Chunk) ON (c.key)")
+
+def write_surah(session, props):
+    session.run("""
+        MERGE (q:Quran {name: 'Al-Quran'})
+        MERGE (s:Surah {number: $number})
+        SET s.name = $name, s.name_latin = $name_latin, s.number_of_ayah = $number_of_ayah
+        MERGE (q)-[:HAS_SURAH]->(s)
+    """, props)
+
+def write_ayah(tx, ayah):
+    tx.run("""
+        MATCH (s:Surah {number: $surah_number})
+        MERGE (a:Ayat {surah_number: $surah_number, number: $number})
+        SET a.text = $text, a.translation = $translation, a.tafsir = $tafsir
+        MERGE (s)-[:HAS_AYAT]->(a)
+    """, dict(ayah["ayat"], surah_number=ayah["surah_number"], number=ayah["ayat_number"]))
+    write_unit(tx, ayah["unit"], ayah["chunks"], AYAT_ANCHOR,
+               {"surah_number": ayah["surah_number"], "ayat_number": ayah["ayat_number"]})
+
+def write_kitab(session, source_name, kitab_name, embedding):
+    # Kita tidak membuat ini sebagai Chunk agar modelnya bersih
+    session.run("""
+        MATCH (s:HadithSource {name: $source_name})
+        MERGE (k:Kitab {name: $kitab_name, source_name: $source_name})
+        SET k.embedding = coalesce($embedding, k.embedding), k.content_hash = $content_hash
+        MERGE (s)-[:HAS_KITAB]->(k)
+    """, source_name=source_name, kitab_name=kitab_name, embedding=embedding,
+        content_hash=content_hash(kitab_text(source_name, kitab_name)))
+
+def write_bab(session, source_name, kitab_name, bab_name, embedding):
+    session.run("""
+        MATCH (k:Kitab {name: $kitab_name, source_name: $source_name})
+        MERGE (b:Bab {name: $bab_name, kitab_name: $kitab_name, source_name: $source_name})
+        SET b.embedding = coalesce($embedding, b.embedding), b.content_hash = $content_hash
+        MERGE (k)-[:HAS_BAB]->(b)
+    """, source_name=source_name, kitab_name=kitab_name, bab_name=bab_name, embedding=embedding,
+        content_hash=content_hash(bab_text(kitab_name, bab_name)))
+
+def write_hadith(tx, hadith, source_name, kitab_name, bab_name):
+    write_unit(tx, hadith["unit"], hadith["chunks"], BAB_ANCHOR,
+               {"bab_name": bab_name, "kitab_name": kitab_name, "source_name": source_name})
+
+# =====================================================================
+# == BUILD PENUH ==
+# =====================================================================
+def ensure_hadith_source(source_name, session):
+    """Membuat node puncak :Hadis dan node :HadithSource untuk satu koleksi."""
     # 1. Pastikan Node Puncak :Hadis ada
     session.run("MERGE (:Hadis {name: 'Hadis'})")
 
@@ -39,291 +332,89 @@ def process_hadith_source(data, source_name, session):
         MERGE (s:HadithSource {name: $source_name})
         MERGE (h_root)-[:HAS_SOURCE]->(s)
     """, source_name=source_name)
-    print(f"✅ Node Sumber '{source_name}' berhasil di-MERGE.")
-
-    for kitab_item in data:
-        kitab_name = kitab_item['kitab']
-        kitab_embedding = embed_chunk(f"Kitab {kitab_name} dari {source_name}")
-
-        # 3. Buat Node :Kitab dengan embedding
-        # Kita tidak membuat ini sebagai Chunk agar modelnya bersih
-        session.run("""
-            MATCH (s:HadithSource {name: $source_name})
-            MERGE (k:Kitab {name: $kitab_name, source_name: $source_name})
-            SET k.embedding = $embedding
-            MERGE (s)-[:HAS_KITAB]->(k)
-        """, source_name=source_name, kitab_name=kitab_name, embedding=kitab_embedding)
-        print(f"  [+] Kitab '{kitab_name}' dari {source_name} di-MERGE.")
-
-        for bab_item in kitab_item['bab']:
-            bab_name = bab_item['bab']
-            bab_embedding = embed_chunk(f"Bab tentang '{bab_name}' dalam Kitab {kitab_name}.")
-
-            # 4. Buat Node :Bab dengan embedding
-            session.run("""
-                MATCH (k:Kitab {name: $kitab_name, source_name: $source_name})
-                MERGE (b:Bab {name: $bab_name, kitab_name: $kitab_name, source_name: $source_name})
-                SET b.embedding = $embedding
-                MERGE (k)-[:HAS_BAB]->(b)
-            """, source_name=source_name, kitab_name=kitab_name, bab_name=bab_name, embedding=bab_embedding)
-
-            for hadith_item in bab_item['hadiths']:
-                tx = session.begin_transaction()
-                try:
-                    hadith_number = hadith_item['hadith_number']
-                    arabic_text = hadith_item.get('arabic_text', "")
-                    translation_text = hadith_item.get('translation', "")
-
-                    # 5. Buat rantai CHUNK untuk setiap Hadis, mirip struktur Al-Quran
-                    
-                    # 5.1. Buat Chunk 'info'
-                    info_id = str(uuid4())
-                    info_text = (
-                        f"[INFO {source_name} No. {hadith_number}] "
-                        f"Konteks hadis dari Kitab {kitab_name}, Bab tentang '{bab_name}'."
-                    )
-                    info_embedding = embed_chunk(info_text)
-                    
-                    tx.run("""
-                        MATCH (b:Bab {name: $bab_name, kitab_name: $kitab_name, source_name: $source_name})
-                        CREATE (c_info:Chunk {
-                            id: $id,
-                            text: $text,
-                            embedding: $embedding,
-                            source: 'info',
-                            hadith_number: $hadith_number,
-                            source_name: $source_name,
-                            kitab_name: $kitab_name,
-                            bab_name: $bab_name
-                        })
-                        CREATE (b)-[:CONTAINS_HADITH_CHUNK]->(c_info)
-                    """, {
-                        "id": info_id, "text": info_text, "embedding": info_embedding,
-                        "hadith_number": hadith_number, "source_name": source_name,
-                        "kitab_name": kitab_name, "bab_name": bab_name
-                    })
-
-                    # 5.2. Buat Chunk 'text' (Arab) dan hubungkan dari 'info'
-                    parent_chunk_id = info_id
-                    if arabic_text:
-                        text_id = str(uuid4())
-                        chunk_arab_text = f"[Teks Arab {source_name} No. {hadith_number}]: {arabic_text}"
-                        embedding_arab = embed_chunk(chunk_arab_text)
-                        
-                        tx.run("""
-                            MATCH (c_info:Chunk {id: $parent_id})
-                            CREATE (c_text:Chunk {
-                                id: $id, text: $text, embedding: $embedding, source: 'text',
-                                hadith_number: $hadith_number, source_name: $source_name
-                            })
-                            CREATE (c_info)-[:HAS_CHUNK]->(c_text)
-                        """, {
-                            "id": text_id, "parent_id": parent_chunk_id,
-                            "text": chunk_arab_text, "embedding": embedding_arab,
-                            "hadith_number": hadith_number, "source_name": source_name
-                        })
-                        parent_chunk_id = text_id # Update parent untuk terjemahan
-
-                    # 5.3. Buat Chunk 'translation' dan hubungkan dari 'text'
-                    if translation_text:
-                        trans_id = str(uuid4())
-                        chunk_trans_text = f"[Terjemahan {source_name} No. {hadith_number}]: {translation_text}"
-                        embedding_trans = embed_chunk(chunk_trans_text)
-                        
-                        tx.run("""
-                            MATCH (c_parent:Chunk {id: $parent_id})
-                            CREATE (c_trans:Chunk {
-                                id: $id, text: $text, embedding: $embedding, source: 'translation',
-                                hadith_number: $hadith_number, source_name: $source_name
-                            })
-                            CREATE (c_parent)-[:HAS_CHUNK]->(c_trans)
-                        """, {
-                            "id": trans_id, "parent_id": parent_chunk_id,
-                            "text": chunk_trans_text, "embedding": embedding_trans,
-                            "hadith_number": hadith_number, "source_name": source_name
-                        })
-                    
-                    tx.commit()
-                except Exception as e:
-                    print(f"      ❌ Gagal memproses hadis #{hadith_item.get('hadith_number')}. Rollback. Error: {e}")
-                    tx.rollback()
 
-def process_surah_chunks(surah, session):
-    # KODE ANDA UNTUK SURAH DI SINI (TIDAK PERLU DIUBAH)
-    # ... (biarkan fungsi ini seperti adanya) ...
-    from uuid import uuid4
-    from process_data.embedding import embed_chunk
+def prepare_hadith_bab(source_name, kitab_name, bab_item, new_kitab, units):
+    """
+    Tahap embedding (tanpa akses database) untuk satu bab, agar bisa berjalan paralel
+    di worker embedding sementara writer menulis bab sebelumnya.
+    - Embedding Kitab hanya dihitung untuk bab pertama kitab tersebut (new_kitab).
+    - units: nama unit setiap hadis (dari hadith_units, ditentukan berurutan oleh pembaca).
+    - Hadis yang gagal di-embed ditandai dengan 'error' dan dilewati writer.
+    """
+    bab_name = bab_item['bab']
+    prepared = {
+        "kitab_name": kitab_name,
+        "kitab_embedding": embed_chunk(kitab_text(source_name, kitab_name)) if new_kitab else None,
+        "bab_name": bab_name,
+        "bab_embedding": embed_chunk(bab_text(kitab_name, bab_name)),
+        "hadiths": [],
+    }
 
-    surah_id = int(surah["number"])
-    surah_name = surah["name"]
-    surah_name_latin = surah["name_latin"]
-    number_of_ayah = int(surah["number_of_ayah"])
-
-    # Insert Surah node
-    session.run(
-        """
-        MATCH (q:Quran {name: 'Al-Quran'})
-        CREATE (s:Surah {
-            number: $number,
-            name: $name,
-            name_latin: $name_latin,
-            number_of_ayah: $number_of_ayah
-        })
-        CREATE (q)-[:HAS_SURAH]->(s)
-        """, {
-            "number": surah_id,
-            "name": surah_name,
-            "name_latin": surah_name_latin,
-            "number_of_ayah": number_of_ayah
-        }
-    )
+    for unit, hadith_item in zip(units, bab_item['hadiths']):
+        try:
+            hadith = build_hadith(unit, source_name, kitab_name, bab_name, hadith_item)
+            for chunk in hadith["chunks"]:
+                chunk["embedding"] = embed_chunk(chunk["text"], chunk["key"])
+        except Exception as e:
+            hadith = {"unit": unit, "hadith_number": hadith_item.get('hadith_number'), "error": str(e)}
+        prepared["hadiths"].append(hadith)
+    return prepared
+
+def write_hadith_bab(prepared, source_name, session, on_hadith=None):
+    """
+    Menulis satu bab hasil prepare_hadith_bab ke Neo4j.
+    - Node :Kitab di-MERGE jika bab ini membawa embedding kitab, lalu node :Bab.
+    - Setiap hadis ditulis dalam transaksinya sendiri (rollback per hadis jika gagal).
+    - on_hadith(ok) dipanggil setelah setiap hadis (untuk progress).
+    Mengembalikan jumlah hadis yang gagal.
+    """
+    kitab_name = prepared["kitab_name"]
+    bab_name = prepared["bab_name"]
+
+    # 3. Node :Kitab dan 4. Node :Bab dengan embedding
+    if prepared["kitab_embedding"] is not None:
+        write_kitab(session, source_name, kitab_name, prepared["kitab_embedding"])
+    write_bab(session, source_name, kitab_name, bab_name, prepared["bab_embedding"])
+
+    failures = 0
+    for hadith in prepared["hadiths"]:
+        ok = "error" not in hadith
+        if ok:
+            # 5. Rantai CHUNK untuk setiap Hadis, mirip struktur Al-Quran
+            tx = session.begin_transaction()
+            try:
+                write_hadith(tx, hadith, source_name, kitab_name, bab_name)
+                tx.commit()
+            except Exception as e:
+                hadith["error"] = str(e)
+                ok = False
+                tx.rollback()
+
+        if not ok:
+            failures += 1
+            tqdm.write(f"      ❌ Gagal memproses hadis #{hadith['hadith_number']} ({source_name}). Rollback. Error: {hadith['error']}")
+        if on_hadith is not None:
+            on_hadith(ok)
+    return failures
+
+def process_surah_chunks(surah, session):
+    """Menulis satu surah beserta semua ayat dan chunk-nya (embedding dihitung ulang)."""
+    write_surah(session, surah_properties(surah))
 
     for ayah_key, ayah_text in surah["text"].items():
         try:
-            ayah_num = extract_ayah_number(ayah_key)
+            ayah = build_ayah(surah, ayah_key, ayah_text)
         except ValueError as e:
             print(str(e))
             continue
 
-        translation = surah.get("translations", {}).get("id", {}).get("text", {}).get(ayah_key, "")
-        tafsir = surah.get("tafsir", {}).get("id", {}).get("kemenag", {}).get("text", {}).get(ayah_key, "")
-
-        # Insert Ayat node
-        session.run(
-            """
-            MATCH (s:Surah {number: $surah_number})
-            CREATE (a:Ayat {
-                number: $number,
-                text: $text,
-                translation: $translation,
-                tafsir: $tafsir
-            })
-            CREATE (s)-[:HAS_AYAT]->(a)
-            """, {
-                "surah_number": surah_id,
-                "number": ayah_num,
-                "text": ayah_text,
-                "translation": translation,
-                "tafsir": tafsir
-            }
-        )
-
-        # === 1. Chunk Info Surah ===
-        info_text = f"[INFO {surah_name_latin}:{ayah_num}] Surah {surah_name_latin} Ayat {ayah_num}"
-        info_embedding = embed_chunk(info_text)
-        info_id = str(uuid4())
-
-        session.run(
-            """
-            MATCH (s:Surah {number: $surah_number})-[:HAS_AYAT]->(a:Ayat {number: $ayat_number})
-            CREATE (c_info:Chunk {
-                id: $id,
-                text: $text,
-                embedding: $embedding,
-                source: 'info',
-                ayat_number: $ayat_number,
-                surah_name: $surah_name_latin,
-                surah_number: $surah_id
-            })
-            CREATE (a)-[:HAS_CHUNK]->(c_info)
-            """, {
-                "id": info_id,
-                "text": info_text,
-                "embedding": info_embedding,
-                "ayat_number": ayah_num,
-                "surah_number": surah_id
-            }
-        )
-        parent_chunk_id = info_id
-        text_id = info_id
-
-        # === 2. Chunk Text ===
-        if ayah_text.strip():
-            for chunk in chunk_text(ayah_text):
-                chunk_text_full = f"[text {surah_name_latin}:{ayah_num}] {chunk}"
-                text_embedding = embed_chunk(chunk_text_full)
-                text_id = str(uuid4())
-
-                session.run(
-                    """
-                    MATCH (c_info:Chunk {id: $parent_id})
-                    CREATE (c_text:Chunk {
-                        id: $id,
-                        text: $text,
-                        embedding: $embedding,
-                        source: 'text',
-                        ayat_number: $ayat_number,
-                        surah_name: $surah_name_latin,
-                        surah_number: $surah_id
-                    })
-                    CREATE (c_info)-[:HAS_CHUNK]->(c_text)
-                    """, {
-                        "id": text_id,
-                        "parent_id": parent_chunk_id,
-                        "text": chunk_text_full,
-                        "embedding": text_embedding,
-                        "ayat_number": ayah_num,
-                        "surah_number": surah_id
-                    }
-                )
-                parent_chunk_id = text_id
-        # === 3. Chunk Translation ===
-        if translation.strip():
-            for t_chunk in chunk_text(translation):
-                chunk_trans_full = f"[translation {surah_name_latin}:{ayah_num}] {t_chunk}"
-                trans_embedding = embed_chunk(chunk_trans_full)
-                trans_id = str(uuid4())
-
-                session.run(
-                    """
-                    MATCH (c_text:Chunk {id: $parent_id})
-                    CREATE (c_trans:Chunk {
-                        id: $id,
-                        text: $text,
-                        embedding: $embedding,
-                        source: 'translation',
-                        ayat_number: $ayat_number,
-                        surah_name: $surah_name_latin,
-                        surah_number: $surah_id
-                    })
-                    CREATE (c_text)-[:HAS_CHUNK]->(c_trans)
-                    """, {
-                        "id": trans_id,
-                        "parent_id": parent_chunk_id,
-                        "text": chunk_trans_full,
-                        "embedding": trans_embedding,
-                        "ayat_number": ayah_num,
-                        "surah_number": surah_id
-                    }
-                )
-                parent_chunk_id = trans_id
-
-        # === 4. Chunk Tafsir ===
-        if tafsir.strip():
-            for taf_chunk in chunk_text(tafsir):
-                chunk_taf_full = f"[tafsir {surah_name_latin}:{ayah_num}] {taf_chunk}"
-                taf_embedding = embed_chunk(chunk_taf_full)
-                taf_id = str(uuid4())
-
-                session.run(
-                    """
-                    MATCH (c_trans:Chunk {id: $parent_id})
-                    CREATE (c_tafsir:Chunk {
-                        id: $id,
-                        text: $text,
-                        embedding: $embedding,
-                        source: 'tafsir',
-                        ayat_number: $ayat_number,
-                        surah_name: $surah_name_latin,
-                        surah_number: $surah_id
-                    })
-                    CREATE (c_trans)-[:HAS_CHUNK]->(c_tafsir)
-                    """, {
-                        "id": taf_id,
-                        "parent_id": parent_chunk_id,
-                        "text": chunk_taf_full,
-                        "embedding": taf_embedding,
-                        "ayat_number": ayah_num,
-                        "surah_number": surah_id
-                    }
-                )
\ No newline at end of file
+        for chunk in ayah["chunks"]:
+            chunk["embedding"] = embed_chunk(chunk["text"], chunk["key"])
+
+        tx = session.begin_transaction()
+        try:
+            write_ayah(tx, ayah)
+            tx.commit()
+        except Exception:
+            tx.rollback()
+            raise
@@ -1,34 +1,71 @@
 # process_data/data_loader.py
 """
-Module to handle loading of Quran data from JSON file.
+Module to stream Quran and Hadith data from JSON files.
+
+Files are parsed incrementally with ijson, so only one surah or one bab is held
+in memory at a time regardless of how large (or how many) the collections are.
 """
 
-import json
+import ijson
+
+# Jumlah ayat dalam quran.json, untuk progress bar dan validasi build (lihat versions.py)
+QURAN_AYAT_COUNT = 6236
 
-def load_quran_data(filepath):
+def iter_quran_surahs(filepath):
     """
-    Load and parse JSON file containing Quran data.
+    Stream surahs from a Quran JSON file (a top-level list of surah objects).
 
     Args:
         filepath (str): Path to the JSON file.
 
     Returns:
-        list: Parsed JSON data.
+        iterator: One surah dict at a time.
+
+    Raises:
+        FileNotFoundError: Immediately, not on the first iteration.
     """
-    with open(filepath, "r", encoding="utf-8") as file:
-        return json.load(file)
-    
-def load_hadith_data(filepath):
+    file = open(filepath, "rb")
+    return _iter_quran_surahs(file)
+
+def _iter_quran_surahs(file):
+    with file:
+        yield from ijson.items(file, "item", use_float=True)
+
+def iter_hadith_babs(filepath):
     """
-    Load and parse JSON file containing Hadith data.
+    Stream babs from a Hadith JSON file with the structure
+    [{"kitab": ..., "bab": [{"bab": ..., "hadiths": [...]}, ...]}, ...].
+
+    The "kitab" key must come before its "bab" list, as in the scraped source files.
 
     Args:
         filepath (str): Path to the JSON file.
 
     Returns:
-        list: Parsed JSON data.
-    """
-    with open(filepath, "r", encoding="utf-8") as file:
-        return json.load(file)
+        iterator: (kitab_name, bab_item) tuples, one bab (with its hadiths) at a time.
 
+    Raises:
+        FileNotFoundError: Immediately, not on the first iteration.
+    """
+    file = open(filepath, "rb")
+    return _iter_hadith_babs(file)
 
+def _iter_hadith_babs(file):
+    kitab_name = None
+    builder = None
+    with file:
+        for prefix, event, value in ijson.parse(file, use_float=True):
+            if builder is not None:
+                builder.event(event, value)
+                if prefix == "item.bab.item" and event == "end_map":
+                    yield kitab_name, builder.value
+                    builder = None
+            elif prefix == "item.bab.item" and event == "start_map":
+                if kitab_name is None:
+                    raise ValueError("❌ Bab ditemukan sebelum nama kitab-nya di file hadis.")
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+            elif prefix == "item" and event == "start_map":
+                kitab_name = None
+            elif prefix == "item.kitab":
+                kitab_name = value
@@ -1,17 +1,49 @@
 # process_data/embedding.py
 """
 Module for embedding text using a predefined embedding model.
+
+When an embedding store is open (see embedding_store.py), texts that were embedded
+before by the same model are read from it instead of calling the model, and new
+embeddings are added to it.
 """
 
 from Backend.config import DIMENSION
-from Backend.groq_embedder import Embedder
+from Backend.groq_embedder import get_embedder
+from process_data.embedding_store import EMBEDDING_STORE, EmbeddingStore, content_hash
+
+_store = None
+
+def set_embedding_store(store):
+    global _store
+    _store = store
+
+def open_embedding_store():
+    """
+    Open the store for the current embedder model and use it in embed_chunk.
 
-def embed_chunk(text):
+    Returns:
+        EmbeddingStore | None: The store (call save() when ingestion ends), or None
+        if EMBEDDING_STORE is disabled.
+    """
+    if not EMBEDDING_STORE:
+        return None
+    store = EmbeddingStore(get_embedder().model)
+    set_embedding_store(store)
+    print(f"📦 Store embedding {store.path}: {len(store)} embedding tersedia.")
+    return store
+
+def checkpoint_embedding_store():
+    """Simpan embedding baru secara berkala selama ingestion (lihat EmbeddingStore.checkpoint)."""
+    if _store is not None:
+        _store.checkpoint()
+
+def embed_chunk(text, key=None):
     """
     Generate a semantic embedding vector from given text.
 
     Args:
         text (str): Text to be embedded.
+        key (str): Optional chunk key, recorded in the embedding store.
 
     Returns:
         list: Embedding vector.
@@ -19,7 +51,18 @@ def embed_chunk(text):
     Raises:
         ValueError: If the embedding result is invalid.
     """
-    vector = Embedder.embed_text(text)
+    store = _store
+    digest = content_hash(text) if store is not None else None
+    if store is not None:
+        vector = store.get(digest)
+        if vector is not None:
+            if key is not None:
+                store.set_key(key, digest)
+            return vector
+
+    vector = get_embedder().embed_text(text)
     if not isinstance(vector, list) or len(vector) != DIMENSION:
         raise ValueError("❌ Invalid embedding vector")
+    if store is not None:
+        store.add(digest, vector, key)
     return vector
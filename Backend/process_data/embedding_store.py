@@ -0,0 +1,303 @@
+# process_data/embedding_store.py
+"""
+Embedding artifact store, independent of Neo4j: every embedding computed during
+ingestion is also kept on disk, so rebuilding the graph, changing the schema or
+moving to another vector backend does not call the embedding model again.
+
+One directory per embedding model under EMBEDDING_STORE_DIR:
+
+    <model>/manifest.json    model, dimension, dtype, row count
+    <model>/embeddings.npy   (rows x dimension) float32 or float16, opened with mmap
+    <model>/hashes.txt       content_hash (sha256 of the text) of each row, in row order
+    <model>/keys.tsv         chunk key <TAB> content_hash
+
+Rows are keyed by content hash, so identical text is embedded once and a changed
+chunk gets a new row. embed_chunk (embedding.py) looks texts up here first.
+
+    python -m process_data.embedding_store info
+    python -m process_data.embedding_store dump --database <db>    # graf -> store, tanpa model
+    python -m process_data.embedding_store load --database <db>    # store -> graf, tanpa model
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+import numpy as np
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+# Root repo juga, untuk Backend.config saat dijalankan dari folder Backend
+sys.path.insert(1, os.path.dirname(project_root))
+
+from Backend.config import DIMENSION, NEO4J_DATABASE, get_driver
+from tqdm import tqdm
+
+EMBEDDING_STORE = os.getenv("EMBEDDING_STORE", "1") == "1"
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", os.path.join(project_root, "embeddings"))
+# float16 menghemat separuh ruang disk dengan selisih cosine yang bisa diabaikan
+EMBEDDING_STORE_DTYPE = os.getenv("EMBEDDING_STORE_DTYPE", "float32")
+# checkpoint() menyimpan baris baru paling cepat setiap sekian detik, agar build yang
+# crash di tengah jalan tidak kehilangan embedding berjam-jam (save() menulis ulang seluruh file)
+EMBEDDING_STORE_SAVE_INTERVAL = float(os.getenv("EMBEDDING_STORE_SAVE_INTERVAL", "300"))
+STORE_FORMAT_VERSION = 1
+LOAD_BATCH_SIZE = 500
+# Label yang menyimpan embedding dan content_hash di graf
+EMBEDDED_LABELS = ("Chunk", "Kitab", "Bab")
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def model_slug(model):
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", model)
+
+def stored_models(root=EMBEDDING_STORE_DIR):
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root) if os.path.isfile(os.path.join(root, name, "manifest.json")))
+
+class EmbeddingStore:
+    """
+    Store satu model. Baris lama dibaca lewat mmap, baris baru ditampung di memori
+    sampai save(). Aman dipakai dari beberapa thread embedding sekaligus.
+    """
+
+    def __init__(self, model, root=EMBEDDING_STORE_DIR, dtype=EMBEDDING_STORE_DTYPE, dimension=DIMENSION):
+        self.model = model
+        self.path = os.path.join(root, model_slug(model))
+        self.dtype = np.dtype(dtype)
+        self.dimension = dimension
+        self.matrix = None
+        self.hashes = []
+        self.rows = {}
+        self.keys = {}
+        self._new_vectors = []
+        self._keys_changed = False
+        self._lock = threading.Lock()
+        self._normalized = None
+        self._last_save = time.monotonic()
+
+        manifest = self.manifest()
+        if manifest:
+            if manifest["dimension"] != dimension:
+                raise ValueError(f"❌ Store {self.path} berdimensi {manifest['dimension']}, konfigurasi {dimension}")
+            self.dtype = np.dtype(manifest["dtype"])
+            self.matrix = np.load(self._file("embeddings.npy"), mmap_mode="r")
+            with open(self._file("hashes.txt"), encoding="utf-8") as file:
+                self.hashes = file.read().split()
+            with open(self._file("keys.tsv"), encoding="utf-8") as file:
+                self.keys = dict(line.rstrip("\n").split("\t") for line in file if line.strip())
+            if len(self.hashes) != len(self.matrix):
+                raise ValueError(f"❌ Store {self.path} rusak: {len(self.hashes)} hash untuk {len(self.matrix)} baris")
+            self.rows = {digest: row for row, digest in enumerate(self.hashes)}
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def manifest(self):
+        try:
+            with open(self._file("manifest.json"), encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def get(self, digest):
+        """Vektor (list float) untuk sebuah content_hash, atau None."""
+        # Dibaca di bawah lock: add() dan save() mengubah rows, _new_vectors dan matrix bersamaan
+        with self._lock:
+            row = self.rows.get(digest)
+            if row is None:
+                return None
+            saved = 0 if self.matrix is None else len(self.matrix)
+            vector = self.matrix[row] if row < saved else self._new_vectors[row - saved]
+            return vector.astype(np.float32).tolist()
+
+    def add(self, digest, vector, key=None):
+        with self._lock:
+            if digest not in self.rows:
+                if len(vector) != self.dimension:
+                    raise ValueError(f"❌ Embedding berdimensi {len(vector)}, store {self.dimension}")
+                self.hashes.append(digest)
+                self._new_vectors.append(np.asarray(vector, dtype=self.dtype))
+                self.rows[digest] = len(self.hashes) - 1
+            if key is not None:
+                self._set_key(key, digest)
+
+    def set_key(self, key, digest):
+        with self._lock:
+            self._set_key(key, digest)
+
+    def _set_key(self, key, digest):
+        if self.keys.get(key) != digest:
+            self.keys[key] = digest
+            self._keys_changed = True
+
+    def save(self):
+        """Menulis baris baru; file diganti secara atomik dan manifest ditulis terakhir."""
+        with self._lock:
+            self._save_locked()
+
+    def _save_locked(self):
+        # Dipanggil dengan self._lock sudah dipegang (save() dan checkpoint())
+        if not self._new_vectors and not self._keys_changed:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        existing = 0 if self.matrix is None else len(self.matrix)
+        tmp = self._file("embeddings.npy.tmp")
+        matrix = np.lib.format.open_memmap(tmp, mode="w+", dtype=self.dtype, shape=(len(self.hashes), self.dimension))
+        if existing:
+            matrix[:existing] = self.matrix
+        if self._new_vectors:
+            matrix[existing:] = np.stack(self._new_vectors)
+        matrix.flush()
+        del matrix
+        os.replace(tmp, self._file("embeddings.npy"))
+        self._write_text("hashes.txt", "".join(f"{digest}\n" for digest in self.hashes))
+        self._write_text("keys.tsv", "".join(f"{key}\t{digest}\n" for key, digest in sorted(self.keys.items())))
+        self._write_text("manifest.json", json.dumps({
+            "format": STORE_FORMAT_VERSION,
+            "model": self.model,
+            "dimension": self.dimension,
+            "dtype": self.dtype.name,
+            "rows": len(self.hashes),
+            "keys": len(self.keys),
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        }, indent=2))
+        self.matrix = np.load(self._file("embeddings.npy"), mmap_mode="r")
+        self._new_vectors = []
+        self._keys_changed = False
+        self._normalized = None
+        self._last_save = time.monotonic()
+
+    def checkpoint(self, interval=EMBEDDING_STORE_SAVE_INTERVAL):
+        """save() jika ada baris baru dan save terakhir sudah lebih dari `interval` detik lalu."""
+        with self._lock:
+            if self._new_vectors and time.monotonic() - self._last_save >= interval:
+                self._save_locked()
+
+    def _write_text(self, name, content):
+        tmp = self._file(name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as file:
+            file.write(content)
+        os.replace(tmp, self._file(name))
+
+    def search(self, vector, top_k=10):
+        """
+        Indeks lokal sederhana (cosine, brute force) atas baris yang sudah di-save.
+        Mengembalikan [(chunk_keys, content_hash, score)], urut dari skor tertinggi.
+        """
+        # Snapshot di bawah lock: save() mengganti matrix dan add() menambah hashes bersamaan
+        with self._lock:
+            if self.matrix is None or not len(self.matrix):
+                return []
+            if self._normalized is None:
+                matrix = np.asarray(self.matrix, dtype=np.float32)
+                self._normalized = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+                by_hash = {}
+                for key, digest in self.keys.items():
+                    by_hash.setdefault(digest, []).append(key)
+                self._keys_by_hash = by_hash
+            normalized, keys_by_hash = self._normalized, self._keys_by_hash
+            hashes = self.hashes[:len(normalized)]
+        query = np.asarray(vector, dtype=np.float32)
+        scores = normalized @ (query / max(np.linalg.norm(query), 1e-12))
+        top = np.argsort(-scores)[:top_k]
+        return [(keys_by_hash.get(hashes[row], []), hashes[row], float(scores[row])) for row in top]
+
+def dump_from_neo4j(store, session):
+    """Menyalin embedding yang sudah ada di graf ke store (tanpa memanggil model)."""
+    added = 0
+    for label in EMBEDDED_LABELS:
+        result = session.run(f"""
+            MATCH (n:{label}) WHERE n.embedding IS NOT NULL
+            RETURN n.key AS key, n.content_hash AS content_hash,
+                   CASE WHEN n.content_hash IS NULL THEN n.text END AS text, n.embedding AS embedding
+        """)
+        for record in tqdm(result, desc=f"Dump :{label}", unit="node"):
+            digest = record["content_hash"] or (content_hash(record["text"]) if record["text"] else None)
+            if digest is None:
+                continue
+            before = len(store)
+            store.add(digest, record["embedding"], record["key"])
+            added += len(store) - before
+    store.save()
+    return added
+
+def load_into_neo4j(store, session, overwrite=False, batch_size=LOAD_BATCH_SIZE):
+    """
+    Mengisi embedding node di graf dari store berdasarkan content_hash (tanpa memanggil model).
+    Mengembalikan (jumlah node diisi, jumlah node yang hash-nya tidak ada di store).
+    """
+    loaded = missing = 0
+    for label in EMBEDDED_LABELS:
+        targets = [(record["id"], record["content_hash"]) for record in session.run(f"""
+            MATCH (n:{label}) WHERE n.content_hash IS NOT NULL AND ($overwrite OR n.embedding IS NULL)
+            RETURN elementId(n) AS id, n.content_hash AS content_hash
+        """, overwrite=overwrite)]
+        progress = tqdm(total=len(targets), desc=f"Load :{label}", unit="node")
+        for start in range(0, len(targets), batch_size):
+            rows = []
+            for element_id, digest in targets[start:start + batch_size]:
+                vector = store.get(digest)
+                if vector is None:
+                    missing += 1
+                else:
+                    rows.append({"id": element_id, "embedding": vector})
+            session.run("""
+                UNWIND $rows AS row
+                MATCH (n) WHERE elementId(n) = row.id
+                SET n.embedding = row.embedding
+            """, rows=rows).consume()
+            loaded += len(rows)
+            progress.update(min(batch_size, len(targets) - start))
+        progress.close()
+    return loaded, missing
+
+def _resolve_model(model, root=EMBEDDING_STORE_DIR):
+    if model:
+        return model
+    models = stored_models(root)
+    if len(models) != 1:
+        raise ValueError(f"❌ Pilih model dengan --model (tersedia: {', '.join(models) or '-'})")
+    with open(os.path.join(root, models[0], "manifest.json"), encoding="utf-8") as file:
+        return json.load(file)["model"]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kelola store artefak embedding")
+    parser.add_argument("command", choices=["info", "dump", "load"])
+    parser.add_argument("--model", help="Nama model embedding (default: satu-satunya model di store)")
+    parser.add_argument("--database", default=NEO4J_DATABASE, help="Database Neo4j (default: NEO4J_DATABASE)")
+    parser.add_argument("--overwrite", action="store_true", help="load: timpa embedding yang sudah ada")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "info":
+            for name in stored_models():
+                with open(os.path.join(EMBEDDING_STORE_DIR, name, "manifest.json"), encoding="utf-8") as file:
+                    store = EmbeddingStore(json.load(file)["model"])
+                print(f"{store.model}: {len(store)} embedding {store.dtype.name}, {len(store.keys)} chunk key ({store.path})")
+            sys.exit(0)
+
+        if args.command == "dump" and not args.model:
+            from Backend.groq_embedder import get_embedder
+            args.model = get_embedder().model
+        store = EmbeddingStore(_resolve_model(args.model))
+        with get_driver().session(database=args.database) as session:
+            if args.command == "dump":
+                print(f"✅ {dump_from_neo4j(store, session)} embedding baru disimpan ke {store.path}")
+            else:
+                loaded, missing = load_into_neo4j(store, session, args.overwrite)
+                print(f"✅ {loaded} node diisi dari {store.path}, {missing} node tanpa embedding di store")
+    except ValueError as e:
+        print(str(e))
+        sys.exit(1)
+    finally:
+        if args.command != "info":
+            get_driver().close()
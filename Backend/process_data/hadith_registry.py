@@ -0,0 +1,62 @@
+# process_data/hadith_registry.py
+"""
+Registry of hadith collections to ingest, read from a JSON config file
+(default: process_data/hadith_sources.json, override with HADITH_SOURCES_FILE).
+
+Adding a collection means adding one entry; insert_data.py can then ingest it
+alone with --only "<name>" without touching the other collections.
+"""
+
+import json
+import os
+from dataclasses import dataclass
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+HADITH_SOURCES_FILE = os.getenv("HADITH_SOURCES_FILE", os.path.join(os.path.dirname(__file__), 'hadith_sources.json'))
+
+@dataclass
+class HadithCollection:
+    name: str          # Nama sumber, disimpan sebagai source_name di graf
+    path: str          # Path absolut ke file JSON koleksi
+    enabled: bool = True
+
+def load_hadith_registry(filepath=HADITH_SOURCES_FILE):
+    """
+    Load the collection registry.
+
+    Args:
+        filepath (str): Path to the registry JSON file.
+
+    Returns:
+        list[HadithCollection]: Collections in file order.
+
+    Raises:
+        ValueError: If an entry is missing "name"/"file" or a name is duplicated.
+    """
+    with open(filepath, "r", encoding="utf-8") as file:
+        entries = json.load(file)["collections"]
+
+    collections = []
+    for entry in entries:
+        if not entry.get("name") or not entry.get("file"):
+            raise ValueError(f"❌ Entri koleksi hadis tidak lengkap di {filepath}: {entry}")
+        if any(c.name == entry["name"] for c in collections):
+            raise ValueError(f"❌ Nama koleksi hadis ganda di {filepath}: {entry['name']}")
+        collections.append(HadithCollection(
+            name=entry["name"],
+            path=os.path.join(BACKEND_DIR, entry["file"]),
+            enabled=entry.get("enabled", True),
+        ))
+    return collections
+
+def select_collections(collections, only=None):
+    """
+    Pick the collections to ingest: the named ones (even if disabled) when `only`
+    is given, otherwise every enabled collection.
+    """
+    if not only:
+        return [c for c in collections if c.enabled]
+    unknown = set(only) - {c.name for c in collections}
+    if unknown:
+        raise ValueError(f"❌ Koleksi tidak ada di registry: {', '.join(sorted(unknown))}")
+    return [c for c in collections if c.name in only]
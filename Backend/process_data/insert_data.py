@@ -1,62 +1,200 @@
 # process_data/insert_data.py
 """
 Script to insert Quran, Surah, Ayat, and Chunk embeddings into Neo4j.
+
+Dijalankan dari folder Backend. Koleksi hadis dibaca dari registry
+(process_data/hadith_sources.json) dan dimuat bersamaan, misalnya untuk menambah
+atau memuat ulang satu koleksi saja:
+
+    python -m process_data.insert_data --only "Shahih Bukhari" --replace
+
+Dengan --sync hanya perubahan yang ditulis (lihat sync.py), tanpa menghapus graf:
+
+    python -m process_data.insert_data --sync --dry-run
+
+Dengan --version build penuh ditulis ke database baru sementara backend tetap melayani
+versi aktif, relasi RELATED_TO dihitung di database itu (knn.py), lalu dialihkan
+setelah lolos validasi (lihat versions.py):
+
+    python -m process_data.insert_data --version 20261019 --activate
 """
+import argparse
 import os
 import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Determine the project root directory
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, project_root)
+# Root repo juga, untuk Backend.config dan knn.py saat dijalankan dari folder Backend
+sys.path.insert(1, os.path.dirname(project_root))
 
-from process_data.data_loader import load_quran_data, load_hadith_data
-from process_data.chunking import process_surah_chunks, process_hadith_source
-from Backend.config import driver
+from process_data.data_loader import QURAN_AYAT_COUNT, iter_quran_surahs, iter_hadith_babs
+from process_data.chunking import (process_surah_chunks, ensure_hadith_source, ensure_chunk_key_index,
+                                   hadith_units, prepare_hadith_bab, write_hadith_bab)
+from process_data.hadith_registry import HADITH_SOURCES_FILE, load_hadith_registry, select_collections
+from process_data.reset import delete_nodes, reset_graph, vector_index_suspended
+from process_data.embedding import checkpoint_embedding_store, open_embedding_store
+from process_data.sync import sync_quran, sync_hadith_collection
+from process_data.versions import create_version_database, database_name, switch_version, validate_version
+from Backend.config import NEO4J_DATABASE, get_driver
+from knn import QuranRelator, build_related
 from tqdm import tqdm
 
-def insert_all_hadith_sources():
+# Jumlah koleksi hadis yang diproses bersamaan, dan worker embedding per koleksi.
+# Panggilan ke Ollama tetap dibatasi OLLAMA_MAX_CONCURRENCY (lihat upstream.py).
+HADITH_WORKERS = int(os.getenv("HADITH_WORKERS", "2"))
+HADITH_EMBED_WORKERS = int(os.getenv("HADITH_EMBED_WORKERS", "4"))
+
+# Database tujuan ingestion; --version mengarahkannya ke database build baru
+target_database = NEO4J_DATABASE
+
+def _session():
+    return get_driver().session(database=target_database)
+
+def hadith_source_exists(session, source_name):
+    record = session.run(
+        "MATCH (s:HadithSource {name: $source_name}) RETURN count(s) > 0 AS exists", source_name=source_name
+    ).single()
+    return record["exists"]
+
+def delete_hadith_source(session, source_name):
+    """
+    Menghapus subgraf satu koleksi (Chunk, Bab, Kitab, HadithSource) dalam batch.
+    Al-Quran dan koleksi lain tidak tersentuh karena semuanya difilter pada source_name.
     """
-    Memuat semua sumber data Hadis yang terdefinisi dan membangun graf
-    hirarkis di Neo4j untuk masing-masing sumber.
+    for label in ("Chunk", "Bab", "Kitab"):
+        delete_nodes(session, f"MATCH (n:{label} {{source_name: $source_name}})", {"source_name": source_name},
+                     desc=f"Menghapus :{label} {source_name}")
+    session.run("MATCH (s:HadithSource {name: $source_name}) DETACH DELETE s", source_name=source_name)
+
+def _prepare_in_order(babs, source_name, executor, window):
     """
-    hadith_sources_to_process = {
-        # Nama Sumber     : Path ke file JSON
-        "Shahih Bukhari": os.path.join(project_root,  'hadis_bukhari.json'),
-        "Jami` at-Tirmidzi": os.path.join(project_root, 'hadis_tirmidzi.json'),
-    }
+    Meng-embed bab di worker embedding, maksimal `window` bab sekaligus, dan mengembalikan
+    hasilnya sesuai urutan file sehingga writer selalu menulis Kitab sebelum Bab-nya.
+    """
+    pending = deque()
+    current_kitab = None
+    unit_for = hadith_units(source_name)
+    for kitab_name, bab_item in babs:
+        new_kitab = kitab_name != current_kitab
+        current_kitab = kitab_name
+        units = [unit_for(hadith_item.get('hadith_number')) for hadith_item in bab_item['hadiths']]
+        pending.append(executor.submit(prepare_hadith_bab, source_name, kitab_name, bab_item, new_kitab, units))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def ingest_hadith_collection(collection, replace=False, embed_workers=HADITH_EMBED_WORKERS, position=0):
+    """
+    Memuat satu koleksi: worker embedding sendiri dan satu writer (session) sendiri.
+    Mengembalikan ringkasan dict, atau None jika koleksi sudah ada dan replace=False.
+    """
+    source_name = collection.name
+    babs = iter_hadith_babs(collection.path)
+    started = time.perf_counter()
+    hadiths = failed = 0
+
+    with _session() as session:
+        if hadith_source_exists(session, source_name):
+            if not replace:
+                tqdm.write(f"⚠️ '{source_name}' sudah ada di graf, dilewati (gunakan --replace untuk memuat ulang).")
+                return None
+            tqdm.write(f"🗑️  Menghapus data lama '{source_name}'...")
+            delete_hadith_source(session, source_name)
+
+        ensure_chunk_key_index(session)
+        ensure_hadith_source(source_name, session)
+        progress = tqdm(desc=source_name, unit="hadis", position=position, dynamic_ncols=True)
+        try:
+            with ThreadPoolExecutor(max_workers=embed_workers, thread_name_prefix=f"embed-{position}") as executor:
+                for prepared in _prepare_in_order(babs, source_name, executor, window=embed_workers * 2):
+                    hadiths += len(prepared["hadiths"])
+                    failed += write_hadith_bab(prepared, source_name, session, on_hadith=lambda ok: progress.update())
+                    checkpoint_embedding_store()
+        finally:
+            progress.close()
+
+    seconds = time.perf_counter() - started
+    return {"name": source_name, "hadiths": hadiths, "failed": failed, "seconds": seconds,
+            "rate": hadiths / seconds if seconds else 0.0}
 
+def insert_all_hadith_sources(sources_file=HADITH_SOURCES_FILE, only=None, replace=False,
+                              workers=HADITH_WORKERS, embed_workers=HADITH_EMBED_WORKERS):
+    """
+    Memuat koleksi hadis dari registry (hadith_registry.py) secara bersamaan dan membangun
+    graf hirarkis di Neo4j untuk masing-masing sumber.
+    - only    : daftar nama koleksi; koleksi lain dan Al-Quran tidak tersentuh.
+    - replace : hapus dulu data koleksi yang sudah ada sebelum dimuat ulang.
+    """
     try:
-        with driver.session() as session:
-            for source_name, json_path in hadith_sources_to_process.items():
-                print(f"\n{'='*60}")
-                print(f"Memulai proses untuk: {source_name}")
-                print(f"{'='*60}")
+        collections = select_collections(load_hadith_registry(sources_file), only)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Registry koleksi hadis tidak valid ({sources_file}): {e}")
+        sys.exit(1)
+    if not collections:
+        print("⚠️ Tidak ada koleksi hadis yang aktif di registry.")
+        return
 
+    print(f"Memproses {len(collections)} koleksi hadis: {', '.join(c.name for c in collections)}")
+    results, errors = [], []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="hadith-source") as executor:
+        futures = {
+            executor.submit(ingest_hadith_collection, collection, replace, embed_workers, position): collection
+            for position, collection in enumerate(collections)
+        }
+        for future, collection in futures.items():
+            try:
+                result = future.result()
+                if result:
+                    results.append(result)
+            except FileNotFoundError:
+                errors.append(collection.name)
+                print(f"❌ Peringatan: File untuk {collection.name} tidak ditemukan di {collection.path}.")
+            except Exception as e:
+                errors.append(collection.name)
+                print(f"❌ Terjadi error saat memproses {collection.name}: {e}")
+
+    print()
+    for result in results:
+        print(f"✅ {result['name']}: {result['hadiths']} hadis ({result['failed']} gagal) "
+              f"dalam {result['seconds']:.0f} detik, {result['rate']:.1f} hadis/detik")
+    if errors:
+        print(f"❌ Koleksi gagal: {', '.join(errors)}")
+        sys.exit(1)
+    print("\n✅ Semua sumber hadis yang dipilih berhasil diproses.")
+
+def sync_sources(load_quran=True, load_hadith=True, sources_file=HADITH_SOURCES_FILE, only=None, dry_run=False):
+    """
+    Sinkronisasi inkremental (lihat sync.py): hanya chunk yang berubah yang di-embed dan
+    ditulis ulang, chunk yatim dihapus, dan graf tidak pernah dikosongkan.
+    dry_run hanya menghitung perubahan tanpa menulis atau memanggil model embedding.
+    """
+    quran_json_path = os.path.join(project_root, 'quran.json')
+    results = []
+    if load_quran and not dry_run:
+        # Graf lama belum menyimpan surah_number di :Ayat; tanpa backfill MERGE di write_ayah
+        # akan membuat duplikat setiap ayat
+        QuranRelator(get_driver(), database=target_database).ensure_ayat_key()
+    with _session() as session:
+        if load_quran:
+            try:
+                results.append(sync_quran(session, quran_json_path, dry_run))
+            except FileNotFoundError:
+                print(f"❌ File quran.json tidak ditemukan di {quran_json_path}")
+        if load_hadith:
+            for collection in select_collections(load_hadith_registry(sources_file), only):
                 try:
-                    # Memuat data dari file JSON yang sesuai
-                    hadith_data = load_hadith_data(json_path)
-                    
-                    if hadith_data:
-                        # Membuat progress bar untuk iterasi kitab
-                        progress = tqdm(total=len(hadith_data), desc=f"Memproses Kitab dari {source_name}")
-                        
-                        # Panggil fungsi utama yang generik
-                        process_hadith_source(hadith_data, source_name, session)
-                        
-                        progress.update(len(hadith_data))
-                        progress.close()
-                    else:
-                        print(f"⚠️ Data untuk {source_name} kosong atau tidak dapat dimuat dari {json_path}.")
-                
+                    results.append(sync_hadith_collection(session, collection, dry_run))
                 except FileNotFoundError:
-                    print(f"❌ Peringatan: File untuk {source_name} tidak ditemukan di {json_path}. Melanjutkan ke sumber berikutnya.")
-                    continue
-        
-        print("\n\n✅ Semua sumber hadis yang tersedia berhasil diproses.")
+                    print(f"❌ Peringatan: File untuk {collection.name} tidak ditemukan di {collection.path}.")
 
-    except Exception as e:
-        print(f"❌ Terjadi error fatal saat proses insert: {str(e)}")
-        sys.exit(1)
+    print()
+    for stats in results:
+        print(f"{'🔎' if dry_run else '✅'} {stats.summary()}")
 
 def insert_quran_chunks():
     """
@@ -67,20 +205,21 @@ def insert_quran_chunks():
     quran_json_path = os.path.join(project_root, 'quran.json')
     
     try:
-        # Load Quran data
-        quran_data = load_quran_data(quran_json_path)
+        # Quran data dibaca bertahap, satu surah per iterasi
+        surahs = iter_quran_surahs(quran_json_path)
 
-        with driver.session() as session:
-            # Reset all existing data
-            session.run("MATCH (n) DETACH DELETE n")
+        with _session() as session:
+            # Reset all existing data, per label dan per batch (lihat reset.py)
+            reset_graph(session)
             session.run("CREATE (:Quran {name: 'Al-Quran'})")
+            ensure_chunk_key_index(session)
 
-            total_ayat = sum(len(surah["text"]) for surah in quran_data)
-            progress = tqdm(total=total_ayat, desc="Memproses Ayat")
+            progress = tqdm(total=QURAN_AYAT_COUNT, desc="Memproses Ayat")
 
-            for surah in quran_data:
+            for surah in surahs:
                 process_surah_chunks(surah, session)
                 progress.update(len(surah["text"]))
+                checkpoint_embedding_store()
 
             progress.close()
             print("\n✅ Semua data Al-Quran dan chunk embedding berhasil dimasukkan ke Neo4j.")
@@ -91,10 +230,69 @@ def insert_quran_chunks():
     except Exception as e:
         print(f"❌ Error saat insert: {str(e)}")
         sys.exit(1)
-    finally:
-        driver.close()
 
 if __name__ == "__main__":
-    insert_quran_chunks()
-    insert_all_hadith_sources()
-    print("Semua data berhasil dimasukkan ke dalam Neo4j.")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Memuat Al-Quran dan koleksi hadis ke Neo4j")
+    parser.add_argument("--quran", action="store_true",
+                        help="Muat Al-Quran (MENGHAPUS seluruh graf terlebih dahulu)")
+    parser.add_argument("--hadith", action="store_true", help="Muat koleksi hadis dari registry")
+    parser.add_argument("--only", action="append", metavar="NAMA",
+                        help="Hanya koleksi hadis ini (boleh diulang); menyiratkan --hadith")
+    parser.add_argument("--replace", action="store_true",
+                        help="Hapus dan muat ulang koleksi hadis yang sudah ada")
+    parser.add_argument("--sync", action="store_true",
+                        help="Sinkronisasi inkremental: hanya chunk yang berubah yang di-embed ulang")
+    parser.add_argument("--dry-run", action="store_true", help="Dengan --sync: hanya laporkan perubahan")
+    parser.add_argument("--sources", default=HADITH_SOURCES_FILE, help="File registry koleksi hadis")
+    parser.add_argument("--workers", type=int, default=HADITH_WORKERS, help="Koleksi yang diproses bersamaan")
+    parser.add_argument("--embed-workers", type=int, default=HADITH_EMBED_WORKERS,
+                        help="Worker embedding per koleksi")
+    parser.add_argument("--version", metavar="VERSI",
+                        help="Build penuh ke database baru corpus-VERSI tanpa menyentuh versi aktif")
+    parser.add_argument("--activate", action="store_true",
+                        help="Dengan --version: alihkan alias ke build baru jika lolos validasi")
+    args = parser.parse_args()
+    if args.version and (args.sync or args.only or args.quran or args.hadith):
+        parser.error("--version selalu membangun seluruh korpus dan tidak bisa digabung dengan --sync/--only/--quran/--hadith")
+    if args.activate and not args.version:
+        parser.error("--activate hanya berlaku dengan --version")
+    if args.version:
+        target_database = database_name(args.version)
+
+    # Tanpa pilihan: muat semuanya seperti sebelumnya (Al-Quran lalu semua hadis)
+    load_quran = args.quran or not (args.hadith or args.only)
+    load_hadith = args.hadith or bool(args.only) or not args.quran
+    # Embedding yang sudah pernah dihitung dibaca dari store, embedding baru ikut disimpan
+    store = None if args.dry_run else open_embedding_store()
+    try:
+        if args.version:
+            create_version_database(target_database)
+        if args.sync:
+            sync_sources(load_quran, load_hadith, args.sources, args.only, args.dry_run)
+        elif load_quran:
+            # Build ulang penuh: indeks vektor dibuat sekali setelah semua embedding tertulis
+            with _session() as index_session, vector_index_suspended(index_session):
+                insert_quran_chunks()
+                if load_hadith:
+                    insert_all_hadith_sources(args.sources, args.only, args.replace, args.workers, args.embed_workers)
+            print("Semua data berhasil dimasukkan ke dalam Neo4j.")
+            if args.version:
+                # RELATED_TO (ekspansi graf di retrieval) harus ada di build baru sebelum dialihkan
+                build_related(target_database)
+            if args.activate:
+                try:
+                    switch_version(target_database)
+                except RuntimeError as e:
+                    print(str(e))
+                    sys.exit(1)
+            elif args.version:
+                problems = validate_version(target_database)
+                print("\n".join(f"❌ {problem}" for problem in problems) or
+                      f"✅ '{target_database}' lolos validasi, aktifkan dengan: python -m process_data.versions switch {target_database}")
+        else:
+            insert_all_hadith_sources(args.sources, args.only, args.replace, args.workers, args.embed_workers)
+            print("Semua data berhasil dimasukkan ke dalam Neo4j.")
+    finally:
+        if store is not None:
+            store.save()
+        get_driver().close()
\ No newline at end of file
@@ -0,0 +1,136 @@
+# process_data/reset.py
+"""
+Graph reset and vector index helpers that are safe on production-sized instances.
+
+Nodes are deleted label by label with `CALL { ... } IN TRANSACTIONS`, so no single
+transaction has to hold hundreds of thousands of nodes with their embeddings in
+heap. The vector index is dropped before a bulk load and recreated (and waited on)
+afterwards, instead of being updated on every write.
+
+    python -m process_data.reset                   # hapus seluruh graf
+    python -m process_data.reset --labels Chunk    # hanya label tertentu
+    python -m process_data.reset --create-index    # buat ulang indeks vektor saja
+"""
+import argparse
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+# Root repo juga, untuk Backend.config saat dijalankan dari folder Backend
+sys.path.insert(1, os.path.dirname(project_root))
+
+from Backend.config import DIMENSION, NEO4J_DATABASE, get_driver
+from tqdm import tqdm
+
+RESET_BATCH_SIZE = int(os.getenv("RESET_BATCH_SIZE", "1000"))
+# Jumlah node per langkah progress; setiap langkah tetap dipecah per RESET_BATCH_SIZE
+RESET_PROGRESS_STEP = 50000
+VECTOR_INDEX_NAME = "chunk_embeddings"
+# Chunk dulu: label terbesar dan pemilik embedding
+GRAPH_LABELS = ("Chunk", "Ayat", "Bab", "Kitab", "Surah", "HadithSource", "Hadis", "Quran")
+
+def delete_nodes(session, match, params=None, batch_size=RESET_BATCH_SIZE, desc=None):
+    """
+    DETACH DELETE semua node hasil `match` (klausa MATCH yang mengikat `n`) dalam
+    transaksi berukuran batch_size. Mengembalikan jumlah node yang dihapus.
+    """
+    params = params or {}
+    total = session.run(f"{match} RETURN count(n) AS total", params).single()["total"]
+    if not total:
+        return 0
+
+    progress = tqdm(total=total, desc=desc or "Menghapus", unit="node")
+    remaining = total
+    while remaining:
+        session.run(f"""
+            {match}
+            WITH n LIMIT $step
+            CALL {{ WITH n DETACH DELETE n }} IN TRANSACTIONS OF {int(batch_size)} ROWS
+        """, dict(params, step=RESET_PROGRESS_STEP)).consume()
+        now = session.run(f"{match} RETURN count(n) AS total", params).single()["total"]
+        progress.update(remaining - now)
+        if now >= remaining:
+            break
+        remaining = now
+    progress.close()
+    return total - remaining
+
+def reset_graph(session, labels=GRAPH_LABELS, batch_size=RESET_BATCH_SIZE):
+    """Menghapus node per label secara bertahap, lalu sisa node tanpa label yang dikenal."""
+    deleted = 0
+    for label in labels:
+        deleted += delete_nodes(session, f"MATCH (n:{label})", batch_size=batch_size, desc=f"Menghapus :{label}")
+    if tuple(labels) == GRAPH_LABELS:
+        deleted += delete_nodes(session, "MATCH (n)", batch_size=batch_size, desc="Menghapus node lain")
+    return deleted
+
+def drop_vector_index(session, name=VECTOR_INDEX_NAME):
+    session.run(f"DROP INDEX `{name}` IF EXISTS")
+    print(f"🗑️  Indeks vektor '{name}' dihapus (jika ada).")
+
+def create_vector_index(session, name=VECTOR_INDEX_NAME, dimension=DIMENSION, wait=True):
+    """
+    Membuat indeks vektor cosine pada Chunk.embedding lalu (opsional) menunggu sampai
+    populasinya selesai, dengan progress dari SHOW INDEXES.
+    """
+    session.run(f"""
+        CREATE VECTOR INDEX `{name}` IF NOT EXISTS
+        FOR (c:Chunk)
+        ON (c.embedding)
+        OPTIONS {{
+            indexConfig: {{
+                `vector.dimensions`: $dim,
+                `vector.similarity_function`: 'cosine'
+            }}
+        }}
+    """, dim=dimension)
+    print(f"✅ Indeks vektor '{name}' berhasil dibuat atau sudah ada.")
+    if not wait:
+        return
+
+    progress = tqdm(total=100, desc=f"Populasi indeks {name}", unit="%")
+    while True:
+        record = session.run(
+            "SHOW INDEXES YIELD name, state, populationPercent WHERE name = $name RETURN state, populationPercent",
+            name=name
+        ).single()
+        if record is None:
+            break
+        progress.update(round(record["populationPercent"] or 0, 1) - progress.n)
+        if record["state"] != "POPULATING":
+            break
+        time.sleep(2)
+    progress.close()
+    if record is not None and record["state"] != "ONLINE":
+        raise RuntimeError(f"❌ Indeks vektor '{name}' berstatus {record['state']}")
+
+@contextmanager
+def vector_index_suspended(session, name=VECTOR_INDEX_NAME, dimension=DIMENSION):
+    """Menghapus indeks vektor selama bulk load dan membuatnya kembali setelahnya (juga saat gagal)."""
+    drop_vector_index(session, name)
+    try:
+        yield
+    finally:
+        create_vector_index(session, name, dimension)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reset graf Neo4j secara bertahap")
+    parser.add_argument("--labels", nargs="+", default=list(GRAPH_LABELS), help="Label yang dihapus")
+    parser.add_argument("--batch-size", type=int, default=RESET_BATCH_SIZE, help="Node per transaksi")
+    parser.add_argument("--database", default=NEO4J_DATABASE, help="Database tujuan (default: NEO4J_DATABASE)")
+    parser.add_argument("--create-index", action="store_true", help="Hanya buat indeks vektor dan tunggu sampai online")
+    args = parser.parse_args()
+
+    try:
+        with get_driver().session(database=args.database) as session:
+            if args.create_index:
+                create_vector_index(session)
+            else:
+                started = time.perf_counter()
+                deleted = reset_graph(session, tuple(args.labels), args.batch_size)
+                print(f"✅ {deleted} node dihapus dalam {time.perf_counter() - started:.0f} detik.")
+    finally:
+        get_driver().close()
@@ -0,0 +1,270 @@
+# process_data/sync.py
+"""
+Incremental re-ingestion: bring the graph in line with the source files without
+wiping it, so the cost scales with the size of the diff instead of the corpus.
+
+- Each source unit (one ayat or one hadith) is rebuilt in memory with its chunk keys
+  and content hashes (see chunking.py) and compared with what is stored in Neo4j.
+- Unchanged units are skipped without any write. For a changed unit only the chunks
+  whose hash differs get a new embedding; if another chunk already has the same text,
+  its embedding is read before the write and reused instead of calling the model.
+- Chunks, Ayat, Bab and Kitab nodes that no longer exist in the source are deleted.
+  Chunks from builds before chunk keys existed are treated as orphans, but their
+  embeddings are still reused by content hash.
+
+The Quran and each hadith collection are synced independently: syncing one never
+touches the others.
+"""
+
+from collections import defaultdict
+
+from tqdm import tqdm
+
+from process_data.chunking import (build_ayah, build_hadith, bab_text, content_hash, ensure_chunk_key_index,
+                                   ensure_hadith_source, hadith_units, kitab_text, surah_properties, unit_of,
+                                   write_ayah, write_bab, write_hadith, write_kitab, write_surah)
+from process_data.data_loader import iter_hadith_babs, iter_quran_surahs
+from process_data.embedding import checkpoint_embedding_store, embed_chunk
+
+DELETE_BATCH_SIZE = 1000
+
+
+class ExistingChunks:
+    """Snapshot of stored chunks of one domain: key -> hash, unit -> keys, hash -> reusable chunk."""
+
+    def __init__(self, records):
+        self.hashes = {}
+        self.unit_keys = defaultdict(set)
+        self.by_hash = {}
+        self.legacy = []
+        for record in records:
+            digest = record["content_hash"]
+            if digest is None and record["text"] is not None:
+                digest = content_hash(record["text"])
+            if digest and record["has_embedding"]:
+                self.by_hash.setdefault(digest, record["eid"])
+            if record["key"] is None:
+                self.legacy.append(record["eid"])
+            else:
+                self.hashes[record["key"]] = record["content_hash"]
+                self.unit_keys[unit_of(record["key"])].add(record["key"])
+
+
+class SyncStats:
+    def __init__(self, name):
+        self.name = name
+        self.units = 0
+        self.changed = 0
+        self.failed = 0
+        self.embedded = 0
+        self.reused = 0
+        self.deleted = 0
+
+    def postfix(self):
+        return {"berubah": self.changed, "embed": self.embedded, "reuse": self.reused}
+
+    def summary(self):
+        return (f"{self.name}: {self.units} unit, {self.changed} berubah, {self.failed} gagal, "
+                f"{self.embedded} chunk di-embed, {self.reused} embedding dipakai ulang, {self.deleted} node dihapus")
+
+
+def load_existing_chunks(session, where, params):
+    # Teks hanya diambil untuk chunk lama tanpa content_hash
+    result = session.run(f"""
+        MATCH (c:Chunk) WHERE {where}
+        RETURN elementId(c) AS eid, c.key AS key, c.content_hash AS content_hash,
+               CASE WHEN c.content_hash IS NULL THEN c.text END AS text,
+               c.embedding IS NOT NULL AS has_embedding
+    """, params)
+    return ExistingChunks(result)
+
+
+def read_reusable_embeddings(session, candidates):
+    """
+    Membaca embedding chunk lama untuk dipakai ulang, sebelum unit ditulis.
+    `candidates` adalah [(elementId, content_hash)] dari snapshot; node yang sejak snapshot
+    sudah ditulis ulang dengan teks lain (content_hash berbeda) dilewati, sehingga
+    embedding tidak pernah tertukar. Mengembalikan {content_hash: embedding}.
+    """
+    result = session.run("""
+        UNWIND $candidates AS candidate
+        MATCH (src:Chunk) WHERE elementId(src) = candidate[0]
+        WITH src, candidate
+        WHERE src.embedding IS NOT NULL
+          AND (src.content_hash = candidate[1] OR (src.key IS NULL AND src.content_hash IS NULL))
+        RETURN candidate[1] AS content_hash, src.embedding AS embedding
+    """, {"candidates": [list(candidate) for candidate in candidates]})
+    return {record["content_hash"]: record["embedding"] for record in result}
+
+
+def sync_unit(session, unit, existing, stats, write, dry_run=False):
+    """Menulis satu unit jika ada chunk yang berubah, bertambah atau hilang. Mengembalikan True jika berubah."""
+    desired_keys = {chunk["key"] for chunk in unit["chunks"]}
+    changed = [chunk for chunk in unit["chunks"] if existing.hashes.get(chunk["key"]) != chunk["content_hash"]]
+    if not changed and existing.unit_keys.get(unit["unit"], set()) == desired_keys:
+        return False
+
+    stats.changed += 1
+    candidates = {existing.by_hash[chunk["content_hash"]]: chunk["content_hash"]
+                  for chunk in changed if chunk["content_hash"] in existing.by_hash}
+    if dry_run:
+        stats.reused += sum(1 for chunk in changed if chunk["content_hash"] in existing.by_hash)
+        stats.embedded += sum(1 for chunk in changed if chunk["content_hash"] not in existing.by_hash)
+        return True
+
+    reusable = read_reusable_embeddings(session, candidates.items()) if candidates else {}
+    for chunk in changed:
+        vector = reusable.get(chunk["content_hash"])
+        if vector is not None:
+            chunk["embedding"] = vector
+            stats.reused += 1
+        else:
+            chunk["embedding"] = embed_chunk(chunk["text"], chunk["key"])
+            stats.embedded += 1
+
+    tx = session.begin_transaction()
+    try:
+        write(tx)
+        tx.commit()
+    except Exception:
+        tx.rollback()
+        raise
+    return True
+
+
+def _delete_batched(session, query, values, stats, dry_run, **params):
+    for start in range(0, len(values), DELETE_BATCH_SIZE):
+        if not dry_run:
+            session.run(query, dict(params, values=values[start:start + DELETE_BATCH_SIZE]))
+    stats.deleted += len(values)
+
+
+def delete_orphan_chunks(session, existing, desired_keys, stats, dry_run=False):
+    orphan_keys = sorted(set(existing.hashes) - desired_keys)
+    _delete_batched(session, "UNWIND $values AS key MATCH (c:Chunk {key: key}) DETACH DELETE c",
+                    orphan_keys, stats, dry_run)
+    _delete_batched(session, "UNWIND $values AS eid MATCH (c:Chunk) WHERE elementId(c) = eid DETACH DELETE c",
+                    existing.legacy, stats, dry_run)
+
+
+def _sync_or_keep(session, unit, existing, stats, desired_keys, write, label, dry_run):
+    """sync_unit dengan penanganan error: unit yang gagal mempertahankan chunk lamanya."""
+    try:
+        sync_unit(session, unit, existing, stats, write, dry_run)
+        desired_keys.update(chunk["key"] for chunk in unit["chunks"])
+    except Exception as e:
+        stats.failed += 1
+        desired_keys.update(existing.unit_keys.get(unit["unit"], ()))
+        tqdm.write(f"      ❌ Gagal sinkronisasi {label}: {e}")
+
+
+def sync_quran(session, quran_json_path, dry_run=False):
+    """Sinkronisasi inkremental Al-Quran. Chunk Al-Quran adalah chunk tanpa source_name."""
+    stats = SyncStats("Al-Quran")
+    surahs = iter_quran_surahs(quran_json_path)
+    if not dry_run:
+        ensure_chunk_key_index(session)
+    existing = load_existing_chunks(session, "c.source_name IS NULL", {})
+    # Key ayat lewat HAS_AYAT juga, untuk graf lama yang :Ayat-nya belum punya surah_number
+    existing_ayat = {(r["surah_number"], r["number"]) for r in session.run("""
+        MATCH (a:Ayat)
+        OPTIONAL MATCH (s:Surah)-[:HAS_AYAT]->(a)
+        RETURN coalesce(a.surah_number, s.number) AS surah_number, a.number AS number
+    """)}
+
+    desired_keys, desired_ayat = set(), set()
+    progress = tqdm(desc="Sinkronisasi Ayat", unit="ayat")
+    for surah in surahs:
+        if not dry_run:
+            write_surah(session, surah_properties(surah))
+        for ayah_key, ayah_text in surah["text"].items():
+            try:
+                ayah = build_ayah(surah, ayah_key, ayah_text)
+            except ValueError as e:
+                print(str(e))
+                continue
+            stats.units += 1
+            desired_ayat.add((ayah["surah_number"], ayah["ayat_number"]))
+            _sync_or_keep(session, ayah, existing, stats, desired_keys,
+                          lambda tx, ayah=ayah: write_ayah(tx, ayah), ayah["unit"], dry_run)
+            progress.update()
+            progress.set_postfix(stats.postfix(), refresh=False)
+        checkpoint_embedding_store()
+    progress.close()
+
+    delete_orphan_chunks(session, existing, desired_keys, stats, dry_run)
+    _delete_batched(session, """
+        UNWIND $values AS ayat
+        MATCH (a:Ayat {surah_number: ayat[0], number: ayat[1]}) DETACH DELETE a
+    """, [list(ayat) for ayat in existing_ayat - desired_ayat], stats, dry_run)
+    return stats
+
+
+def sync_hadith_collection(session, collection, dry_run=False):
+    """Sinkronisasi inkremental satu koleksi hadis; koleksi lain dan Al-Quran tidak tersentuh."""
+    source_name = collection.name
+    stats = SyncStats(source_name)
+    babs = iter_hadith_babs(collection.path)
+    if not dry_run:
+        ensure_chunk_key_index(session)
+        ensure_hadith_source(source_name, session)
+    existing = load_existing_chunks(session, "c.source_name = $source_name", {"source_name": source_name})
+    existing_kitab = {r["name"]: r["content_hash"] for r in session.run(
+        "MATCH (k:Kitab {source_name: $source_name}) RETURN k.name AS name, k.content_hash AS content_hash",
+        source_name=source_name)}
+    existing_bab = {(r["kitab_name"], r["name"]): r["content_hash"] for r in session.run(
+        "MATCH (b:Bab {source_name: $source_name}) RETURN b.kitab_name AS kitab_name, b.name AS name, b.content_hash AS content_hash",
+        source_name=source_name)}
+
+    def ensure_node(existing_hashes, node_key, text, write):
+        # Teks Kitab/Bab hanya bergantung pada namanya: node yang sudah ada cukup diberi content_hash
+        if node_key in existing_hashes and existing_hashes[node_key] == content_hash(text):
+            return
+        stats.changed += 1
+        if node_key not in existing_hashes:
+            stats.embedded += 1
+        if not dry_run:
+            write(embed_chunk(text) if node_key not in existing_hashes else None)
+        existing_hashes[node_key] = content_hash(text)
+
+    desired_keys, desired_kitab, desired_bab = set(), set(), set()
+    unit_for = hadith_units(source_name)
+    progress = tqdm(desc=f"Sinkronisasi {source_name}", unit="hadis")
+    for kitab_name, bab_item in babs:
+        bab_name = bab_item['bab']
+        if kitab_name not in desired_kitab:
+            desired_kitab.add(kitab_name)
+            ensure_node(existing_kitab, kitab_name, kitab_text(source_name, kitab_name),
+                        lambda embedding: write_kitab(session, source_name, kitab_name, embedding))
+        desired_bab.add((kitab_name, bab_name))
+        ensure_node(existing_bab, (kitab_name, bab_name), bab_text(kitab_name, bab_name),
+                    lambda embedding: write_bab(session, source_name, kitab_name, bab_name, embedding))
+
+        for hadith_item in bab_item['hadiths']:
+            unit = unit_for(hadith_item.get('hadith_number'))
+            stats.units += 1
+            try:
+                hadith = build_hadith(unit, source_name, kitab_name, bab_name, hadith_item)
+            except KeyError as e:
+                stats.failed += 1
+                desired_keys.update(existing.unit_keys.get(unit, ()))
+                tqdm.write(f"      ❌ Hadis tanpa {e} di {source_name}, Bab '{bab_name}' dilewati.")
+                continue
+            _sync_or_keep(session, hadith, existing, stats, desired_keys,
+                          lambda tx, hadith=hadith: write_hadith(tx, hadith, source_name, kitab_name, bab_name),
+                          unit, dry_run)
+            progress.update()
+            progress.set_postfix(stats.postfix(), refresh=False)
+        checkpoint_embedding_store()
+    progress.close()
+
+    delete_orphan_chunks(session, existing, desired_keys, stats, dry_run)
+    _delete_batched(session, """
+        UNWIND $values AS bab
+        MATCH (b:Bab {kitab_name: bab[0], name: bab[1], source_name: $source_name}) DETACH DELETE b
+    """, [list(bab) for bab in set(existing_bab) - desired_bab], stats, dry_run, source_name=source_name)
+    _delete_batched(session, """
+        UNWIND $values AS name
+        MATCH (k:Kitab {name: name, source_name: $source_name}) DETACH DELETE k
+    """, list(set(existing_kitab) - desired_kitab), stats, dry_run, source_name=source_name)
+    return stats
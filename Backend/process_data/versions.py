@@ -0,0 +1,235 @@
+# process_data/versions.py
+"""
+Blue/green corpus versions: every full build goes into its own Neo4j database
+(corpus-<versi>, with its own chunk_embeddings vector index) while the backend keeps
+reading through the alias NEO4J_DATABASE. Once a build passes validation the alias is
+repointed in a single system command, so requests see either the old or the new
+corpus and never a half-loaded graph. The previous database is kept for rollback.
+
+    python -m process_data.insert_data --version 20261019 --activate   # build, validasi, alihkan
+    python -m process_data.versions list
+    python -m process_data.versions validate corpus-20261019
+    python -m process_data.versions switch corpus-20261019
+    python -m process_data.versions rollback
+    python -m process_data.versions drop corpus-20261001
+
+Multiple databases and aliases need Neo4j Enterprise (or Aura). To move an existing
+single-database setup over, point the alias at it once (`switch neo4j`) and then set
+NEO4J_DATABASE to the alias name for the backend.
+"""
+import argparse
+import os
+import re
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+# Root repo juga, untuk Backend.config dan knn.py saat dijalankan dari folder Backend
+sys.path.insert(1, os.path.dirname(project_root))
+
+from Backend.config import NEO4J_DATABASE, get_driver
+from Backend.shared_cache import clear_volatile_caches
+from process_data.data_loader import QURAN_AYAT_COUNT
+from process_data.hadith_registry import load_hadith_registry, select_collections
+from process_data.reset import VECTOR_INDEX_NAME
+
+CORPUS_ALIAS = NEO4J_DATABASE or "graphrag"
+VERSION_PREFIX = "corpus-"
+# Build baru ditolak jika jumlah chunk-nya kurang dari rasio ini terhadap versi aktif
+VERSION_MIN_CHUNK_RATIO = float(os.getenv("VERSION_MIN_CHUNK_RATIO", "0.9"))
+# Query vektor yang dijalankan ke build baru sebelum dialihkan, agar indeks dan page cache
+# sudah hangat saat trafik pertama datang
+VERSION_WARMUP_QUERIES = int(os.getenv("VERSION_WARMUP_QUERIES", "50"))
+
+def database_name(version):
+    """Nama database untuk sebuah versi, misal '20261019' -> 'corpus-20261019'."""
+    name = version.lower() if version.lower().startswith(VERSION_PREFIX) else f"{VERSION_PREFIX}{version.lower()}"
+    if not re.fullmatch(r"[a-z][a-z0-9.-]{2,62}", name):
+        raise ValueError(f"❌ Nama versi tidak valid untuk database Neo4j: {name}")
+    return name
+
+def _system_session():
+    return get_driver().session(database="system")
+
+def create_version_database(database):
+    with _system_session() as session:
+        session.run(f"CREATE DATABASE `{database}` IF NOT EXISTS WAIT").consume()
+    print(f"✅ Database '{database}' siap untuk build baru.")
+
+def active_database(alias=CORPUS_ALIAS):
+    """Database yang saat ini ditunjuk alias, atau None jika alias belum ada."""
+    with _system_session() as session:
+        record = session.run(
+            "SHOW ALIASES FOR DATABASE YIELD name, database WHERE name = $alias RETURN database", alias=alias
+        ).single()
+    return record["database"] if record else None
+
+def resolve_database(version):
+    """Nama database apa adanya jika sudah ada (misal 'neo4j'), selain itu nama dari database_name."""
+    with _system_session() as session:
+        names = {record["name"] for record in session.run("SHOW DATABASES YIELD name RETURN DISTINCT name")}
+    return version if version in names else database_name(version)
+
+def list_versions(alias=CORPUS_ALIAS):
+    """Mengembalikan (name, status, active) untuk setiap database versi korpus."""
+    active = active_database(alias)
+    with _system_session() as session:
+        result = session.run("""
+            SHOW DATABASES YIELD name, currentStatus
+            WHERE name STARTS WITH $prefix OR name = $active
+            RETURN DISTINCT name, currentStatus AS status
+            ORDER BY name
+        """, prefix=VERSION_PREFIX, active=active)
+        return [(record["name"], record["status"], record["name"] == active) for record in result]
+
+def _chunk_count(database):
+    with get_driver().session(database=database) as session:
+        return session.run("MATCH (c:Chunk) RETURN count(c) AS total").single()["total"]
+
+def validate_version(database, alias=CORPUS_ALIAS):
+    """
+    Memeriksa build sebelum dialihkan. Mengembalikan daftar masalah (kosong = lolos):
+    jumlah ayat, koleksi hadis aktif di registry, chunk tanpa embedding, relasi
+    RELATED_TO (knn.py), status indeks vektor, jumlah chunk dibanding versi aktif, dan
+    apakah vector search menemukan chunk dari embedding-nya sendiri.
+    """
+    problems = []
+    with get_driver().session(database=database) as session:
+        stats = session.run("""
+            CALL { MATCH (a:Ayat) RETURN count(a) AS ayat }
+            CALL { MATCH (c:Chunk) RETURN count(c) AS chunks }
+            CALL { MATCH (c:Chunk) WHERE c.embedding IS NULL RETURN count(c) AS missing }
+            CALL { MATCH (s:HadithSource) RETURN collect(s.name) AS sources }
+            CALL { MATCH (:Ayat)-[r:RELATED_TO]->() RETURN count(r) AS related }
+            RETURN ayat, chunks, missing, sources, related
+        """).single()
+        if stats["ayat"] != QURAN_AYAT_COUNT:
+            problems.append(f"{stats['ayat']} ayat, seharusnya {QURAN_AYAT_COUNT}")
+        expected_sources = {c.name for c in select_collections(load_hadith_registry())}
+        missing_sources = expected_sources - set(stats["sources"])
+        if missing_sources:
+            problems.append(f"koleksi hadis tidak ada: {', '.join(sorted(missing_sources))}")
+        if stats["missing"]:
+            problems.append(f"{stats['missing']} chunk tanpa embedding")
+        if not stats["related"]:
+            problems.append(f"tidak ada relasi RELATED_TO, jalankan: python knn.py --database {database}")
+
+        index = session.run(
+            "SHOW INDEXES YIELD name, state WHERE name = $name RETURN state", name=VECTOR_INDEX_NAME
+        ).single()
+        if index is None or index["state"] != "ONLINE":
+            problems.append(f"indeks vektor '{VECTOR_INDEX_NAME}' {index['state'] if index else 'tidak ada'}")
+        elif stats["chunks"] > stats["missing"]:
+            # Chunk acak harus menemukan dirinya sendiri sebagai hasil teratas
+            record = session.run(f"""
+                MATCH (c:Chunk) WHERE c.embedding IS NOT NULL
+                WITH c SKIP toInteger(rand() * $total) LIMIT 1
+                CALL db.index.vector.queryNodes('{VECTOR_INDEX_NAME}', 1, c.embedding) YIELD node, score
+                RETURN node = c AS found, score
+            """, total=stats["chunks"] - stats["missing"]).single()
+            if record is None or (not record["found"] and record["score"] < 0.999):
+                problems.append("vector search tidak menemukan chunk dari embedding-nya sendiri")
+
+    previous = active_database(alias)
+    if previous and previous != database:
+        previous_chunks = _chunk_count(previous)
+        if stats["chunks"] < previous_chunks * VERSION_MIN_CHUNK_RATIO:
+            problems.append(f"{stats['chunks']} chunk, versi aktif '{previous}' punya {previous_chunks}")
+    return problems
+
+def warm_up(database, queries=VERSION_WARMUP_QUERIES):
+    """Menjalankan vector search dengan embedding chunk acak agar indeks build baru sudah dimuat."""
+    if queries <= 0:
+        return
+    with get_driver().session(database=database) as session:
+        session.run(f"""
+            MATCH (c:Chunk) WHERE c.embedding IS NOT NULL
+            WITH c, rand() AS r ORDER BY r LIMIT $queries
+            CALL db.index.vector.queryNodes('{VECTOR_INDEX_NAME}', 10, c.embedding) YIELD node
+            RETURN count(node) AS hits
+        """, queries=queries).consume()
+
+def switch_version(database, alias=CORPUS_ALIAS, force=False, record_previous=True):
+    """
+    Mengalihkan alias ke `database` setelah validasi dan warm-up. Versi aktif sebelumnya
+    dicatat di node :CorpusVersion milik build baru sehingga bisa di-rollback.
+    """
+    previous = active_database(alias)
+    if previous == database:
+        print(f"ℹ️  Alias '{alias}' sudah menunjuk ke '{database}'.")
+        return
+    if not force:
+        problems = validate_version(database, alias)
+        if problems:
+            raise RuntimeError(f"❌ Validasi '{database}' gagal: " + "; ".join(problems))
+    warm_up(database)
+
+    if record_previous:
+        with get_driver().session(database=database) as session:
+            session.run("""
+                MERGE (v:CorpusVersion)
+                SET v.database = $database, v.previous = $previous, v.activated_at = datetime()
+            """, database=database, previous=previous).consume()
+    with _system_session() as session:
+        session.run(f"CREATE OR REPLACE ALIAS `{alias}` FOR DATABASE `{database}`").consume()
+    # elementId berbeda antar database: jawaban dan rantai chunk versi lama tidak berlaku lagi
+    clear_volatile_caches()
+    print(f"✅ Alias '{alias}' sekarang menunjuk ke '{database}' (sebelumnya: {previous or '-'}).")
+
+def rollback(alias=CORPUS_ALIAS):
+    """Mengembalikan alias ke versi yang aktif sebelum versi sekarang."""
+    current = active_database(alias)
+    if current is None:
+        raise RuntimeError(f"❌ Alias '{alias}' belum ada.")
+    with get_driver().session(database=current) as session:
+        record = session.run("MATCH (v:CorpusVersion) RETURN v.previous AS previous").single()
+    previous = record["previous"] if record else None
+    if not previous:
+        raise RuntimeError(f"❌ Tidak ada versi sebelumnya yang tercatat untuk '{current}'.")
+    # Versi lama sudah pernah live, jadi tidak divalidasi ulang dan catatannya tidak ditimpa
+    switch_version(previous, alias, force=True, record_previous=False)
+
+def drop_version(database, alias=CORPUS_ALIAS):
+    if database == active_database(alias):
+        raise RuntimeError(f"❌ '{database}' sedang aktif dan tidak boleh dihapus.")
+    with _system_session() as session:
+        session.run(f"DROP DATABASE `{database}` IF EXISTS WAIT").consume()
+    print(f"🗑️  Database '{database}' dihapus.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kelola versi korpus blue/green di Neo4j")
+    parser.add_argument("--alias", default=CORPUS_ALIAS, help="Alias yang dibaca backend (NEO4J_DATABASE)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Daftar versi dan versi yang aktif")
+    for name, help_text in (("validate", "Validasi sebuah build"), ("switch", "Alihkan alias ke build ini"),
+                            ("drop", "Hapus build yang tidak aktif")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("version", help="Nama versi atau database")
+    commands.choices["switch"].add_argument("--force", action="store_true", help="Lewati validasi")
+    commands.add_parser("rollback", help="Kembali ke versi aktif sebelumnya")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "list":
+            for name, status, active in list_versions(args.alias):
+                print(f"{'*' if active else ' '} {name} ({status})")
+        elif args.command == "rollback":
+            rollback(args.alias)
+        else:
+            database = resolve_database(args.version)
+            if args.command == "validate":
+                problems = validate_version(database, args.alias)
+                for problem in problems:
+                    print(f"❌ {problem}")
+                if problems:
+                    sys.exit(1)
+                print(f"✅ '{database}' lolos validasi.")
+            elif args.command == "switch":
+                switch_version(database, args.alias, args.force)
+            elif args.command == "drop":
+                drop_version(database, args.alias)
+    except (RuntimeError, ValueError) as e:
+        print(str(e))
+        sys.exit(1)
+    finally:
+        get_driver().close()
@@ -0,0 +1,277 @@
+# replay.py
+"""
+Lapisan record/replay untuk menjalankan evaluasi tanpa Neo4j dan Ollama.
+
+Mode diatur lewat environment variable:
+    GRAPHRAG_FIXTURE_MODE = "record" | "replay"   (kosong = normal, tanpa fixture)
+    GRAPHRAG_FIXTURE      = path file fixture (.json.gz)
+
+- record : driver dan embedder asli dibungkus; setiap embedding query dan hasil
+           execute_query disimpan ke fixture saat proses selesai.
+- replay : tidak ada koneksi ke layanan apapun; embedding dan hasil query dibaca
+           dari fixture secara deterministik.
+
+Hanya driver.execute_query yang direkam; kode yang memakai driver.session() (ingestion,
+knn.py, create_index.py) tetap membutuhkan Neo4j. Sebuah query hanya bisa di-replay
+jika query yang sama persis (termasuk parameternya) pernah direkam, lihat record_fixture.py.
+
+Fixture berupa JSON ter-gzip. Embedding disimpan sebagai float32 base64 dan
+properti `embedding` pada node dibuang agar file tetap ringkas.
+"""
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from array import array
+from collections import namedtuple
+
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+FIXTURE_MODE = os.getenv("GRAPHRAG_FIXTURE_MODE", "").strip().lower()
+FIXTURE_PATH = os.getenv("GRAPHRAG_FIXTURE", "fixtures/retrieval_fixture.json.gz")
+
+logger = logging.getLogger(__name__)
+
+ReplayResult = namedtuple("ReplayResult", ["records", "summary", "keys"])
+
+
+def _encode_vector(vector):
+    return base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+
+
+def _decode_vector(encoded):
+    return array("f", base64.b64decode(encoded)).tolist()
+
+
+def _text_key(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _query_key(query, parameters):
+    normalized = " ".join(query.split())
+    payload = json.dumps([normalized, parameters or {}], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _encode_value(value):
+    if hasattr(value, "element_id") and hasattr(value, "labels"):
+        properties = {key: _encode_value(val) for key, val in dict(value).items() if key != "embedding"}
+        return {"__node__": True, "element_id": value.element_id, "labels": sorted(value.labels), "properties": properties}
+    if isinstance(value, dict):
+        return {key: _encode_value(val) for key, val in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode_value(val) for val in value]
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if value.get("__node__"):
+            return ReplayNode(value["element_id"], value["labels"], value["properties"])
+        return {key: _decode_value(val) for key, val in value.items()}
+    if isinstance(value, list):
+        return [_decode_value(val) for val in value]
+    return value
+
+
+class ReplayNode:
+    """Pengganti neo4j.graph.Node dengan API baca yang sama (element_id, labels, get, [])."""
+
+    def __init__(self, element_id, labels, properties):
+        self.element_id = element_id
+        self.labels = frozenset(labels)
+        self._properties = properties
+
+    def get(self, key, default=None):
+        return self._properties.get(key, default)
+
+    def __getitem__(self, key):
+        return self._properties[key]
+
+    def keys(self):
+        return self._properties.keys()
+
+    def items(self):
+        return self._properties.items()
+
+
+class ReplayRecord:
+    """Pengganti neo4j.Record: akses per kunci, get(), keys(), values(), items(), data()."""
+
+    def __init__(self, keys, values):
+        self._keys = list(keys)
+        self._values = list(values)
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self._values[key]
+        return self._values[self._keys.index(key)]
+
+    def get(self, key, default=None):
+        return self._values[self._keys.index(key)] if key in self._keys else default
+
+    def keys(self):
+        return list(self._keys)
+
+    def values(self):
+        return list(self._values)
+
+    def items(self):
+        return list(zip(self._keys, self._values))
+
+    def data(self):
+        return dict(self.items())
+
+
+class Fixture:
+    def __init__(self, path):
+        self.path = path
+        self.embeddings = {}
+        self.queries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            self.embeddings = data.get("embeddings", {})
+            self.queries = data.get("queries", {})
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock:
+            data = {"version": 1, "embeddings": self.embeddings, "queries": self.queries}
+            with gzip.open(self.path, "wt", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        logger.info("Fixture disimpan: %s (%d embedding, %d query)", self.path, len(self.embeddings), len(self.queries))
+
+
+class RecordingDriver:
+    """Membungkus driver asli dan merekam hasil setiap execute_query."""
+
+    def __init__(self, driver, fixture):
+        self._driver = driver
+        self._fixture = fixture
+
+    def execute_query(self, query, parameters_=None, **kwargs):
+        parameters = dict(parameters_ or {})
+        parameters.update({key: val for key, val in kwargs.items() if not key.endswith("_")})
+        result = self._driver.execute_query(query, parameters_, **kwargs)
+
+        encoded = {
+            "keys": list(result.keys),
+            "rows": [[_encode_value(val) for val in record.values()] for record in result.records],
+        }
+        with self._fixture._lock:
+            self._fixture.queries[_query_key(query, parameters)] = encoded
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+class ReplayDriver:
+    """Driver tanpa koneksi yang menjawab execute_query dari fixture."""
+
+    def __init__(self, fixture):
+        self._fixture = fixture
+
+    def execute_query(self, query, parameters_=None, **kwargs):
+        parameters = dict(parameters_ or {})
+        parameters.update({key: val for key, val in kwargs.items() if not key.endswith("_")})
+        encoded = self._fixture.queries.get(_query_key(query, parameters))
+        if encoded is None:
+            raise KeyError("Query tidak ada di fixture; rekam ulang dengan GRAPHRAG_FIXTURE_MODE=record. "
+                           f"Query: {' '.join(query.split())[:120]}")
+        records = [ReplayRecord(encoded["keys"], [_decode_value(val) for val in row]) for row in encoded["rows"]]
+        return ReplayResult(records=records, summary=None, keys=encoded["keys"])
+
+    def session(self, *args, **kwargs):
+        raise RuntimeError("Mode replay tidak punya koneksi Neo4j: driver.session() tidak tersedia, "
+                           "hanya driver.execute_query yang dijawab dari fixture. Jalankan tanpa "
+                           "GRAPHRAG_FIXTURE_MODE=replay untuk ingestion, knn.py atau create_index.py.")
+
+    def verify_connectivity(self):
+        return None
+
+    def close(self):
+        return None
+
+
+class RecordingEmbedder:
+    """
+    Membungkus embedder asli dan merekam embedding query.
+    Vektor dikembalikan dalam presisi float32 yang sama dengan isi fixture,
+    sehingga parameter vector search saat record dan replay identik.
+    """
+
+    def __init__(self, embedder, fixture):
+        self._embedder = embedder
+        self._fixture = fixture
+
+    def _record(self, text, vector):
+        encoded = _encode_vector(vector)
+        with self._fixture._lock:
+            self._fixture.embeddings[_text_key(text)] = encoded
+        return _decode_vector(encoded)
+
+    def embed_query(self, text):
+        return self._record(text, self._embedder.embed_query(text))
+
+    def embed_text(self, text):
+        return self._record(text, self._embedder.embed_text(text))
+
+    def __getattr__(self, name):
+        return getattr(self._embedder, name)
+
+
+class ReplayEmbedder:
+    """Embedder tanpa model yang membaca embedding dari fixture."""
+
+    def __init__(self, fixture, model_name="replay"):
+        self._fixture = fixture
+        self.model = model_name
+
+    def embed_query(self, text):
+        encoded = self._fixture.embeddings.get(_text_key(text))
+        if encoded is None:
+            raise KeyError(f"Embedding tidak ada di fixture untuk teks: {text[:80]!r}")
+        return _decode_vector(encoded)
+
+    embed_text = embed_query
+
+
+_fixture = None
+
+
+def get_fixture():
+    global _fixture
+    if _fixture is None and FIXTURE_MODE in (MODE_RECORD, MODE_REPLAY):
+        _fixture = Fixture(FIXTURE_PATH)
+        if FIXTURE_MODE == MODE_RECORD:
+            atexit.register(_fixture.save)
+        logger.info("Mode fixture '%s' aktif: %s", FIXTURE_MODE, FIXTURE_PATH)
+    return _fixture
+
+
+def wrap_driver(create_driver):
+    """Membuat driver sesuai mode fixture. `create_driver` hanya dipanggil jika butuh driver asli."""
+    fixture = get_fixture()
+    if FIXTURE_MODE == MODE_REPLAY:
+        return ReplayDriver(fixture)
+    if FIXTURE_MODE == MODE_RECORD:
+        return RecordingDriver(create_driver(), fixture)
+    return create_driver()
+
+
+def wrap_embedder(create_embedder):
+    """Membuat embedder sesuai mode fixture. `create_embedder` hanya dipanggil jika butuh model asli."""
+    fixture = get_fixture()
+    if FIXTURE_MODE == MODE_REPLAY:
+        return ReplayEmbedder(fixture)
+    if FIXTURE_MODE == MODE_RECORD:
+        return RecordingEmbedder(create_embedder(), fixture)
+    return create_embedder()
@@ -1,16 +1,69 @@
-from retrieval.retrieval import vector_search_chunks_generator
-from retrieval.traversal import find_info_chunk_id, get_full_context_from_info, get_neighboring_hadiths_in_bab
+import logging
+import time
+
+from retrieval.retrieval import vector_search_chunks_generator, keyword_search_hadith_by_number
+from retrieval.traversal import find_info_chunk_id, get_full_context_from_info, get_neighboring_hadiths_in_bab, get_related_infos
+from retrieval.context_packer import pack_sources
+from retrieval.records import SourceRecord, ContextBundle, PROVENANCE_HIT, PROVENANCE_NEIGHBOUR, PROVENANCE_RELATED, PROVENANCE_KEYWORD
+from config import CONTEXT_TOKEN_BUDGET
+from tracing import span, current_span
+
+logger = logging.getLogger(__name__)
 
 NEIGHBOR_LIMIT = 2
 
+# Vector search hanya mengambil top_k * VECTOR_OVERFETCH kandidat; slot yang tersisa
+# diisi dari hop graf :RELATED_TO yang jauh lebih murah.
+VECTOR_OVERFETCH = 2
+# Maksimal tetangga :RELATED_TO per info chunk pada hop ke-1, ke-2, dst.
+RELATED_HOP_LIMITS = (3, 2)
+# Skor tetangga = skor asal * similarity relasi * decay (per hop)
+RELATED_SCORE_DECAY = 0.85
+
 def preview(text, max_len=80):
     return (text[:max_len] + "...") if text and len(text) > max_len else (text or "-")
 
-def build_chunk_context_interleaved(query_text, top_k=5, min_score=0.6):
-    context = ""
+def expand_related(seeds, visited_info_ids, slots):
+    """
+    Tahap ekspansi graf: mengikuti relasi :RELATED_TO dari hit vector teratas.
+    - seeds: daftar (info_id, skor) dari vector hit, urut dari skor tertinggi.
+    - Setiap hop dibatasi RELATED_HOP_LIMITS dan skornya diturunkan RELATED_SCORE_DECAY.
+    - Mengembalikan maksimal `slots` tuple (info_id, skor, hop) yang belum dikunjungi.
+    """
+    if slots <= 0 or not seeds:
+        return []
+
+    frontier = dict(seeds)
+    candidates = {}
+    for hop, limit in enumerate(RELATED_HOP_LIMITS, start=1):
+        next_frontier = {}
+        for from_id, info_id, similarity in get_related_infos(list(frontier), limit=limit):
+            if info_id in visited_info_ids:
+                continue
+            score = frontier[from_id] * (similarity or 0.0) * RELATED_SCORE_DECAY
+            if info_id not in candidates or score > candidates[info_id][0]:
+                candidates[info_id] = (score, hop)
+                next_frontier[info_id] = score
+        if not next_frontier:
+            break
+        frontier = next_frontier
+
+    ranked = sorted(candidates.items(), key=lambda item: item[1][0], reverse=True)
+    return [(info_id, score, hop) for info_id, (score, hop) in ranked[:slots]]
+
+def build_context(query_text, top_k=5, min_score=0.6, token_budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Retrieval lengkap (vector hit, tetangga bab, ekspansi RELATED_TO) sebagai ContextBundle.
+    Setiap sumber membawa skor, asal-usul (hit/neighbour/related) dan cakupan chunk-nya;
+    durasi tiap tahap dicatat di `timings`.
+    """
+    sources = []
     visited_info_ids = set()
+    seeds = []
+    timings = {}
+    traversal_seconds = 0.0
 
-    for record in vector_search_chunks_generator(query_text, top_k=top_k*3, min_score=min_score):
+    for record in vector_search_chunks_generator(query_text, top_k=top_k*VECTOR_OVERFETCH, min_score=min_score, timings=timings):
         if len(visited_info_ids) >= top_k:
             break
 
@@ -20,60 +73,51 @@ def build_chunk_context_interleaved(query_text, top_k=5, min_score=0.6):
             chunk_type = hit_node.get("source", "tidak diketahui")
             similarity = record["score"]
         except Exception as e:
-            print(f"  Gagal memproses record: {e}")
+            logger.warning("Gagal memproses record: %s", e)
             continue
 
-        print(f"\n🎯 Vector hit → Chunk '{chunk_type}' (ID: {chunk_id}) | Skor: {similarity:.4f}")
+        logger.debug("Vector hit → Chunk '%s' (ID: %s) | Skor: %.4f", chunk_type, chunk_id, similarity)
 
+        started = time.perf_counter()
         info_id = find_info_chunk_id(chunk_id)
+        traversal_seconds += time.perf_counter() - started
         if not info_id:
-            print(f"   Tidak bisa temukan info root dari chunk ID={chunk_id}")
+            logger.warning("Tidak bisa temukan info root dari chunk ID=%s", chunk_id)
             continue
 
-        print(f"   → Traversal ke info ID={info_id}")
+        logger.debug("Traversal ke info ID=%s", info_id)
 
         if info_id in visited_info_ids:
-            print(f"   Info ID={info_id} sudah diproses.")
+            logger.debug("Info ID=%s sudah diproses.", info_id)
             continue
         visited_info_ids.add(info_id)
 
-        row = get_full_context_from_info(info_id)
+        started = time.perf_counter()
+        # Hanya sub-chunk di sekitar chunk yang cocok (dan tetangganya) yang masuk konteks
+        row = get_full_context_from_info(info_id, hit_chunk_id=chunk_id)
+        traversal_seconds += time.perf_counter() - started
         if not row:
             continue
+        seeds.append((info_id, similarity))
+
+        source = SourceRecord.from_row(info_id, row, PROVENANCE_HIT, similarity)
 
-        is_hadith = False
-        if row.get("surah_name") and row.get("ayat_number"):
-            sumber = f"Surah: {row.get('surah_name')} | Ayat: {row.get('ayat_number')}"
-        elif row.get("source_name") and row.get("hadith_number"):
-            is_hadith = True
-            sumber = (f"Hadis {row.get('source_name')} No. {row.get('hadith_number')} | "
-                      f"Kitab: {row.get('kitab_name', '-')}, Bab: {row.get('bab_name', '-')}")
-
-        print(f"   Konteks utama ditemukan → {sumber}")
-        print("   Potongan isi:")
-        print(f"      Info       : {preview(row.get('info_text'))}")
-        print(f"      Teks Arab  : {preview(row.get('text_text'))}")
-        print(f"      Terjemahan : {preview(row.get('translation_text'))}")
-        if not is_hadith:
-            print(f"      Tafsir     : {preview(row.get('tafsir_text'))}")
-
-        context += f"""\n{sumber}
-Skor Similarity: {similarity:.4f}
-➤ Info: {row.get('info_text') or '-'}
-➤ Teks Arab: {row.get('text_text') or '-'}
-➤ Terjemahan: {row.get('translation_text') or '-'}
-"""
-        if not is_hadith:
-            context += f"➤ Tafsir: {row.get('tafsir_text') or '-'}\n"
-        context += "---\n"
-
-        if is_hadith:
-            print(f"   ➡️ Mencari hadis tetangga dari Bab '{row.get('bab_name')}'")
+        # Potongan isi hanya dibangun jika level DEBUG aktif
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Konteks utama ditemukan → %s | Info: %s | Teks Arab: %s | Terjemahan: %s | Tafsir: %s",
+                         source.source_id, preview(source.info_text), preview(source.text_text),
+                         preview(source.translation_text), preview(source.tafsir_text))
+
+        sources.append(source)
+
+        if source.is_hadith:
+            logger.debug("Mencari hadis tetangga dari Bab '%s'", source.bab_name)
+            started = time.perf_counter()
             neighbor_ids = get_neighboring_hadiths_in_bab(
-                bab_name=row.get('bab_name'),
-                kitab_name=row.get('kitab_name'),
-                source_name=row.get('source_name'),
-                exclude_hadith_number=row.get('hadith_number'),
+                bab_name=source.bab_name,
+                kitab_name=source.kitab_name,
+                source_name=source.source_name,
+                exclude_hadith_number=source.hadith_number,
                 limit=NEIGHBOR_LIMIT
             )
 
@@ -86,16 +130,68 @@ Skor Similarity: {similarity:.4f}
 
                 visited_info_ids.add(neighbor_info_id)
 
-                neighbor_sumber = (f"Hadis {neighbor_row.get('source_name')} No. {neighbor_row.get('hadith_number')} | "
-                                   f"Kitab: {neighbor_row.get('kitab_name', '-')}, Bab: {neighbor_row.get('bab_name', '-')}")
-
-                print(f"      ↪️  Tambahan konteks: {neighbor_sumber}")
-                print(f"         Info: {preview(neighbor_row.get('info_text'))}")
-
-                context += f"""\n{neighbor_sumber}
-Skor Similarity: N/A (Tetangga)
-➤ Info: {neighbor_row.get('info_text') or '-'}
-➤ Teks Arab: {neighbor_row.get('text_text') or '-'}
-➤ Terjemahan: {neighbor_row.get('translation_text') or '-'}
----\n"""
-    return context
+                neighbor = SourceRecord.from_row(neighbor_info_id, neighbor_row, PROVENANCE_NEIGHBOUR, None,
+                                                 weight=similarity * RELATED_SCORE_DECAY)
+
+                logger.debug("Tambahan konteks: %s", neighbor.source_id)
+
+                sources.append(neighbor)
+            traversal_seconds += time.perf_counter() - started
+
+    timings["traversal"] = traversal_seconds
+
+    # Slot yang masih kosong diisi dari hop graf :RELATED_TO, bukan dari vector search yang lebih dalam
+    started = time.perf_counter()
+    with span("expansion", seeds=len(seeds), slots=top_k - len(visited_info_ids)) as s:
+        expanded = 0
+        for related_info_id, score, hop in expand_related(seeds, visited_info_ids, top_k - len(visited_info_ids)):
+            related_row = get_full_context_from_info(related_info_id)
+            if not related_row: continue
+
+            visited_info_ids.add(related_info_id)
+
+            related = SourceRecord.from_row(related_info_id, related_row, PROVENANCE_RELATED, score, hop=hop)
+            logger.debug("Ekspansi RELATED_TO (hop %d) → %s | Skor: %.4f", hop, related.source_id, score)
+
+            sources.append(related)
+            expanded += 1
+        s.set_attribute("added", expanded)
+    timings["expansion"] = time.perf_counter() - started
+
+    # Bagi anggaran token ke setiap sumber sesuai skornya; tafsir panjang dipotong per slot
+    started = time.perf_counter()
+    with span("packing", budget=token_budget, candidates=len(sources)) as s:
+        packed, context_tokens = pack_sources(sources, budget=token_budget)
+        s.set_attributes(sources=len(packed), tokens=context_tokens)
+    timings["packing"] = time.perf_counter() - started
+    current_span().set_attributes(hits=len(seeds), sources=len(packed), context_tokens=context_tokens)
+    logger.info("Konteks: %d/%d sumber, ~%d token (anggaran %d)", len(packed), len(sources), context_tokens, token_budget)
+
+    return ContextBundle(sources=packed, tokens=context_tokens, timings=timings)
+
+def build_keyword_context(hadith_number):
+    """
+    Konteks dari pencocokan nomor hadis secara langsung (tanpa vector search).
+    Mengembalikan ContextBundle kosong jika nomor hadis tidak ditemukan.
+    """
+    timings = {}
+    started = time.perf_counter()
+    info_id = keyword_search_hadith_by_number(hadith_number)
+    timings["keyword_search"] = time.perf_counter() - started
+    if not info_id:
+        return ContextBundle(timings=timings)
+
+    logger.info("Pencocokan kata kunci hadis. Melakukan traversal dari info_id: %s", info_id)
+    started = time.perf_counter()
+    row = get_full_context_from_info(info_id)
+    timings["traversal"] = time.perf_counter() - started
+    if not row:
+        return ContextBundle(timings=timings)
+
+    source = SourceRecord.from_row(info_id, row, PROVENANCE_KEYWORD, 1.0)
+    packed, context_tokens = pack_sources([source])
+    return ContextBundle(sources=packed, tokens=context_tokens, timings=timings)
+
+def build_chunk_context_interleaved(query_text, top_k=5, min_score=0.6, token_budget=CONTEXT_TOKEN_BUDGET):
+    """Versi string dari build_context, dirender dalam satu kali jalan."""
+    return build_context(query_text, top_k=top_k, min_score=min_score, token_budget=token_budget).render()
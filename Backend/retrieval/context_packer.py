@@ -0,0 +1,63 @@
+# retrieval/context_packer.py
+"""
+Menyusun sumber hasil retrieval ke dalam anggaran token yang tetap,
+agar ukuran prompt (dan latensi Groq) tidak bergantung pada ayat mana yang menang.
+"""
+from dataclasses import replace
+
+from config import CONTEXT_TOKEN_BUDGET
+from token_count import estimate_tokens, truncate_to_tokens
+
+# Urutan field yang dipotong jika slot sebuah sumber tidak cukup
+TRIM_ORDER = ("tafsir_text", "translation_text", "text_text")
+# Sumber dengan slot lebih kecil dari ini dibuang daripada dipotong habis
+MIN_SLOT_TOKENS = 64
+# Bobot minimum agar sumber tanpa skor (tetangga) tetap kebagian slot
+MIN_WEIGHT = 0.1
+
+
+def pack_sources(sources, budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Membagi anggaran token ke setiap sumber sebanding dengan skornya.
+
+    Args:
+        sources (list): Daftar SourceRecord, urut sesuai urutan tampil di konteks.
+        budget (int): Total token yang boleh dipakai oleh seluruh konteks.
+
+    Returns:
+        tuple: (daftar SourceRecord yang muat dengan urutan asli, total token terpakai).
+    """
+    order = sorted(range(len(sources)), key=lambda i: sources[i].weight or 0.0, reverse=True)
+    remaining_budget = budget
+    remaining_weight = sum(max(source.weight or 0.0, MIN_WEIGHT) for source in sources)
+    packed = [None] * len(sources)
+
+    # Sumber dengan skor tertinggi dialokasikan lebih dulu; sisa slot yang tidak terpakai
+    # otomatis jatuh ke sumber berikutnya karena share dihitung dari sisa anggaran.
+    for i in order:
+        source = sources[i]
+        weight = max(source.weight or 0.0, MIN_WEIGHT)
+        share = int(remaining_budget * weight / remaining_weight) if remaining_weight > 0 else 0
+        remaining_weight -= weight
+
+        cost = estimate_tokens(source.render())
+        for field in TRIM_ORDER:
+            if cost <= share:
+                break
+            current = estimate_tokens(getattr(source, field))
+            if not current:
+                continue
+            trimmed = truncate_to_tokens(getattr(source, field), max(current - (cost - share), 0))
+            source = replace(source, **{field: trimmed})
+            cost = estimate_tokens(source.render())
+
+        # Sumber yang bagian tak terpotongnya (info dan tag) tetap melebihi slot hanya boleh
+        # meminjam dari sisa anggaran, tidak pernah melampaui total `budget`
+        if cost > share and (share < MIN_SLOT_TOKENS or cost > remaining_budget):
+            continue
+
+        remaining_budget -= cost
+        packed[i] = replace(source, tokens=cost)
+
+    packed = [source for source in packed if source is not None]
+    return packed, sum(source.tokens for source in packed)
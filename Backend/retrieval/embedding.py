@@ -1,9 +1,31 @@
 # retrieval/embedding.py
 
-from groq_embedder import Embedder
+from groq_embedder import get_embedder
+from tracing import span
+from metrics import CACHE_REQUESTS
+
+# Cache embedding query opsional (objek dengan get(text) dan set(text, vector)),
+# dipasang oleh evaluation_engine agar query yang sama tidak di-embed ulang.
+_query_cache = None
+
+def set_query_cache(cache):
+    global _query_cache
+    _query_cache = cache
 
 def embed_query(text):
-    return Embedder.embed_query(text)
+    embedder = get_embedder()
+    with span("embedding", model=embedder.model, text_chars=len(text)) as s:
+        if _query_cache is not None:
+            vector = _query_cache.get(text)
+            s.set_attribute("cache_hit", vector is not None)
+            CACHE_REQUESTS.labels("query_embedding", "hit" if vector is not None else "miss").inc()
+            if vector is not None:
+                return vector
+
+        vector = embedder.embed_query(text)
+        if _query_cache is not None and vector:
+            _query_cache.set(text, vector)
+        return vector
 
 def embed_combined(teks_pertanyaan, riwayat_chat):
     combined_text = f"Pertanyaan: {teks_pertanyaan}\nRiwayat Chat: {riwayat_chat}"
@@ -1,6 +1,9 @@
 # retrieval/parser.py
+import logging
 import re
 
+logger = logging.getLogger(__name__)
+
 def parse_hadith_query(query_text: str) -> dict | None:
     """
     Mendeteksi apakah query meminta hadis spesifik berdasarkan nomor.
@@ -17,7 +20,7 @@ def parse_hadith_query(query_text: str) -> dict | None:
 
     if match:
         number = match.group(1) # Grup pertama adalah nomor (\d+)
-        print(f"✅ Parser menemukan permintaan Hadis Bukhari Nomor: {number}")
+        logger.info("Parser menemukan permintaan Hadis Bukhari Nomor: %s", number)
         return {"book": "bukhari", "number": int(number)} # Konversi ke integer
 
     return None
\ No newline at end of file
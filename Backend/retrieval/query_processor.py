@@ -5,16 +5,36 @@
 # library 'streamlit' dalam bentuk apapun.
 # Semua state, seperti riwayat chat, harus diterima melalui parameter fungsi.
 
+import logging
+import os
+from contextlib import nullcontext
+
 # Asumsi file-file ini juga berada di dalam folder backend/retrieval/
 from retrieval.input_validation import validate_input
 from retrieval.topic_detector import is_topic_changed, get_last_question
-from retrieval.context_builder import build_chunk_context_interleaved
+from retrieval.context_builder import build_context, build_keyword_context
 from retrieval.parser import parse_hadith_query
-from retrieval.retrieval import keyword_search_hadith_by_number
-from retrieval.traversal import get_full_context_from_info
+from retrieval.single_flight import SingleFlight, request_key
 
 # Asumsi file ini berada di dalam folder backend/
 from generation import generate_answer
+from tracing import span, traced, current_span
+from metrics import CACHE_REQUESTS, COALESCED_REQUESTS, ROUTES, TOPIC_DECISIONS
+
+logger = logging.getLogger(__name__)
+
+# Request identik yang datang bersamaan berbagi satu eksekusi pipeline (lihat single_flight.py)
+REQUEST_COALESCING = os.getenv("REQUEST_COALESCING", "1") == "1"
+_in_flight = SingleFlight()
+
+# Cache jawaban opsional (objek dengan get(key) dan set(key, value), lihat shared_cache.py),
+# dipasang oleh main.py. Jawaban gagal/tanpa konteks tidak disimpan.
+_answer_cache = None
+UNCACHED_ANSWER_PREFIXES = ("❌", "⚠️")
+
+def set_answer_cache(cache):
+    global _answer_cache
+    _answer_cache = cache
 
 
 def build_semantic_query(teks_pertanyaan: str, history: list) -> str:
@@ -22,13 +42,12 @@ def build_semantic_query(teks_pertanyaan: str, history: list) -> str:
     Membangun kueri yang kaya konteks dengan menyertakan riwayat obrolan untuk embedding.
     Fungsi ini tidak diubah karena sudah menerima 'history' sebagai parameter.
     """
-    combined = ""
-    for q, a in history:
-        combined += f"User: {q}\nAssistant: {a}\n"
-    combined += f"User: {teks_pertanyaan}"
-    return combined
+    turns = [f"User: {q}\nAssistant: {a}\n" for q, a in history]
+    turns.append(f"User: {teks_pertanyaan}")
+    return "".join(turns)
 
 
+@traced("ask")
 def process_user_query(teks_pertanyaan: str, riwayat_chat: list) -> str:
     """
     Memproses kueri pengguna dari input hingga jawaban akhir.
@@ -42,65 +61,58 @@ def process_user_query(teks_pertanyaan: str, riwayat_chat: list) -> str:
     Returns:
         str: Jawaban akhir yang dihasilkan untuk dikirim kembali ke frontend.
     """
-    print(f"Backend memproses kueri: '{teks_pertanyaan}'")
-    print(f"Dengan riwayat: {riwayat_chat}")
+    # Isi riwayat lengkap hanya di level DEBUG; di INFO cukup jumlah gilirannya
+    logger.info("Backend memproses kueri: '%s' (%d giliran riwayat)", teks_pertanyaan, len(riwayat_chat))
+    logger.debug("Dengan riwayat: %s", riwayat_chat)
+    current_span().set_attributes(question_chars=len(teks_pertanyaan), history_turns=len(riwayat_chat))
 
     # 1. Validasi input
-    valid, message = validate_input(teks_pertanyaan, riwayat_chat)
+    with span("validation") as s:
+        valid, message = validate_input(teks_pertanyaan, riwayat_chat)
+        s.set_attribute("valid", valid)
     if not valid:
         return message
 
     # 2. Cek perubahan topik (jika diperlukan)
     # Logika ini sekarang bekerja dengan 'riwayat_chat' yang diterima dari frontend
     last_question = get_last_question(riwayat_chat)
-    if last_question and is_topic_changed(teks_pertanyaan, last_question):
-        print("Backend mendeteksi topik berubah, riwayat untuk konteks akan diabaikan.")
+    with span("topic_detection", has_history=bool(last_question)) as s:
+        topic_changed = bool(last_question) and is_topic_changed(teks_pertanyaan, last_question)
+        s.set_attribute("changed", topic_changed)
+    TOPIC_DECISIONS.labels("changed" if topic_changed else "same" if last_question else "no_history").inc()
+    if topic_changed:
+        logger.info("Backend mendeteksi topik berubah, riwayat untuk konteks akan diabaikan.")
         # Mengosongkan riwayat hanya untuk proses pencarian konteks di bawah ini
         riwayat_chat_untuk_konteks = []
     else:
         riwayat_chat_untuk_konteks = riwayat_chat
 
     # 3. Proses pencarian berdasarkan kata kunci (jika ada)
-    context = ""
+    context = None
     hadith_request = parse_hadith_query(teks_pertanyaan)
-    
-    if hadith_request:
-        info_id = keyword_search_hadith_by_number(hadith_request["number"])
-        if info_id:
-            print(f"Pencocokan kata kunci hadis. Melakukan traversal dari info_id: {info_id}")
-            row = get_full_context_from_info(info_id)
-            if row:
-                sumber = (f"📘 Hadis {row.get('source_name')} No. {row.get('hadith_number')}\n"
-                          f"Kitab: {row.get('kitab_name', '-')} | Bab: {row.get('bab_name', '-')}")
-
-                context = f"""
-{sumber}
-Skor Similarity: 1.00 (Exact Match)
 
-➤ Info:
-{row.get('info_text') or '-'}
-
-➤ Teks Arab:
-{row.get('text_text') or '-'}
-
-➤ Terjemahan:
-{row.get('translation_text') or '-'}
----
-"""
+    if hadith_request:
+        with span("keyword_search", hadith_number=hadith_request["number"]) as s:
+            context = build_keyword_context(hadith_request["number"])
+            s.set_attribute("found", bool(context))
 
     # 4. Jika tidak ada hasil dari kata kunci, gunakan pencarian vektor
+    route = "keyword" if context else "vector"
+    current_span().set_attribute("route", route)
+    ROUTES.labels(route).inc()
     if not context:
-        print("Tidak ada hasil dari kata kunci, beralih ke pencarian vektor.")
+        logger.info("Tidak ada hasil dari kata kunci, beralih ke pencarian vektor.")
         combined_query = build_semantic_query(teks_pertanyaan, riwayat_chat_untuk_konteks)
-        context = build_chunk_context_interleaved(combined_query, top_k=5, min_score=0.6)
+        with span("retrieval", top_k=5, min_score=0.6):
+            context = build_context(combined_query, top_k=5, min_score=0.6)
 
     # 5. Jika tetap tidak ada konteks, kembalikan pesan error
     if not context:
-        print("Konteks tidak ditemukan dari sumber manapun.")
+        logger.warning("Konteks tidak ditemukan dari sumber manapun.")
         return "❌ Maaf, saya tidak dapat menemukan informasi yang relevan dengan pertanyaan Anda saat ini."
 
     # 6. Hasilkan jawaban menggunakan LLM
-    print("Konteks ditemukan, memanggil generator jawaban...")
+    logger.debug("Konteks ditemukan, memanggil generator jawaban...")
 
     # --- [INI DIA PERBAIKAN FINAL DAN SATU-SATUNYA YANG DIPERLUKAN] ---
     # Panggil generate_answer dengan NAMA ARGUMEN (keyword) YANG TEPAT
@@ -114,5 +126,47 @@ Skor Similarity: 1.00 (Exact Match)
     # --------------------------------------------------------------------
 
     # 7. Kembalikan jawaban akhir sebagai string
-    print("Jawaban berhasil digenerate, mengembalikan ke API endpoint.")
-    return answer
\ No newline at end of file
+    logger.info("Jawaban berhasil digenerate, mengembalikan ke API endpoint.")
+    return answer
+
+
+def answer_query(teks_pertanyaan: str, riwayat_chat: list, admit=nullcontext) -> str:
+    """
+    Titik masuk untuk endpoint API: sama seperti process_user_query, tetapi pertanyaan
+    identik (setelah normalisasi, dengan riwayat yang sama) yang sedang diproses
+    bersamaan hanya menjalankan embedding, retrieval dan panggilan Groq satu kali.
+    Jika cache jawaban terpasang, pertanyaan yang sudah pernah dijawab (oleh worker
+    mana pun) langsung diambil dari cache.
+
+    `admit` adalah factory context manager (misal admission.slot) yang hanya dipakai
+    oleh request yang benar-benar menjalankan pipeline: cache hit dan follower yang
+    menunggu request identik tidak memakan slot admission.
+    """
+    key = request_key(teks_pertanyaan, riwayat_chat)
+    if _answer_cache is not None:
+        answer = _answer_cache.get(key)
+        CACHE_REQUESTS.labels("answer", "hit" if answer is not None else "miss").inc()
+        if answer is not None:
+            logger.info("Jawaban diambil dari cache jawaban.")
+            return answer
+
+    if not REQUEST_COALESCING:
+        return _admitted_answer(admit, key, teks_pertanyaan, riwayat_chat)
+
+    answer, shared = _in_flight.do(key, _admitted_answer, admit, key, teks_pertanyaan, riwayat_chat)
+    COALESCED_REQUESTS.labels("follower" if shared else "leader").inc()
+    if shared:
+        logger.info("Jawaban diambil dari request identik yang sedang berjalan.")
+    return answer
+
+
+def _admitted_answer(admit, key, teks_pertanyaan, riwayat_chat):
+    with admit():
+        return _answer_and_cache(key, teks_pertanyaan, riwayat_chat)
+
+
+def _answer_and_cache(key, teks_pertanyaan, riwayat_chat):
+    answer = process_user_query(teks_pertanyaan, riwayat_chat)
+    if _answer_cache is not None and not answer.startswith(UNCACHED_ANSWER_PREFIXES):
+        _answer_cache.set(key, answer)
+    return answer
@@ -0,0 +1,133 @@
+# retrieval/records.py
+"""
+Objek hasil retrieval terstruktur: setiap sumber adalah SourceRecord (ID sumber, skor,
+asal-usul hit/tetangga/relasi, cakupan chunk), dan ContextBundle menyimpan daftar sumber
+beserta timing per tahap. Prompt dirender dari daftar ini secara terpisah, dalam satu kali jalan.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# Asal-usul sumber di dalam konteks
+PROVENANCE_HIT = "hit"              # vector hit langsung
+PROVENANCE_NEIGHBOUR = "neighbour"  # hadis tetangga dalam bab yang sama
+PROVENANCE_RELATED = "related"      # ekspansi relasi :RELATED_TO
+PROVENANCE_KEYWORD = "keyword"      # pencocokan nomor hadis
+
+TEXT_FIELDS = ("info_text", "text_text", "translation_text", "tafsir_text")
+
+# Setiap chunk diawali tag seperti "[INFO Al-Fatihah:7]" atau "[Teks Arab Shahih Bukhari No. 1]"
+_CHUNK_TAG = re.compile(r"^\[[^\]]+\]")
+
+
+def chunk_tag(text):
+    match = _CHUNK_TAG.match(text or "")
+    return match.group(0) if match else None
+
+
+@dataclass
+class SourceRecord:
+    info_id: str
+    provenance: str
+    score: Optional[float]
+    weight: float
+    is_hadith: bool
+    hop: int = 0
+    surah_name: Optional[str] = None
+    ayat_number: Optional[int] = None
+    source_name: Optional[str] = None
+    hadith_number: Optional[int] = None
+    kitab_name: Optional[str] = None
+    bab_name: Optional[str] = None
+    info_text: Optional[str] = None
+    text_text: Optional[str] = None
+    translation_text: Optional[str] = None
+    tafsir_text: Optional[str] = None
+    coverage_ids: List[str] = field(default_factory=list)
+    tokens: int = 0
+
+    @classmethod
+    def from_row(cls, info_id, row, provenance, score, weight=None, hop=0):
+        """Membuat record dari baris hasil get_full_context_from_info."""
+        is_hadith = not (row.get("surah_name") and row.get("ayat_number"))
+        texts = {name: row.get(name) for name in TEXT_FIELDS}
+        coverage = [tag for tag in (chunk_tag(texts[name]) for name in TEXT_FIELDS) if tag]
+        return cls(
+            info_id=info_id,
+            provenance=provenance,
+            score=score,
+            weight=score if weight is None else weight,
+            is_hadith=is_hadith,
+            hop=hop,
+            surah_name=row.get("surah_name"),
+            ayat_number=row.get("ayat_number"),
+            source_name=row.get("source_name"),
+            hadith_number=row.get("hadith_number"),
+            kitab_name=row.get("kitab_name"),
+            bab_name=row.get("bab_name"),
+            coverage_ids=coverage,
+            **texts,
+        )
+
+    @property
+    def source_id(self) -> str:
+        """Header sumber seperti yang muncul di konteks."""
+        if not self.is_hadith:
+            return f"Surah: {self.surah_name} | Ayat: {self.ayat_number}"
+        return (f"Hadis {self.source_name} No. {self.hadith_number} | "
+                f"Kitab: {self.kitab_name or '-'}, Bab: {self.bab_name or '-'}")
+
+    @property
+    def mrr_id(self) -> str:
+        """ID ringkas yang dipakai ground truth evaluasi MRR."""
+        if not self.is_hadith:
+            return f"Surah: {self.surah_name} | Ayat: {self.ayat_number}"
+        return f"Hadis {self.source_name} No. {self.hadith_number}"
+
+    @property
+    def score_label(self) -> str:
+        if self.provenance == PROVENANCE_NEIGHBOUR:
+            return "N/A (Tetangga)"
+        if self.provenance == PROVENANCE_RELATED:
+            return f"{self.score:.4f} (Relasi, hop {self.hop})"
+        if self.provenance == PROVENANCE_KEYWORD:
+            return "1.00 (Exact Match)"
+        return f"{self.score:.4f}"
+
+    def render(self) -> str:
+        tafsir = "" if self.is_hadith else f"➤ Tafsir: {self.tafsir_text or '-'}\n"
+        return (
+            f"\n{self.source_id}\n"
+            f"Skor Similarity: {self.score_label}\n"
+            f"➤ Info: {self.info_text or '-'}\n"
+            f"➤ Teks Arab: {self.text_text or '-'}\n"
+            f"➤ Terjemahan: {self.translation_text or '-'}\n"
+            f"{tafsir}"
+            "---\n"
+        )
+
+
+@dataclass
+class ContextBundle:
+    sources: List[SourceRecord] = field(default_factory=list)
+    tokens: int = 0
+    # Durasi per tahap dalam detik, misal {"embedding": 0.41, "vector_search": 0.03, ...}
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def __bool__(self):
+        return bool(self.sources)
+
+    @property
+    def source_ids(self) -> List[str]:
+        return [source.source_id for source in self.sources]
+
+    @property
+    def coverage_ids(self) -> set:
+        return {tag for source in self.sources for tag in source.coverage_ids}
+
+    def render_parts(self):
+        for source in self.sources:
+            yield source.render()
+
+    def render(self) -> str:
+        return "".join(self.render_parts())
@@ -1,25 +1,40 @@
 # retrieval/retrieval.py
 
-from config import driver
+import logging
+import time
+
+from config import NEO4J_DATABASE, get_driver
 from retrieval.embedding import embed_query
+from tracing import span
+
+logger = logging.getLogger(__name__)
 
-def vector_search_chunks_generator(query_text, top_k=10, min_score=0.6):
+def vector_search_chunks_generator(query_text, top_k=10, min_score=0.6, timings=None):
     """
     Menggunakan nama indeks 'chunk_embeddings' yang konsisten.
+    Jika `timings` (dict) diberikan, durasi embedding dan vector search dicatat ke dalamnya.
     """
+    start = time.perf_counter()
     vector = embed_query(query_text)
+    embedded = time.perf_counter()
     if not vector:
-        print("❌ Gagal membuat embedding untuk query.")
+        logger.error("Gagal membuat embedding untuk query.")
         return
 
-    result = driver.execute_query(
-        """
-        CALL db.index.vector.queryNodes('chunk_embeddings', $top_k, $query_vector)
-        YIELD node, score
-        RETURN node, score
-        """,
-        {"query_vector": vector, "top_k": top_k}
-    )
+    # Span ditutup sebelum yield pertama agar tidak ikut terbuka di kode pemanggil generator
+    with span("vector_search", top_k=top_k, min_score=min_score) as s:
+        result = get_driver().execute_query(
+            """
+            CALL db.index.vector.queryNodes('chunk_embeddings', $top_k, $query_vector)
+            YIELD node, score
+            RETURN node, score
+            """,
+            {"query_vector": vector, "top_k": top_k}, database_=NEO4J_DATABASE
+        )
+        s.set_attribute("hits", sum(1 for record in result.records if record["score"] >= min_score))
+    if timings is not None:
+        timings["embedding"] = embedded - start
+        timings["vector_search"] = time.perf_counter() - embedded
     for record in result.records:
         if record["score"] >= min_score:
             yield record
@@ -28,22 +43,22 @@ def keyword_search_hadith_by_number(hadith_number: int):
     """
     Mencari :Chunk {source:'info'} berdasarkan nomor hadis.
     """
-    print(f"Executing keyword search for Hadith No. {hadith_number}.")
+    logger.debug("Executing keyword search for Hadith No. %s.", hadith_number)
     
-    result = driver.execute_query(
+    result = get_driver().execute_query(
         """
         MATCH (info_chunk:Chunk {source: 'info', hadith_number: $nomor_hadis})
         RETURN elementId(info_chunk) AS info_id
         LIMIT 1
         """,
-        {"nomor_hadis": hadith_number}
+        {"nomor_hadis": hadith_number}, database_=NEO4J_DATABASE
     )
     
     record = result.records[0] if result.records else None
     if record and record["info_id"]:
         info_id = record["info_id"]
-        print(f"✅ Keyword search found a matching info_chunk. Element ID: {info_id}")
+        logger.info("Keyword search found a matching info_chunk. Element ID: %s", info_id)
         return info_id
     
-    print(f"❌ Keyword search did not find a match for Hadith No. {hadith_number}")
+    logger.info("Keyword search did not find a match for Hadith No. %s", hadith_number)
     return None
\ No newline at end of file
@@ -0,0 +1,65 @@
+# retrieval/single_flight.py
+"""
+Penggabungan (coalescing) request identik yang sedang berjalan bersamaan.
+
+Request pertama untuk sebuah kunci menjadi "leader" dan menjalankan pipeline;
+request lain dengan kunci sama yang datang sebelum leader selesai hanya menunggu
+dan menerima hasil (atau exception) yang sama. Setelah leader selesai kunci dilepas,
+jadi ini bukan cache: request berikutnya menjalankan pipeline lagi.
+"""
+import hashlib
+import json
+import re
+import threading
+from concurrent.futures import Future
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(text: str) -> str:
+    """Huruf kecil, spasi dirapikan, tanda baca di akhir dibuang."""
+    return _WHITESPACE.sub(" ", text).strip().rstrip("?!.").strip().casefold()
+
+
+def request_key(teks_pertanyaan: str, riwayat_chat: list) -> str:
+    """Kunci dari pertanyaan ternormalisasi dan hash riwayat (riwayat ikut menentukan konteks dan prompt)."""
+    history = [[normalize_question(q), a.strip()] for q, a in riwayat_chat]
+    payload = json.dumps([normalize_question(teks_pertanyaan), history], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Menjalankan fn(*args, **kwargs) sekali per kunci yang sedang berjalan.
+        Mengembalikan tuple (hasil, shared); shared=True jika hasil diambil dari leader lain.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return result, False
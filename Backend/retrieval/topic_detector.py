@@ -1,12 +1,11 @@
 # === topic_detector.py ===
-import os
-import sys
+import logging
 import re # Import library untuk regular expression
 
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-
 from generation.groq_client import call_groq_api
 
+logger = logging.getLogger(__name__)
+
 def _extract_specific_reference(query: str):
     """
     Fungsi internal untuk mengekstrak referensi spesifik seperti nomor hadis.
@@ -39,19 +38,19 @@ def is_topic_changed(new_query: str, last_query: str):
     # Langkah 2: Terapkan Aturan (Rules)
     # Aturan #1: Jika keduanya meminta nomor hadis, dan nomornya BERBEDA, maka topik PASTI berubah.
     if new_ref and last_ref and new_ref != last_ref:
-        print(f"INFO: Topic changed based on rule. Reference changed from '{last_ref}' to '{new_ref}'.")
+        logger.info("Topic changed based on rule. Reference changed from '%s' to '%s'.", last_ref, new_ref)
         return True
     
     # Aturan #2: Jika satu query punya referensi spesifik dan yang lain tidak, anggap topik berubah.
     # Contoh: dari "apa itu niat?" ke "hadis nomor 1".
     if bool(new_ref) != bool(last_ref):
-        print(f"INFO: Topic changed based on rule. A specific reference appeared or disappeared.")
+        logger.info("Topic changed based on rule. A specific reference appeared or disappeared.")
         return True
 
     # Langkah 3: Fallback ke LLM jika aturan tidak cocok
     # Ini terjadi jika kedua query tidak punya referensi (misal: "apa itu ikhlas?" -> "bagaimana caranya?")
     # atau jika referensinya sama (misal: "hadis no. 1" -> "siapa perawinya?")
-    print("INFO: No specific rule matched. Falling back to LLM for general topic detection.")
+    logger.debug("No specific rule matched. Falling back to LLM for general topic detection.")
     prompt = f"""
 Anda adalah AI yang bertugas mendeteksi kesinambungan percakapan.
 Tentukan apakah "Pertanyaan Baru" adalah kelanjutan langsung atau meminta klarifikasi dari "Pertanyaan Lama", atau apakah ia memulai sebuah sub-topik yang benar-benar baru.
@@ -84,10 +83,10 @@ Jawab hanya dengan satu kata: "sama" atau "berbeda".
 """
     try:
         response = call_groq_api(prompt).strip().lower()
-        print(f"INFO: LLM detected topic as '{response}'.")
+        logger.info("LLM detected topic as '%s'.", response)
         return "berbeda" in response
     except Exception as e:
-        print(f"ERROR: Failed to call LLM for topic detection: {e}")
+        logger.error("Failed to call LLM for topic detection: %s", e)
         return False  # Fallback aman jika API gagal
 
 def get_last_question(history):
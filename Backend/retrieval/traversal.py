@@ -1,61 +1,147 @@
 # retrieval/traversal.py
 
-from config import driver
+import os
+import re
+
+from config import NEO4J_DATABASE, get_driver
+from metrics import CACHE_REQUESTS
+
+# Cache korpus opsional (objek dengan get(key) dan set(key, value), lihat shared_cache.py),
+# dipasang oleh main.py agar rantai chunk yang sama tidak dibaca ulang dari Neo4j oleh setiap worker.
+_corpus_cache = None
+
+# Jumlah sub-chunk tetangga (kiri dan kanan) yang ikut diambil di sekitar chunk yang relevan
+CONTEXT_NEIGHBOUR_CHUNKS = int(os.getenv("CONTEXT_NEIGHBOUR_CHUNKS", "1"))
+# Panjang maksimum penelusuran balik HAS_CHUNK ke chunk info (graf lama tanpa key), agar
+# rantai yang rusak atau bersiklus tidak membuat query tanpa batas
+MAX_CHUNK_CHAIN = int(os.getenv("MAX_CHUNK_CHAIN", "256"))
+# source chunk -> field teks di baris konteks
+CHUNK_FIELDS = {"text": "text_text", "translation": "translation_text", "tafsir": "tafsir_text"}
+# Tag di awal setiap chunk, misal "[tafsir Al-Baqarah:5] " atau "[Terjemahan Shahih Bukhari No. 1]: "
+_CHUNK_PREFIX = re.compile(r"^\[[^\]]+\]:?\s*")
+
+def set_corpus_cache(cache):
+    global _corpus_cache
+    _corpus_cache = cache
+
+def _join_chunks(chunks, at_start, at_end):
+    """
+    Menggabungkan sub-chunk berurutan menjadi satu teks dengan satu tag. Overlap antar
+    chunk dibuang memakai char_start/char_end; "…" menandai bagian yang tidak diambil.
+    """
+    prefix = _CHUNK_PREFIX.match(chunks[0]["text"])
+    prefix = prefix.group(0) if prefix else ""
+    bodies = [_CHUNK_PREFIX.sub("", chunks[0]["text"], count=1)]
+    for previous, chunk in zip(chunks, chunks[1:]):
+        body = _CHUNK_PREFIX.sub("", chunk["text"], count=1)
+        if previous.get("char_end") is not None and chunk.get("char_start") is not None:
+            overlap = previous["char_end"] - chunk["char_start"]
+            if overlap > 0:
+                body = body[overlap:].lstrip()
+        if body:
+            bodies.append(body)
+    return f"{prefix}{'' if at_start else '… '}{' '.join(bodies)}{'' if at_end else ' …'}"
+
+def select_chunk_texts(chunks, hit_chunk_id=None, neighbours=CONTEXT_NEIGHBOUR_CHUNKS):
+    """
+    Memilih sub-chunk yang dipakai sebagai konteks untuk setiap source (text/translation/tafsir):
+    chunk hit beserta `neighbours` chunk di kiri-kanannya, atau chunk pertama beserta
+    tetangganya jika hit bukan dari source tersebut. Mengembalikan dict field teks.
+    """
+    by_source = {}
+    for chunk in chunks:
+        by_source.setdefault(chunk["source"], []).append(chunk)
+
+    texts = {}
+    for source, field in CHUNK_FIELDS.items():
+        pieces = by_source.get(source)
+        if not pieces:
+            texts[field] = None
+            continue
+        center = next((i for i, chunk in enumerate(pieces) if chunk["id"] == hit_chunk_id), 0)
+        first, last = max(0, center - neighbours), min(len(pieces), center + neighbours + 1)
+        texts[field] = _join_chunks(pieces[first:last], first == 0, last == len(pieces))
+    return texts
 
 def find_info_chunk_id(chunk_id: str):
     """
     Fungsi ini sekarang bersifat universal.
     Dari chunk manapun (text, translation, dll.), cari node :Chunk {source: 'info'}
-    yang menjadi akarnya dengan menelusuri balik relasi :HAS_CHUNK.
+    yang menjadi akarnya. Key chunk berbentuk <unit>:<source>:<n>, jadi info-nya
+    adalah <unit>:info:0 (lewat indeks chunk_key), berapa pun panjang rantainya.
+    Chunk tanpa key (graf lama) ditelusuri balik lewat relasi :HAS_CHUNK, paling jauh
+    MAX_CHUNK_CHAIN langkah.
     """
-    result = driver.execute_query(
-        """
+    result = get_driver().execute_query(
+        f"""
         MATCH (c:Chunk) WHERE elementId(c) = $cid
-        MATCH (c)<-[:HAS_CHUNK*0..5]-(info:Chunk {source: 'info'})
-        RETURN elementId(info) AS info_id
+        WITH c, CASE WHEN c.key IS NOT NULL
+            THEN left(c.key, size(c.key) - size(c.source) - size(last(split(c.key, ':'))) - 2) + ':info:0'
+        END AS info_key
+        OPTIONAL MATCH (keyed:Chunk {{key: info_key}})
+        OPTIONAL MATCH (c)<-[:HAS_CHUNK*0..{MAX_CHUNK_CHAIN}]-(walked:Chunk {{source: 'info'}})
+        WHERE keyed IS NULL
+        RETURN elementId(coalesce(keyed, walked)) AS info_id
         LIMIT 1
-        """, {"cid": chunk_id}
+        """, {"cid": chunk_id}, database_=NEO4J_DATABASE
     )
     return result.records[0]["info_id"] if result.records else None
 
-def get_full_context_from_info(info_id: str):
+def get_full_context_from_info(info_id: str, hit_chunk_id: str = None):
     """
     Fungsi traversal universal yang cerdas.
-    - Mengambil rantai chunk info->text->translation->tafsir.
+    - Mengambil seluruh rantai chunk info->text->translation->tafsir (urut rantai).
     - Secara opsional, mengambil konteks hirarki (Surah/Ayat atau Bab/Kitab).
+    - Dari rantai itu hanya sub-chunk yang relevan yang dijadikan teks (select_chunk_texts):
+      di sekitar `hit_chunk_id` jika hit berasal dari ayat/hadis ini, selain itu awal teksnya.
     """
-    traversal = driver.execute_query(
-        """
-        MATCH (info:Chunk {source: 'info'})
-        WHERE elementId(info) = $info_id
+    row = None
+    if _corpus_cache is not None:
+        row = _corpus_cache.get(info_id)
+        CACHE_REQUESTS.labels("corpus", "hit" if row is not None else "miss").inc()
 
-        OPTIONAL MATCH (info)-[:HAS_CHUNK]->(text:Chunk {source: 'text'})
-        OPTIONAL MATCH (text)-[:HAS_CHUNK]->(translation:Chunk {source: 'translation'})
-        OPTIONAL MATCH (translation)-[:HAS_CHUNK]->(tafsir:Chunk {source: 'tafsir'}) 
-        
-        OPTIONAL MATCH (ayat:Ayat)-[:HAS_CHUNK]->(info)
-        OPTIONAL MATCH (surah:Surah)-[:HAS_AYAT]->(ayat)
-
-        OPTIONAL MATCH (bab:Bab)-[:CONTAINS_HADITH_CHUNK]->(info)
-        OPTIONAL MATCH (kitab:Kitab)-[:HAS_BAB]->(bab)
-
-        RETURN 
-            info.text AS info_text,
-            text.text AS text_text,
-            translation.text AS translation_text,
-            tafsir.text AS tafsir_text,
-            
-            info.surah_name AS surah_name,
-            info.ayat_number AS ayat_number,
-            info.hadith_number AS hadith_number,
-            
-            bab.name AS bab_name,
-            kitab.name AS kitab_name,
-            info.source_name AS source_name
-        LIMIT 1
-        """, {"info_id": info_id}
-    )
-    return traversal.records[0] if traversal.records else None
+    if row is None:
+        traversal = get_driver().execute_query(
+            """
+            MATCH (info:Chunk {source: 'info'})
+            WHERE elementId(info) = $info_id
+
+            OPTIONAL MATCH path = (info)-[:HAS_CHUNK*1..]->(chunk:Chunk)
+            WITH info, chunk ORDER BY length(path)
+            WITH info, collect({
+                id: elementId(chunk), source: chunk.source, text: chunk.text,
+                chunk_index: chunk.chunk_index, char_start: chunk.char_start, char_end: chunk.char_end
+            }) AS chunks
+
+            OPTIONAL MATCH (ayat:Ayat)-[:HAS_CHUNK]->(info)
+            OPTIONAL MATCH (surah:Surah)-[:HAS_AYAT]->(ayat)
+
+            OPTIONAL MATCH (bab:Bab)-[:CONTAINS_HADITH_CHUNK]->(info)
+            OPTIONAL MATCH (kitab:Kitab)-[:HAS_BAB]->(bab)
+
+            RETURN 
+                info.text AS info_text,
+                [chunk IN chunks WHERE chunk.id IS NOT NULL] AS chunks,
+                
+                info.surah_name AS surah_name,
+                info.ayat_number AS ayat_number,
+                info.hadith_number AS hadith_number,
+                
+                bab.name AS bab_name,
+                kitab.name AS kitab_name,
+                info.source_name AS source_name
+            LIMIT 1
+            """, {"info_id": info_id}, database_=NEO4J_DATABASE
+        )
+        row = traversal.records[0].data() if traversal.records else None
+        if _corpus_cache is not None and row:
+            _corpus_cache.set(info_id, row)
+
+    if not row or "chunks" not in row:
+        return row
+    context = {key: value for key, value in row.items() if key != "chunks"}
+    context.update(select_chunk_texts(row.get("chunks") or [], hit_chunk_id))
+    return context
 
 
 # =====================================================================
@@ -67,7 +153,7 @@ def get_neighboring_hadiths_in_bab(bab_name: str, kitab_name: str, source_name:
     - Mengambil hadis tetangga untuk memperkaya konteks.
     - Mengecualikan hadis yang sudah ditemukan oleh vector search.
     """
-    neighbor_ids = driver.execute_query(
+    neighbor_ids = get_driver().execute_query(
         """
         // 1. Temukan Bab yang tepat berdasarkan nama, kitab, dan sumber
         MATCH (b:Bab {name: $bab_name, kitab_name: $kitab_name, source_name: $source_name})
@@ -87,6 +173,43 @@ def get_neighboring_hadiths_in_bab(bab_name: str, kitab_name: str, source_name:
             "source_name": source_name,
             "exclude_hadith_number": exclude_hadith_number,
             "limit": limit
-        }
+        }, database_=NEO4J_DATABASE
+    )
+    return [record["info_id"] for record in neighbor_ids.records]
+
+# =====================================================================
+# == EKSPANSI GRAF MELALUI RELASI :RELATED_TO (hasil knn.py) ==
+# =====================================================================
+def get_related_infos(info_ids: list, limit: int = 3):
+    """
+    Mengikuti relasi :RELATED_TO yang sudah dihitung sebelumnya dari sekumpulan info chunk.
+    - Anchor Al-Quran adalah :Ayat pemilik info chunk, anchor hadis adalah info chunk itu sendiri.
+    - Tujuan bisa berupa :Ayat (diambil info chunk-nya) atau langsung info chunk hadis,
+      sehingga relasi ayat<->ayat maupun hadis<->ayat ikut terbaca.
+    - Mengembalikan maksimal `limit` tetangga per info asal, urut dari similarity tertinggi,
+      dalam bentuk tuple (from_info_id, info_id, similarity).
+    """
+    if not info_ids:
+        return []
+
+    related = get_driver().execute_query(
+        """
+        UNWIND $info_ids AS from_id
+        MATCH (info:Chunk {source: 'info'}) WHERE elementId(info) = from_id
+        OPTIONAL MATCH (ayat:Ayat)-[:HAS_CHUNK]->(info)
+        WITH from_id, coalesce(ayat, info) AS anchor
+
+        MATCH (anchor)-[r:RELATED_TO]->(target)
+        OPTIONAL MATCH (target)-[:HAS_CHUNK]->(target_info:Chunk {source: 'info'})
+        WITH from_id, r.similarity AS similarity,
+             CASE WHEN target:Chunk THEN target ELSE target_info END AS neighbor
+        WHERE neighbor IS NOT NULL AND neighbor.source = 'info'
+
+        WITH from_id, neighbor, similarity
+        ORDER BY similarity DESC
+        WITH from_id, collect({info_id: elementId(neighbor), similarity: similarity})[..$limit] AS neighbors
+        UNWIND neighbors AS n
+        RETURN from_id, n.info_id AS info_id, n.similarity AS similarity
+        """, {"info_ids": list(info_ids), "limit": limit}, database_=NEO4J_DATABASE
     )
-    return [record["info_id"] for record in neighbor_ids.records]
\ No newline at end of file
+    return [(record["from_id"], record["info_id"], record["similarity"]) for record in related.records]
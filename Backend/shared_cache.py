@@ -0,0 +1,140 @@
+# shared_cache.py
+"""
+Cache yang dipakai bersama oleh semua proses worker (gunicorn, lihat gunicorn.conf.py).
+
+Setiap cache adalah file SQLite dalam mode WAL di CACHE_DIR: banyak proses bisa membaca
+bersamaan tanpa saling mengunci, dan halaman database dipetakan ke memori (mmap) sehingga
+pembacaan berulang dilayani dari page cache OS yang sama untuk semua worker.
+
+- EmbeddingCache : vektor embedding query, di-key pada (model, teks), disimpan float32 mentah.
+- SharedCache    : nilai JSON dengan TTL opsional (cache jawaban dan cache korpus).
+
+Error SQLite (misal database terkunci terlalu lama) hanya dicatat di log; cache tidak
+pernah menggagalkan request.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from array import array
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE = os.getenv("SHARED_CACHE", "1") == "1"
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(tempfile.gettempdir(), "graphrag-cache"))
+CACHE_MMAP_BYTES = int(os.getenv("CACHE_MMAP_BYTES", str(256 * 1024 * 1024)))
+# TTL dalam detik; 0 menonaktifkan cache tersebut
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+CORPUS_CACHE_TTL = float(os.getenv("CORPUS_CACHE_TTL", "86400"))
+
+EMBEDDING_CACHE = "query_embeddings"
+ANSWER_CACHE = "answers"
+CORPUS_CACHE = "corpus"
+
+
+def cache_path(name):
+    return os.path.join(CACHE_DIR, f"{name}.sqlite")
+
+
+def reset_volatile_caches():
+    """
+    Mengosongkan cache jawaban dan korpus, karena elementId Neo4j bisa berubah setelah data
+    dimuat ulang. Cukup sekali per server: master gunicorn (on_starting) memanggilnya sebelum
+    fork, worker mewarisi penanda di environment dan tidak mengosongkan ulang.
+    """
+    if os.environ.get("SHARED_CACHE_RESET") == "1":
+        return
+    clear_volatile_caches()
+    os.environ["SHARED_CACHE_RESET"] = "1"
+
+
+def clear_volatile_caches():
+    """Mengosongkan cache jawaban dan korpus untuk semua worker, misal setelah versi korpus dialihkan."""
+    for name in (ANSWER_CACHE, CORPUS_CACHE):
+        cache = SharedCache(cache_path(name))
+        cache.clear()
+        cache.close()
+
+
+class SharedCache:
+    def __init__(self, path, ttl=None):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.ttl = ttl or None
+        self.hits = 0
+        self.misses = 0
+        # Koneksi SQLite per thread (endpoint sync FastAPI berjalan di threadpool)
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, created REAL NOT NULL)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={CACHE_MMAP_BYTES}")
+            self._local.conn = conn
+        return conn
+
+    def get_bytes(self, key):
+        try:
+            row = self._conn().execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Cache %s tidak bisa dibaca: %s", self.path, e)
+            row = None
+        if row is None or (self.ttl and time.time() - row[1] > self.ttl):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def set_bytes(self, key, value):
+        try:
+            self._conn().execute("INSERT OR REPLACE INTO entries (key, value, created) VALUES (?, ?, ?)",
+                                 (key, value, time.time()))
+        except sqlite3.Error as e:
+            logger.warning("Cache %s tidak bisa ditulis: %s", self.path, e)
+
+    def get(self, key):
+        value = self.get_bytes(key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        self.set_bytes(key, json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    def clear(self):
+        try:
+            self._conn().execute("DELETE FROM entries")
+        except sqlite3.Error as e:
+            logger.warning("Cache %s tidak bisa dikosongkan: %s", self.path, e)
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class EmbeddingCache(SharedCache):
+    """Cache embedding query dengan antarmuka get(text) / set(text, vector)."""
+
+    def __init__(self, path, model_name):
+        super().__init__(path)
+        self.model_name = model_name
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.model_name}\n{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text):
+        value = self.get_bytes(self._key(text))
+        return array("f", value).tolist() if value is not None else None
+
+    def set(self, text, vector):
+        self.set_bytes(self._key(text), array("f", vector).tobytes())
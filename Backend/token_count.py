@@ -0,0 +1,89 @@
+# token_count.py
+"""
+Estimasi jumlah token yang kompatibel dengan tokenizer LLM (atau tokenizer lain, lihat estimate_tokens).
+
+Jika CONTEXT_TOKENIZER di-set (nama tokenizer HuggingFace, misal tokenizer Llama 3),
+jumlah token dihitung persis dengan library `tokenizers`. Tanpa itu dipakai estimasi
+heuristik yang sengaja sedikit berlebih: teks Arab berharakat dipecah jauh lebih halus
+daripada teks Latin oleh tokenizer BPE.
+"""
+import logging
+import math
+import os
+import re
+
+TOKENIZER_NAME = os.getenv("CONTEXT_TOKENIZER")
+
+# Rata-rata karakter per token untuk tokenizer BPE keluarga Llama 3
+CHARS_PER_TOKEN_LATIN = 3.5
+CHARS_PER_TOKEN_ARABIC = 2.0
+
+_ARABIC_CHARS = re.compile(r"[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF\uFB50-\uFDFF\uFE70-\uFEFF]")
+_SENTENCE_END = re.compile(r"(?<=[.!?؟۔])\s+")
+
+logger = logging.getLogger(__name__)
+
+# Tokenizer per nama (None = gagal dimuat / heuristik)
+_tokenizers = {}
+
+
+def _get_tokenizer(name=TOKENIZER_NAME):
+    if not name:
+        return None
+    if name not in _tokenizers:
+        _tokenizers[name] = None
+        try:
+            from tokenizers import Tokenizer
+            _tokenizers[name] = Tokenizer.from_pretrained(name)
+        except Exception as e:
+            logger.warning("Tokenizer '%s' gagal dimuat, memakai estimasi heuristik: %s", name, e)
+    return _tokenizers[name]
+
+
+def estimate_tokens(text: str, tokenizer_name: str = TOKENIZER_NAME) -> int:
+    """
+    Jumlah token (atau estimasinya) untuk sebuah teks. Default dengan tokenizer LLM
+    (CONTEXT_TOKENIZER); `tokenizer_name` memilih tokenizer lain, misal milik model embedding.
+    """
+    if not text:
+        return 0
+    tokenizer = _get_tokenizer(tokenizer_name)
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+    arabic = len(_ARABIC_CHARS.findall(text))
+    other = len(text) - arabic
+    return math.ceil(arabic / CHARS_PER_TOKEN_ARABIC + other / CHARS_PER_TOKEN_LATIN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, suffix: str = " …") -> str:
+    """
+    Memotong teks agar muat dalam `max_tokens`.
+    Dipotong per kalimat jika memungkinkan, jika tidak dipotong per karakter.
+    """
+    if not text or estimate_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+
+    budget = max_tokens - estimate_tokens(suffix)
+    kept = []
+    used = 0
+    for sentence in _SENTENCE_END.split(text):
+        cost = estimate_tokens(sentence) + 1
+        if used + cost > budget:
+            break
+        kept.append(sentence)
+        used += cost
+    if kept:
+        return " ".join(kept) + suffix
+
+    # Kalimat pertama saja sudah terlalu panjang: cari panjang karakter terbesar yang muat
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low].rstrip() + suffix if low else ""
@@ -0,0 +1,292 @@
+# tracing.py
+"""
+Tracing ringan untuk pipeline /ask.
+
+Setiap tahap (validasi, deteksi topik, retrieval, generasi), query Cypher, panggilan
+embedding dan panggilan LLM dicatat sebagai span bersarang dengan atribut seperti
+top_k, jumlah hit dan jumlah token prompt.
+
+Diatur lewat environment variable:
+    TRACE_EXPORTER    = "none" | "jsonl" | "otel"   (default "none", tracing mati)
+    TRACE_FILE        = path file JSONL              (default "traces.jsonl")
+    TRACE_SAMPLE_RATE = 0.0 - 1.0                    (default 1.0)
+
+- jsonl : satu baris JSON per trace (span root beserta seluruh span anaknya).
+- otel  : span diteruskan ke OpenTelemetry. Butuh paket `opentelemetry-api`; jika
+          `opentelemetry-sdk` terpasang dan belum ada TracerProvider, provider dengan
+          exporter OTLP (atau console) dan sampler rasio dipasang otomatis.
+
+Keputusan sampling diambil sekali di span root; span anak dari trace yang tidak
+di-sample tidak membuat objek apapun selain span kosong bersama.
+
+Pengamat span (lihat add_span_observer, dipakai metrics.py) menerima durasi setiap
+span terlepas dari exporter dan sampling.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+EXPORTER_NONE = "none"
+EXPORTER_JSONL = "jsonl"
+EXPORTER_OTEL = "otel"
+
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", EXPORTER_NONE).strip().lower()
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+
+# Panjang maksimal statement Cypher yang disimpan sebagai atribut span
+STATEMENT_MAX_CHARS = 200
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """Satu unit kerja bertimer di dalam sebuah trace."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes", "start", "end", "error", "children")
+
+    def __init__(self, trace_id, parent_id, name, attributes):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = dict(attributes)
+        self.start = time.time()
+        self.end = None
+        self.error = None
+        self.children = []
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self):
+        return round(((self.end or time.time()) - self.start) * 1000, 3)
+
+    def to_dict(self):
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "error": self.error,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+class _NoopSpan:
+    """Span kosong untuk tracing mati atau trace yang tidak di-sample."""
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+
+class _OtelSpan:
+    """Adaptor tipis agar span OpenTelemetry punya API yang sama dengan Span."""
+
+    def __init__(self, span):
+        self._span = span
+
+    def set_attribute(self, key, value):
+        if value is not None:
+            self._span.set_attribute(key, value)
+
+    def set_attributes(self, **attributes):
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+
+NOOP_SPAN = _NoopSpan()
+
+# Span yang sedang aktif di konteks ini (None = belum ada trace, NOOP_SPAN = tidak di-sample)
+_current_span = ContextVar("current_span", default=None)
+_write_lock = threading.Lock()
+_otel_tracer = None
+_observers = []
+
+
+def _setup_otel():
+    global TRACE_EXPORTER, _otel_tracer
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        logger.warning("TRACE_EXPORTER=otel tetapi opentelemetry-api tidak terpasang, beralih ke jsonl.")
+        TRACE_EXPORTER = EXPORTER_JSONL
+        return
+
+    try:
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    except ImportError:
+        TracerProvider = None
+
+    if TracerProvider is not None and not isinstance(trace.get_tracer_provider(), TracerProvider):
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            exporter = OTLPSpanExporter()
+        except ImportError:
+            exporter = ConsoleSpanExporter()
+        provider = TracerProvider(sampler=ParentBased(TraceIdRatioBased(TRACE_SAMPLE_RATE)))
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+        trace.set_tracer_provider(provider)
+
+    _otel_tracer = trace.get_tracer("graphrag")
+
+
+if TRACE_EXPORTER == EXPORTER_OTEL:
+    _setup_otel()
+
+
+def _export_jsonl(root):
+    line = json.dumps({"trace_id": root.trace_id, **root.to_dict()}, ensure_ascii=False, default=str)
+    with _write_lock:
+        with open(TRACE_FILE, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def add_span_observer(observer):
+    """
+    Mendaftarkan pengamat dengan method span_started(name) dan
+    span_finished(name, seconds, failed), dipanggil untuk setiap span.
+    """
+    _observers.append(observer)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Membuka span bernama `name` sebagai anak dari span yang sedang aktif.
+    Contoh:
+        with span("vector_search", top_k=10) as s:
+            ...
+            s.set_attribute("hits", len(records))
+    """
+    if not _observers:
+        with _record_span(name, attributes) as current:
+            yield current
+        return
+
+    for observer in _observers:
+        observer.span_started(name)
+    started = time.perf_counter()
+    failed = False
+    try:
+        with _record_span(name, attributes) as current:
+            yield current
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        for observer in _observers:
+            observer.span_finished(name, seconds, failed)
+
+
+@contextmanager
+def _record_span(name, attributes):
+    if TRACE_EXPORTER == EXPORTER_NONE:
+        yield NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    # Pada mode otel, sampling diputuskan oleh sampler OpenTelemetry
+    sampled_out = parent is None and _otel_tracer is None and random.random() >= TRACE_SAMPLE_RATE
+    if parent is NOOP_SPAN or sampled_out:
+        token = _current_span.set(NOOP_SPAN)
+        try:
+            yield NOOP_SPAN
+        finally:
+            _current_span.reset(token)
+        return
+
+    if _otel_tracer is not None:
+        # Konteks induk-anak dan sampling lanjutan ditangani OpenTelemetry
+        with _otel_tracer.start_as_current_span(name) as otel_span:
+            current = _OtelSpan(otel_span)
+            current.set_attributes(**attributes)
+            token = _current_span.set(current)
+            try:
+                yield current
+            finally:
+                _current_span.reset(token)
+        return
+
+    if parent is None:
+        current = Span(uuid.uuid4().hex, None, name, attributes)
+    else:
+        current = Span(parent.trace_id, parent.span_id, name, attributes)
+        parent.children.append(current)
+
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end = time.time()
+        _current_span.reset(token)
+        if parent is None:
+            _export_jsonl(current)
+
+
+def current_span():
+    """Span yang sedang aktif (atau span kosong) untuk menambahkan atribut dari dalam fungsi."""
+    active = _current_span.get()
+    return active if active is not None else NOOP_SPAN
+
+
+def traced(name=None, **attributes):
+    """Dekorator: menjalankan fungsi di dalam span bernama `name` (default nama fungsi)."""
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TracingDriver:
+    """Membungkus driver Neo4j sehingga setiap execute_query tercatat sebagai span 'cypher'."""
+
+    def __init__(self, driver):
+        self._driver = driver
+
+    def execute_query(self, query, parameters_=None, **kwargs):
+        attributes = {}
+        if TRACE_EXPORTER != EXPORTER_NONE:
+            attributes["statement"] = " ".join(query.split())[:STATEMENT_MAX_CHARS]
+        with span("cypher", **attributes) as s:
+            result = self._driver.execute_query(query, parameters_, **kwargs)
+            s.set_attribute("rows", len(result.records))
+            return result
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+def trace_driver(driver):
+    """
+    Driver selalu dibungkus agar pengamat span (metrik query yang sedang berjalan)
+    tetap bekerja walau exporter trace mati; tanpa exporter span hanya berupa span kosong.
+    """
+    return TracingDriver(driver)
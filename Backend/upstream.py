@@ -0,0 +1,135 @@
+# upstream.py
+"""
+Panggilan HTTP ke layanan eksternal (Groq, Ollama) dengan retry terbatas.
+Error koneksi, timeout dan status 429/5xx dicoba ulang dengan backoff eksponensial;
+setiap retry dan error dihitung per upstream di metrics.py.
+
+Jumlah panggilan bersamaan per upstream dibatasi semaphore (GROQ_MAX_CONCURRENCY,
+OLLAMA_MAX_CONCURRENCY). Jika slot tidak didapat dalam UPSTREAM_ACQUIRE_TIMEOUT detik,
+UpstreamBusy dilempar dan /ask menjawab 503. Jeda retry (juga Retry-After dari upstream)
+dibatasi UPSTREAM_RETRY_BACKOFF * 2**max_retries karena slot tetap dipegang selama jeda;
+jika upstream meminta menunggu lebih lama, UpstreamBusy dilempar dengan Retry-After itu.
+
+Koneksi HTTP memakai requests.Session per thread yang dibuat saat panggilan pertama,
+sehingga koneksi keep-alive dipakai ulang dan impor modul tidak membuka koneksi apa pun.
+"""
+import logging
+import os
+import threading
+import time
+
+import requests
+
+try:
+    from metrics import UPSTREAM_ERRORS, UPSTREAM_RETRIES, UPSTREAM_WAITING
+except ImportError:  # diimpor sebagai Backend.upstream dari root proyek
+    from Backend.metrics import UPSTREAM_ERRORS, UPSTREAM_RETRIES, UPSTREAM_WAITING
+
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "2"))
+UPSTREAM_RETRY_BACKOFF = float(os.getenv("UPSTREAM_RETRY_BACKOFF", "0.5"))
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+UPSTREAM_CONCURRENCY = {
+    "groq": int(os.getenv("GROQ_MAX_CONCURRENCY", "4")),
+    "ollama": int(os.getenv("OLLAMA_MAX_CONCURRENCY", "4")),
+}
+UPSTREAM_ACQUIRE_TIMEOUT = float(os.getenv("UPSTREAM_ACQUIRE_TIMEOUT", "30"))
+
+logger = logging.getLogger(__name__)
+
+_semaphores = {name: threading.BoundedSemaphore(limit) for name, limit in UPSTREAM_CONCURRENCY.items()}
+_local = threading.local()
+
+
+def _session():
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
+
+class UpstreamBusy(Exception):
+    """Semua slot panggilan ke upstream terpakai terlalu lama."""
+
+    def __init__(self, upstream, retry_after=UPSTREAM_ACQUIRE_TIMEOUT):
+        super().__init__(f"{upstream} sedang penuh")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+def _retry_after(response):
+    # Retry-After (dalam detik) dari Groq saat rate limit, None jika tidak ada
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.replace(".", "", 1).isdigit():
+        return float(retry_after)
+    return None
+
+
+def _retry_delay(attempt, response=None):
+    retry_after = _retry_after(response)
+    if retry_after is not None:
+        return retry_after
+    return UPSTREAM_RETRY_BACKOFF * (2 ** attempt)
+
+
+def _max_retry_delay(max_retries):
+    return UPSTREAM_RETRY_BACKOFF * (2 ** max_retries)
+
+
+def post_json(upstream, url, max_retries=None, **kwargs):
+    """
+    POST ke `url` dan kembalikan body JSON-nya.
+    - upstream: label metrik, misal "groq" atau "ollama".
+    - kwargs diteruskan ke requests.post (json, headers, timeout, ...).
+    Exception dari requests dilempar ulang setelah retry habis.
+    """
+    max_retries = UPSTREAM_MAX_RETRIES if max_retries is None else max_retries
+    semaphore = _semaphores.get(upstream)
+    if semaphore is None:
+        return _post_with_retries(upstream, url, max_retries, kwargs)
+
+    UPSTREAM_WAITING.labels(upstream).inc()
+    try:
+        acquired = semaphore.acquire(timeout=UPSTREAM_ACQUIRE_TIMEOUT)
+    finally:
+        UPSTREAM_WAITING.labels(upstream).dec()
+    if not acquired:
+        UPSTREAM_ERRORS.labels(upstream, "busy").inc()
+        raise UpstreamBusy(upstream)
+    try:
+        # Slot tetap dipegang selama backoff agar retry tidak menambah beban upstream
+        return _post_with_retries(upstream, url, max_retries, kwargs)
+    finally:
+        semaphore.release()
+
+
+def _post_with_retries(upstream, url, max_retries, kwargs):
+    for attempt in range(max_retries + 1):
+        response = None
+        try:
+            response = _session().post(url, **kwargs)
+            retry_after = _retry_after(response) if response.status_code in RETRY_STATUS else None
+            if retry_after is not None and retry_after > _max_retry_delay(max_retries):
+                # Menunggu selama itu sambil memegang slot hanya memindahkan antrean ke klien
+                UPSTREAM_ERRORS.labels(upstream, "rate_limited").inc()
+                raise UpstreamBusy(upstream, retry_after=retry_after)
+            if response.status_code in RETRY_STATUS and attempt < max_retries:
+                reason = f"http_{response.status_code}"
+            else:
+                response.raise_for_status()
+                return response.json()
+        except (requests.ConnectionError, requests.Timeout) as e:
+            reason = "timeout" if isinstance(e, requests.Timeout) else "connection"
+            if attempt >= max_retries:
+                UPSTREAM_ERRORS.labels(upstream, reason).inc()
+                raise
+        except requests.HTTPError:
+            UPSTREAM_ERRORS.labels(upstream, f"http_{response.status_code}").inc()
+            raise
+        except ValueError:
+            UPSTREAM_ERRORS.labels(upstream, "invalid_json").inc()
+            raise
+
+        UPSTREAM_RETRIES.labels(upstream).inc()
+        logger.warning("%s gagal (%s), mencoba lagi (%d/%d)", upstream, reason, attempt + 1, max_retries)
+        time.sleep(min(_retry_delay(attempt, response), _max_retry_delay(max_retries)))
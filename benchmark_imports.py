@@ -0,0 +1,69 @@
+# benchmark_imports.py
+"""
+Benchmark waktu impor (startup) backend.
+
+Menjalankan `python -X importtime -c "import <modul>"` di proses baru dengan Backend di
+sys.path, lalu melaporkan total waktu impor dan modul paling lambat (kumulatif).
+Keluar dengan kode 1 jika total melebihi --target-ms, sehingga bisa dipakai di CI.
+
+Impor tidak boleh membuka koneksi: driver Neo4j, embedder dan sesi HTTP dibuat saat
+pertama kali dipakai (lihat config.get_driver dan groq_embedder.get_embedder).
+
+Contoh:
+    python benchmark_imports.py --module main --target-ms 1500 --repeat 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'Backend'))
+
+
+def measure(module):
+    """Satu run importtime → ({modul: kumulatif_us}, total_us)."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [BACKEND_DIR, os.getenv("PYTHONPATH")])))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Impor '{module}' gagal:\n{completed.stderr[-2000:]}")
+
+    cumulative = {}
+    for line in completed.stderr.splitlines():
+        # Format: "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        cumulative[name.strip()] = int(cumulative_us)
+    return cumulative, cumulative.get(module, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark waktu impor backend")
+    parser.add_argument("--module", default="main", help="Modul yang diimpor (relatif ke Backend)")
+    parser.add_argument("--repeat", type=int, default=3, help="Jumlah run; median yang dilaporkan")
+    parser.add_argument("--top", type=int, default=15, help="Jumlah modul paling lambat yang ditampilkan")
+    parser.add_argument("--target-ms", type=float, default=float(os.getenv("IMPORT_TARGET_MS", "2000")))
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.repeat)]
+    total_ms = statistics.median(total for _, total in runs) / 1000
+
+    # Tampilkan modul teratas (kumulatif, hanya paket tingkat atas) dari run dengan total median
+    cumulative, _ = sorted(runs, key=lambda run: run[1])[len(runs) // 2]
+    top_level = {name: us for name, us in cumulative.items() if "." not in name and name != args.module}
+    print(f"Impor '{args.module}': median {total_ms:.0f} ms dari {args.repeat} run (target {args.target_ms:.0f} ms)")
+    for name, us in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    if total_ms > args.target_ms:
+        print(f"❌ Waktu impor melebihi target sebesar {total_ms - args.target_ms:.0f} ms")
+        sys.exit(1)
+    print("✅ Waktu impor di bawah target")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+# benchmark_pipeline.py
+"""
+Benchmark latensi end-to-end untuk pipeline /ask.
+
+- Menjalankan `process_user_query` langsung (--target pipeline) atau endpoint FastAPI `/ask`
+  lewat HTTP (--target http, uvicorn dijalankan di proses ini).
+- Ollama dan Groq diganti server stub lokal dengan distribusi latensi yang bisa diatur,
+  sedangkan Neo4j memakai instance asli (NEO4J_URI) atau fixture replay
+  (GRAPHRAG_FIXTURE_MODE=replay, lihat Backend/replay.py).
+- Campuran query diambil dari ground_truth.json dan bisa diulang persis dengan --seed.
+- Melaporkan p50/p95/p99 per tahap (validation, topic_detection, embedding, vector_search,
+  traversal, prompt_build, generation) dan throughput, lalu menyimpannya sebagai JSON
+  agar hasil antar-run bisa dibandingkan.
+
+Contoh:
+    python benchmark_pipeline.py --requests 200 --concurrency 8 \
+        --ollama-latency lognormal:120,0.4 --groq-latency lognormal:1500,0.5
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STAGES = ("validation", "topic_detection", "keyword_search", "embedding", "vector_search",
+          "traversal", "packing", "prompt_build", "generation")
+
+
+# ==============================================================================
+# == DISTRIBUSI LATENSI & SERVER STUB                                          ==
+# ==============================================================================
+
+def parse_latency(spec: str):
+    """
+    Mengubah spesifikasi latensi (milidetik) menjadi fungsi sampler yang mengembalikan detik.
+    Format: fixed:MS | uniform:MIN,MAX | normal:MEAN,STD | lognormal:MEDIAN,SIGMA
+    """
+    kind, _, values = spec.partition(":")
+    params = [float(v) for v in values.split(",")] if values else []
+    if kind == "fixed":
+        return lambda rng: params[0] / 1000
+    if kind == "uniform":
+        return lambda rng: rng.uniform(params[0], params[1]) / 1000
+    if kind == "normal":
+        return lambda rng: max(rng.gauss(params[0], params[1]), 0.0) / 1000
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(params[0]), params[1]) / 1000
+    raise ValueError(f"Spesifikasi latensi tidak dikenal: {spec}")
+
+
+class StubServer:
+    """Server HTTP lokal di thread terpisah yang menjawab setiap POST dengan `respond(body)`."""
+
+    def __init__(self, respond, latency, seed):
+        rng = random.Random(seed)
+        rng_lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with rng_lock:
+                    delay = latency(rng)
+                time.sleep(delay)
+                payload = json.dumps(respond(self.path, body)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+
+
+def ollama_response(dimension):
+    def respond(path, body):
+        # Vektor deterministik per teks agar run bisa diulang
+        text = body.get("prompt") or body.get("input") or ""
+        texts = text if isinstance(text, list) else [text]
+        vectors = []
+        for t in texts:
+            rng = random.Random(hashlib.sha256(str(t).encode("utf-8")).digest())
+            vectors.append([rng.uniform(-1, 1) for _ in range(dimension)])
+        if path.endswith("/api/embed"):
+            return {"embeddings": vectors}
+        return {"embedding": vectors[0]}
+    return respond
+
+
+def groq_response(path, body):
+    prompt = body.get("messages", [{}])[-1].get("content", "")
+    # Prompt deteksi topik hanya butuh satu kata
+    content = "sama" if "sama\" atau \"berbeda" in prompt else "Jawaban benchmark. " * 40
+    return {"choices": [{"message": {"content": content}}]}
+
+
+# ==============================================================================
+# == PENCATATAN WAKTU PER TAHAP                                                ==
+# ==============================================================================
+
+class StageRecorder:
+    """Membungkus fungsi-fungsi pipeline dan mencatat durasinya per request (thread-local)."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.requests = []
+
+    def _add(self, stage, seconds):
+        stages = getattr(self._local, "stages", None)
+        if stages is not None:
+            stages[stage] = stages.get(stage, 0.0) + seconds
+
+    def wrap_stage(self, module, name, stage):
+        original = getattr(module, name)
+
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self._add(stage, time.perf_counter() - started)
+
+        setattr(module, name, wrapper)
+
+    def wrap_context(self, module, name):
+        """build_context/build_keyword_context sudah mencatat timings sendiri di ContextBundle."""
+        original = getattr(module, name)
+
+        def wrapper(*args, **kwargs):
+            bundle = original(*args, **kwargs)
+            for stage, seconds in bundle.timings.items():
+                self._add("traversal" if stage == "expansion" else stage, seconds)
+            return bundle
+
+        setattr(module, name, wrapper)
+
+    def wrap_request(self, modules, name):
+        original = getattr(modules[0], name)
+
+        def wrapper(*args, **kwargs):
+            self._local.stages = {}
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                stages = self._local.stages
+                stages["pipeline"] = time.perf_counter() - started
+                self._local.stages = None
+                with self._lock:
+                    self.requests.append(stages)
+
+        for module in modules:
+            setattr(module, name, wrapper)
+
+
+def instrument_pipeline(recorder):
+    import generation
+    from retrieval import query_processor
+
+    recorder.wrap_stage(query_processor, "validate_input", "validation")
+    recorder.wrap_stage(query_processor, "is_topic_changed", "topic_detection")
+    recorder.wrap_context(query_processor, "build_keyword_context")
+    recorder.wrap_context(query_processor, "build_context")
+    recorder.wrap_stage(generation, "build_prompt", "prompt_build")
+    recorder.wrap_stage(generation, "call_groq_api", "generation")
+    # /ask memanggil answer_query, yang meneruskan ke process_user_query lewat nama modul
+    recorder.wrap_request([query_processor], "process_user_query")
+
+
+# ==============================================================================
+# == CAMPURAN QUERY & DRIVER BEBAN                                             ==
+# ==============================================================================
+
+def load_query_mix(path, count, seed):
+    """Daftar (pertanyaan, riwayat) dari ground truth, diacak dengan seed agar bisa diulang."""
+    with open(path, "r", encoding="utf-8") as f:
+        ground_truth = json.load(f)
+
+    pool = []
+    for item in ground_truth:
+        if item.get("query"):
+            pool.append((item["query"], []))
+        elif item.get("queries"):
+            history = [(q, "jawaban dummy") for q in item["queries"][:-1]]
+            pool.append((item["queries"][-1], history))
+
+    rng = random.Random(seed)
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def start_http_app():
+    import uvicorn
+    from main import app
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, f"http://127.0.0.1:{port}/ask"
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 2) if values else None,
+        "p95_ms": round(percentile(values, 95) * 1000, 2) if values else None,
+        "p99_ms": round(percentile(values, 99) * 1000, 2) if values else None,
+        "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark latensi pipeline /ask")
+    parser.add_argument("--target", choices=("pipeline", "http"), default="pipeline")
+    parser.add_argument("--requests", type=int, default=100, help="Jumlah request total")
+    parser.add_argument("--concurrency", type=int, default=4, help="Jumlah request bersamaan")
+    parser.add_argument("--warmup", type=int, default=5, help="Request pemanasan yang tidak dihitung")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ground-truth", default="ground_truth.json")
+    parser.add_argument("--ollama-latency", default="lognormal:120,0.3", help="Latensi stub Ollama (ms)")
+    parser.add_argument("--groq-latency", default="lognormal:1200,0.4", help="Latensi stub Groq (ms)")
+    parser.add_argument("--dimension", type=int, default=3584, help="Dimensi vektor dari stub Ollama")
+    parser.add_argument("--output", default=None, help="File JSON hasil (default benchmarks/<waktu>.json)")
+    args = parser.parse_args()
+
+    ollama = StubServer(ollama_response(args.dimension), parse_latency(args.ollama_latency), args.seed)
+    groq = StubServer(groq_response, parse_latency(args.groq_latency), args.seed + 1)
+
+    # Harus di-set sebelum modul Backend diimpor
+    os.environ["OLLAMA_HOST"] = ollama.url
+    os.environ["GROQ_API_URL"] = f"{groq.url}/openai/v1/chat/completions"
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "Backend")))
+
+    recorder = StageRecorder()
+    instrument_pipeline(recorder)
+
+    if args.target == "http":
+        import requests
+        server, ask_url = start_http_app()
+        http = requests.Session()
+
+        def send(query):
+            response = http.post(ask_url, json={"question": query[0], "history": query[1]}, timeout=300)
+            response.raise_for_status()
+    else:
+        from retrieval import query_processor
+
+        def send(query):
+            query_processor.process_user_query(query[0], query[1])
+
+    def timed(query):
+        started = time.perf_counter()
+        error = None
+        try:
+            send(query)
+        except Exception as e:
+            error = str(e)
+        return time.perf_counter() - started, error
+
+    for query in load_query_mix(args.ground_truth, args.warmup, args.seed - 1):
+        timed(query)
+    recorder.requests.clear()
+
+    queries = load_query_mix(args.ground_truth, args.requests, args.seed)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(timed, queries))
+    wall = time.perf_counter() - started
+
+    latencies = [seconds for seconds, error in results if error is None]
+    errors = [error for _, error in results if error is not None]
+    stage_values = {stage: [r[stage] for r in recorder.requests if stage in r] for stage in STAGES + ("pipeline",)}
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": vars(args),
+        "neo4j": os.getenv("GRAPHRAG_FIXTURE_MODE") or os.getenv("NEO4J_URI", "neo4j://localhost:7687"),
+        "throughput_rps": round(len(latencies) / wall, 3) if wall > 0 else None,
+        "wall_seconds": round(wall, 3),
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "end_to_end": summarize(latencies),
+        "stages": {stage: summarize(values) for stage, values in stage_values.items() if values},
+    }
+
+    print(f"\n📊 {args.requests} request, konkurensi {args.concurrency}, target {args.target}")
+    print(f"{'tahap':<18}{'p50':>10}{'p95':>10}{'p99':>10}  (ms)")
+    for stage, stats in [("end_to_end", report["end_to_end"])] + list(report["stages"].items()):
+        print(f"{stage:<18}{stats['p50_ms'] or 0:>10.1f}{stats['p95_ms'] or 0:>10.1f}{stats['p99_ms'] or 0:>10.1f}")
+    print(f"Throughput: {report['throughput_rps']} req/detik | error: {len(errors)}")
+
+    output = args.output or os.path.join("benchmarks", datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"💾 Hasil disimpan ke '{output}'")
+
+    if args.target == "http":
+        server.should_exit = True
+    ollama.close()
+    groq.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# compare_embedders.py
+"""
+Perbandingan recall embedder secara berdampingan, untuk memilih model yang lebih kecil
+bagi latensi query tanpa harus membangun ulang index Neo4j.
+
+- Korpus: semua chunk (info/text/translation/tafsir) dari sumber yang diharapkan di
+  ground_truth.json ditambah --distractors sumber acak (seed tetap).
+- Kandidat "ollama:<model>" memakai embedding yang sudah tersimpan di Neo4j untuk
+  dokumen dan Ollama untuk query (ini sama dengan sistem produksi).
+- Kandidat lokal "onnx:<model>[:<file onnx>]" atau "torch:<model>" meng-embed korpus
+  di proses ini (lihat Backend/local_embedder.py).
+- Skor sumber = cosine tertinggi di antara chunk-nya; dilaporkan recall@k, MRR,
+  latensi embedding query (p50/p95) dan throughput embedding dokumen.
+
+Contoh:
+    python compare_embedders.py \
+        --candidate ollama:gte-qwen2-7b-instruct \
+        --candidate onnx:sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2:onnx/model_qint8_avx512_vnni.onnx \
+        --candidate torch:intfloat/multilingual-e5-small
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'Backend')))
+
+from config import driver
+from groq_embedder import BACKEND_LOCAL, BACKEND_OLLAMA, create_embedder
+from retrieval.records import SourceRecord, PROVENANCE_HIT
+
+K_VALUES = (1, 5, 10)
+
+
+def load_source_index():
+    """Metadata semua info chunk → {info_id: SourceRecord} (tanpa teks)."""
+    result = driver.execute_query(
+        """
+        MATCH (info:Chunk {source: 'info'})
+        OPTIONAL MATCH (bab:Bab)-[:CONTAINS_HADITH_CHUNK]->(info)
+        OPTIONAL MATCH (kitab:Kitab)-[:HAS_BAB]->(bab)
+        RETURN elementId(info) AS info_id,
+               info.surah_name AS surah_name, info.ayat_number AS ayat_number,
+               info.hadith_number AS hadith_number, info.source_name AS source_name,
+               bab.name AS bab_name, kitab.name AS kitab_name
+        """
+    )
+    return {record["info_id"]: SourceRecord.from_row(record["info_id"], record, PROVENANCE_HIT, None)
+            for record in result.records}
+
+
+def load_chunks(info_ids, with_embeddings):
+    """Semua chunk dalam rantai setiap info: daftar (info_id, teks, embedding tersimpan)."""
+    result = driver.execute_query(
+        """
+        UNWIND $info_ids AS info_id
+        MATCH (info:Chunk {source: 'info'}) WHERE elementId(info) = info_id
+        MATCH (info)-[:HAS_CHUNK*0..]->(c:Chunk)
+        WHERE c.text IS NOT NULL
+        RETURN info_id, c.text AS text, CASE WHEN $with_embeddings THEN c.embedding END AS embedding
+        """,
+        {"info_ids": list(info_ids), "with_embeddings": with_embeddings}
+    )
+    return [(record["info_id"], record["text"], record["embedding"]) for record in result.records]
+
+
+def matches(source, expected_id):
+    """ID ground truth bisa berawalan emoji dan menyertakan Kitab/Bab; cocokkan pada ID ringkas."""
+    expected = expected_id.lstrip("📖📘 ").strip()
+    return expected == source.mrr_id or expected.startswith(source.mrr_id + " |")
+
+
+def build_queries(ground_truth):
+    queries = []
+    for item in ground_truth:
+        if item.get("query"):
+            history, question = [], item["query"]
+        elif item.get("queries"):
+            history, question = [(q, "jawaban dummy") for q in item["queries"][:-1]], item["queries"][-1]
+        else:
+            continue
+        # Format sama seperti build_semantic_query di query_processor
+        text = "".join(f"User: {q}\nAssistant: {a}\n" for q, a in history) + f"User: {question}"
+        queries.append((text, item.get("expected_ids", [])))
+    return queries
+
+
+def parse_candidate(spec):
+    runtime, _, rest = spec.partition(":")
+    model, _, onnx_file = rest.partition(":")
+    if runtime not in (BACKEND_OLLAMA, "onnx", "torch") or not model:
+        raise argparse.ArgumentTypeError(f"Kandidat tidak valid: {spec}")
+    return {"spec": spec, "runtime": runtime, "model": model, "onnx_file": onnx_file or None}
+
+
+def normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def percentile(values, pct):
+    return float(np.percentile(values, pct)) * 1000 if values else None
+
+
+def evaluate_candidate(candidate, chunks, queries, sources, args):
+    print(f"\n=== {candidate['spec']} ===")
+    if candidate["runtime"] == BACKEND_OLLAMA:
+        embedder = create_embedder(BACKEND_OLLAMA, candidate["model"])
+        kept = [(info_id, embedding) for info_id, _, embedding in chunks if embedding]
+        doc_info_ids = [info_id for info_id, _ in kept]
+        doc_vectors = np.asarray([embedding for _, embedding in kept], dtype=np.float32)
+        doc_seconds = None
+    else:
+        embedder = create_embedder(BACKEND_LOCAL, candidate["model"], runtime=candidate["runtime"],
+                                   onnx_file=candidate["onnx_file"], threads=args.threads,
+                                   batch_size=args.batch_size, batch_window_ms=0)
+        doc_info_ids = [info_id for info_id, _, _ in chunks]
+        started = time.perf_counter()
+        doc_vectors = np.asarray(embedder.embed_texts([text for _, text, _ in chunks]), dtype=np.float32)
+        doc_seconds = time.perf_counter() - started
+        print(f"Korpus: {len(chunks)} chunk di-embed dalam {doc_seconds:.1f} detik")
+
+    doc_vectors = normalize(doc_vectors)
+    info_index = sorted(set(doc_info_ids))
+    info_position = {info_id: i for i, info_id in enumerate(info_index)}
+    doc_to_info = np.asarray([info_position[info_id] for info_id in doc_info_ids])
+
+    latencies = []
+    hits = {k: 0 for k in K_VALUES}
+    reciprocal_ranks = []
+    for text, expected_ids in queries:
+        started = time.perf_counter()
+        query_vector = np.asarray(embedder.embed_query(text), dtype=np.float32)
+        latencies.append(time.perf_counter() - started)
+
+        chunk_scores = doc_vectors @ (query_vector / (np.linalg.norm(query_vector) or 1))
+        info_scores = np.full(len(info_index), -np.inf, dtype=np.float32)
+        np.maximum.at(info_scores, doc_to_info, chunk_scores)
+        ranking = np.argsort(-info_scores)[:max(K_VALUES)]
+
+        rank = 0
+        for position, index in enumerate(ranking, start=1):
+            source = sources[info_index[index]]
+            if any(matches(source, expected) for expected in expected_ids):
+                rank = position
+                break
+        for k in K_VALUES:
+            hits[k] += 1 if 0 < rank <= k else 0
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+    result = {
+        "candidate": candidate["spec"],
+        "model": embedder.model,
+        "dimension": int(doc_vectors.shape[1]),
+        "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+        "query_p50_ms": round(percentile(latencies, 50), 2),
+        "query_p95_ms": round(percentile(latencies, 95), 2),
+        "docs_per_second": round(len(chunks) / doc_seconds, 1) if doc_seconds else None,
+    }
+    for k in K_VALUES:
+        result[f"recall@{k}"] = round(hits[k] / len(queries), 4)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perbandingan recall dan latensi embedder")
+    parser.add_argument("--candidate", action="append", type=parse_candidate, required=True,
+                        help="runtime:model[:file_onnx], runtime = ollama | onnx | torch")
+    parser.add_argument("--ground-truth", default="ground_truth.json")
+    parser.add_argument("--distractors", type=int, default=2000, help="Jumlah sumber acak tambahan di korpus")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--output", default=None, help="Simpan hasil sebagai JSON")
+    args = parser.parse_args()
+
+    with open(args.ground_truth, "r", encoding="utf-8") as f:
+        queries = build_queries(json.load(f))
+
+    sources = load_source_index()
+    expected = {info_id for info_id, source in sources.items()
+                if any(matches(source, e) for _, expected_ids in queries for e in expected_ids)}
+    others = sorted(set(sources) - expected)
+    rng = random.Random(args.seed)
+    selected = expected | set(rng.sample(others, min(args.distractors, len(others))))
+    print(f"Korpus: {len(selected)} sumber ({len(expected)} diharapkan), {len(queries)} query")
+
+    with_embeddings = any(c["runtime"] == BACKEND_OLLAMA for c in args.candidate)
+    chunks = load_chunks(sorted(selected), with_embeddings)
+
+    results = [evaluate_candidate(candidate, chunks, queries, sources, args) for candidate in args.candidate]
+
+    columns = ["candidate", "dimension", "recall@1", "recall@5", "recall@10", "mrr", "query_p50_ms", "query_p95_ms", "docs_per_second"]
+    print("\n" + " | ".join(columns))
+    for result in results:
+        print(" | ".join(str(result[column]) for column in columns))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": {k: v for k, v in vars(args).items() if k != "candidate"},
+                       "results": results}, f, indent=2, ensure_ascii=False)
+        print(f"💾 Hasil disimpan ke '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,21 @@
 # create_index.py
 
-from Backend.config import driver, DIMENSION
+from Backend.process_data.reset import create_vector_index, VECTOR_INDEX_NAME
+from Backend.config import NEO4J_DATABASE, get_driver
 import sys
 
 def create_indices():
     """
     Definisi indeks yang sederhana dan benar.
     Karena semua konten (Quran & Hadis) sekarang ada di node :Chunk,
-    indeks ini akan mencakup semuanya.
+    indeks ini akan mencakup semuanya. Menunggu sampai indeks selesai terisi.
     """
     try:
-        with driver.session() as session:
-            session.run("""
-                CREATE VECTOR INDEX chunk_embeddings IF NOT EXISTS
-                FOR (c:Chunk)
-                ON (c.embedding)
-                OPTIONS {
-                    indexConfig: {
-                        `vector.dimensions`: $dim,
-                        `vector.similarity_function`: 'cosine'
-                    }
-                }
-            """, dim=DIMENSION)
-            print("✅ Indeks vektor 'chunk_embeddings' berhasil dibuat atau sudah ada.")
+        with get_driver().session(database=NEO4J_DATABASE) as session:
+            create_vector_index(session, VECTOR_INDEX_NAME)
     except Exception as e:
         print(f"❌ Error saat membuat indeks: {str(e)}")
         sys.exit(1)
 
 if __name__ == "__main__":
-    create_indices()
\ No newline at end of file
+    create_indices()
@@ -1,8 +1,8 @@
+import argparse
 import json
-import re
 import os
 import sys
-from typing import Dict, List, Set, Tuple, Any
+from typing import Dict, List, Any
 
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'Backend')))
@@ -11,57 +11,26 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'Backend
 # == BAGIAN 1: IMPORT DARI SISTEM RETRIEVAL ANDA                             ==
 # ==============================================================================
 try:
-    from retrieval.context_builder import build_chunk_context_interleaved
+    from retrieval.context_builder import build_context
+    from evaluation_engine import add_engine_arguments, setup_engine, run_parallel, report_cache
 except ImportError as e:
-    print(f"❌ Gagal mengimpor modul 'build_chunk_context_interleaved': {e}")
+    print(f"❌ Gagal mengimpor modul 'build_context': {e}")
     sys.exit(1)
 
 # ==============================================================================
 # == BAGIAN 2: FUNGSI HELPER DAN FUNGSI RETRIEVAL UTAMA                      ==
 # ==============================================================================
 
-def extract_retrieval_results(context_str: str) -> Dict[str, Any]:
+def extract_retrieval_results(result) -> Dict[str, Any]:
     """
-    (VERSI BARU) Mengekstrak main_id dan coverage_ids dari string konteks mentah.
-    Fungsi ini sekarang lebih cerdas dan tidak bergantung pada baris log "Konteks utama ditemukan".
+    Mengambil main_id dan coverage_ids langsung dari hasil retrieval terstruktur (ContextBundle).
+    - main_id: ID MRR dari sumber pertama (paling relevan).
+    - coverage_ids: tag chunk (misal "[INFO Al-Fatihah:7]") dari semua sumber di konteks.
     """
-    if not context_str:
+    if not result:
         return {"main_id": None, "coverage_ids": set()}
 
-    # 1. Ekstrak semua ID cakupan dari seluruh konteks terlebih dahulu
-    all_coverage_ids = set(re.findall(r'\[\w+\s+[^\]]+\]', context_str))
-
-    # 2. Simpulkan ID Utama dari chunk pertama (paling relevan)
-    main_id = None
-    first_chunk = context_str.split('---')[0]
-    
-    # Cari ID semantik pertama di dalam chunk pertama
-    first_id_match = re.search(r'\[\w+\s+(.*?)(?:\sNo\.)?:\s*(\d+)\]', first_chunk)
-    
-    if first_id_match:
-        source_name = first_id_match.group(1).replace("Shahih ", "").strip()
-        number = first_id_match.group(2)
-        # Konversi ke format MRR ID. Ini adalah asumsi berdasarkan pola umum.
-        # Anda mungkin perlu menyesuaikannya jika formatnya berbeda.
-        if "Bukhari" in source_name or "Tirmidzi" in source_name:
-             # Placeholder untuk nama kitab dan bab karena tidak ada di ID
-            main_id = f"Hadis {source_name} No. {number} | Kitab: ... | Bab: ..."
-            # NOTE: Karena info Kitab/Bab tidak ada di ID, perbandingan MRR mungkin
-            # memerlukan penyesuaian. Cara paling mudah adalah menyederhanakan MRR ID
-            # di ground truth menjadi "Hadis Shahih Bukhari No. 7", dll.
-            # Untuk sekarang, kita fokus membuat ini tidak None.
-            # Alternatif paling sederhana:
-            main_id = f"Hadis {source_name} No. {number}"
-        else: # Asumsi ini untuk Surah
-            main_id = f"Surah: {source_name} | Ayat: {number}"
-
-    # Jika parsing gagal, coba metode lama sebagai fallback (walaupun kemungkinan gagal)
-    if not main_id:
-        old_main_id_match = re.search(r"Konteks utama ditemukan → (.*?)(?: \| Kitab:.*)?\n", context_str)
-        if old_main_id_match:
-            main_id = old_main_id_match.group(1).strip()
-
-    return {"main_id": main_id, "coverage_ids": all_coverage_ids}
+    return {"main_id": result.sources[0].mrr_id, "coverage_ids": result.coverage_ids}
 
 def run_full_retrieval(query: str) -> Dict[str, Any]:
     """
@@ -69,20 +38,18 @@ def run_full_retrieval(query: str) -> Dict[str, Any]:
     main_id (untuk MRR) dan coverage_ids (untuk Graph Coverage).
     """
     print(f"\n---> Menjalankan retrieval untuk query: '{query}'")
-    
-    # Panggil fungsi inti untuk mendapatkan seluruh blok konteks
-    context_str = build_chunk_context_interleaved(query, top_k=5, min_score=0.6)
 
-    # Ekstrak hasilnya menggunakan fungsi helper baru
-    return extract_retrieval_results(context_str)
+    result = build_context(query, top_k=5, min_score=0.6)
+    return extract_retrieval_results(result)
 
 # ==============================================================================
 # == BAGIAN 3: KALKULASI METRIK GABUNGAN (MRR & COVERAGE)                    ==
 # ==============================================================================
 
-def calculate_combined_metrics(ground_truth_data: List[Dict]):
+def calculate_combined_metrics(ground_truth_data: List[Dict], workers: int = 1):
     """
     Menghitung MRR dan metrik Graph Coverage (Recall, Precision, F1) secara bersyarat.
+    Retrieval untuk semua query dijalankan paralel, penilaian tetap berurutan.
     """
     mrr_scores = []
     # Inisialisasi list untuk skor coverage yang valid (tidak di-skip)
@@ -90,9 +57,10 @@ def calculate_combined_metrics(ground_truth_data: List[Dict]):
     valid_precisions = []
     valid_f1s = []
     
-    for i, item in enumerate(ground_truth_data):
-        query = item["query"]
-        retrieval_result = run_full_retrieval(query)
+    queries = [item["query"] for item in ground_truth_data]
+    retrieval_results = run_parallel(queries, run_full_retrieval, workers=workers)
+
+    for item, retrieval_result in zip(ground_truth_data, retrieval_results):
         retrieved_main_id = retrieval_result["main_id"]
         retrieved_coverage_ids = retrieval_result["coverage_ids"]
 
@@ -172,14 +140,20 @@ if __name__ == "__main__":
     print("== Memulai Evaluasi Gabungan (MRR & Graph Coverage) ==")
     print("=" * 50)
     
+    parser = argparse.ArgumentParser(description="Evaluasi gabungan MRR & Graph Coverage")
+    add_engine_arguments(parser)
+    args = parser.parse_args()
+
     try:
         with open(GT_FILE, 'r', encoding='utf-8') as f:
             ground_truth = json.load(f)
     except FileNotFoundError:
         print(f"❌ ERROR: File '{GT_FILE}' tidak ditemukan.")
         sys.exit(1)
-        
-    results = calculate_combined_metrics(ground_truth)
+
+    cache = setup_engine(args)
+    results = calculate_combined_metrics(ground_truth, workers=args.workers)
+    report_cache(cache)
     
     print("\n" + "=" * 50)
     print("== HASIL AKHIR EVALUASI ==")
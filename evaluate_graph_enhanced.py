@@ -365,24 +365,25 @@ class EnhancedGraphEvaluator:
             for rec in evaluation_results['recommendations']:
                 print(f"  {rec}")
 
+# Ground truth contoh; chunk ID yang di-traverse ada di simulate_retrieval_results
+# (juga direkam oleh record_fixture.py untuk mode replay)
+GROUND_TRUTH = [
+    {
+        "query": "bagaimana islam memandang perbuatan liwath?",
+        "expected_ids": [
+            "📘 Hadis Jami` at-Tirmidzi No. 1376 Kitab: Hukum Hudud | Bab: Hukuman liwath (homoseksual)",
+            "📖 Surah: An-Nisa' | Ayat: 16"
+        ]
+    }
+]
+
 # Usage
 def main():
     """Main function untuk menjalankan evaluasi"""
     evaluator = EnhancedGraphEvaluator()
     
-    # Load ground truth
-    ground_truth = [
-        {
-            "query": "bagaimana islam memandang perbuatan liwath?",
-            "expected_ids": [
-                "📘 Hadis Jami` at-Tirmidzi No. 1376 Kitab: Hukum Hudud | Bab: Hukuman liwath (homoseksual)",
-                "📖 Surah: An-Nisa' | Ayat: 16"
-            ]
-        }
-    ]
-    
     # Run evaluation
-    results = evaluator.run_comprehensive_evaluation(ground_truth)
+    results = evaluator.run_comprehensive_evaluation(GROUND_TRUTH)
     
     # Save results
     with open('enhanced_traversal_evaluation.json', 'w', encoding='utf-8') as f:
@@ -1,118 +1,78 @@
+import argparse
 import json
-import re
 import os
 import sys
 
-# Tambahkan path proyek ke sys.path agar bisa mengimpor dari package 'retrieval'
-sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+# Tambahkan folder Backend ke sys.path agar bisa mengimpor dari package 'retrieval'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'Backend')))
 
 # ==============================================================================
 # == BAGIAN 1: IMPORT DARI SISTEM RETRIEVAL ANDA                              ==
 # ==============================================================================
 try:
     from retrieval.parser import parse_hadith_query
-    from retrieval.retrieval import keyword_search_hadith_by_number
-    from retrieval.context_builder import build_chunk_context_interleaved
-    from retrieval.traversal import get_full_context_from_info
+    from retrieval.context_builder import build_context, build_keyword_context
+    from evaluation_engine import add_engine_arguments, setup_engine, run_parallel, report_cache
 except ImportError as e:
     print(f"❌ Gagal mengimpor modul dari package 'retrieval': {e}")
     print("Pastikan skrip ini dijalankan dari root direktori proyek Anda.")
     sys.exit(1)
 
 # ==============================================================================
-# == BAGIAN 2: FUNGSI HELPER DAN FUNGSI RETRIEVAL UTAMA                       ==
+# == BAGIAN 2: FUNGSI RETRIEVAL UTAMA                                         ==
 # ==============================================================================
 
-# =============================================================================
-# == FUNGSI INI DIGANTI DENGAN VERSI V2 YANG LEBIH STABIL ==
-# =============================================================================
-def get_source_from_context_string(context_part: str) -> str | None:
-    """Membaca teks baris demi baris untuk menemukan header sumber (Versi 2)."""
-    header_lines = []
-    # Membaca setiap baris dari potongan konteks
-    for line in context_part.strip().split('\n'):
-        # Jika bertemu baris "Skor Similarity", hentikan pembacaan header
-        if "Skor Similarity:" in line:
-            break
-        # Jika baris tidak kosong, tambahkan ke header
-        if line.strip():
-            header_lines.append(line.strip())
-    
-    # Jika header ditemukan, gabungkan menjadi satu string
-    if header_lines:
-        return ' '.join(header_lines)
-    return None
-# =============================================================================
-
 def run_retrieval_for_query(query: str, history: list = []) -> list[str]:
     """
-    Menjalankan alur retrieval dan memastikan SEMUA hasil dokumen diproses menjadi daftar.
+    Menjalankan alur retrieval dan mengembalikan ID sumber dari hasil terstruktur,
+    tanpa perlu mem-parsing ulang string konteks.
     """
     print(f"\n---> Menjalankan retrieval untuk query: '{query}'")
-    
-    combined_query = ""
-    for q, a in history:
-        combined_query += f"User: {q}\nAssistant: {a}\n"
-    combined_query += f"User: {query}"
+
+    turns = [f"User: {q}\nAssistant: {a}\n" for q, a in history]
+    turns.append(f"User: {query}")
+    combined_query = "".join(turns)
 
     hadith_request = parse_hadith_query(query)
     if hadith_request and hadith_request.get("number"):
-        info_id = keyword_search_hadith_by_number(hadith_request["number"])
-        if info_id:
-            row = get_full_context_from_info(info_id)
-            if row:
-                sumber_text = f"Hadis {row.get('source_name')} No. {row.get('hadith_number')}"
-                kitab_text = f"Kitab: {row.get('kitab_name', '-')}"
-                bab_text = f"Bab: {row.get('bab_name', '-')}"
-                sumber = f"📘 {sumber_text} | {kitab_text} | {bab_text}"
-                print(f"✅ Keyword match found: {sumber}")
-                return [sumber]
-
-    # Panggil fungsi inti untuk mendapatkan seluruh blok konteks
-    context_str = build_chunk_context_interleaved(combined_query, top_k=5, min_score=0.6)
-
-    if not context_str:
-        return []
-
-    # Memecah string panjang menjadi daftar bagian-bagian dokumen
-    context_parts = context_str.strip().split('---')
-    
-    retrieved_ids = []
-    # Loop ini akan memproses SEMUA bagian di dalam context_parts
-    for part in context_parts:
-        if part.strip():
-            # Memanggil fungsi get_source_from_context_string (versi V2 yang baru)
-            source_id = get_source_from_context_string(part)
-            if source_id:
-                retrieved_ids.append(source_id)
-    
-    # Return dieksekusi SETELAH loop selesai, sehingga mengembalikan daftar lengkap
-    return retrieved_ids
+        keyword_result = build_keyword_context(hadith_request["number"])
+        if keyword_result:
+            source = keyword_result.sources[0]
+            sumber = (f"📘 Hadis {source.source_name} No. {source.hadith_number} | "
+                      f"Kitab: {source.kitab_name or '-'} | Bab: {source.bab_name or '-'}")
+            print(f"✅ Keyword match found: {sumber}")
+            return [sumber]
+
+    # Panggil fungsi inti; hasilnya sudah berupa daftar sumber terurut
+    result = build_context(combined_query, top_k=5, min_score=0.6)
+    return result.source_ids
 
 # ==============================================================================
 # == BAGIAN 3: KALKULASI MRR (LOGIKA BARU)                                    ==
 # ==============================================================================
 
-def calculate_mrr(ground_truth_data: list[dict]):
+def retrieve_for_item(item: dict) -> list[str]:
+    """Menjalankan retrieval untuk satu item ground truth (single-turn atau multiturn)."""
+    query = item.get("query")
+    queries = item.get("queries")
+
+    if query:
+        return run_retrieval_for_query(query)
+    if queries:
+        print(f"\n---> Menjalankan retrieval MULTITURN")
+        chat_history = [(q, "jawaban dummy") for q in queries[:-1]]
+        return run_retrieval_for_query(queries[-1], history=chat_history)
+    return []
+
+def calculate_mrr(ground_truth_data: list[dict], workers: int = 1):
     """Menghitung Mean Reciprocal Rank (MRR) dengan daftar jawaban yang valid."""
     reciprocal_ranks = []
-    
-    for item in ground_truth_data:
-        query = item.get("query")
-        queries = item.get("queries")
+
+    # Retrieval dijalankan paralel; penilaian tetap berurutan agar log dan skor konsisten
+    all_retrieved_ids = run_parallel(ground_truth_data, retrieve_for_item, workers=workers)
+
+    for item, retrieved_ids in zip(ground_truth_data, all_retrieved_ids):
         expected_ids = item.get("expected_ids", []) # Ambil daftar jawaban
-        
-        retrieved_ids = []
-        if query:
-            retrieved_ids = run_retrieval_for_query(query)
-        elif queries:
-            print(f"\n---> Menjalankan retrieval MULTITURN")
-            chat_history = []
-            for i, q in enumerate(queries):
-                if i < len(queries) - 1:
-                    chat_history.append((q, "jawaban dummy"))
-                else:
-                    retrieved_ids = run_retrieval_for_query(q, history=chat_history)
 
         print(f"Hasil retrieval: {retrieved_ids}")
         print(f"Jawaban diharapkan (salah satunya): {expected_ids}")
@@ -141,14 +101,20 @@ if __name__ == "__main__":
     print("== Memulai Evaluasi Sistem Retrieval (MRR) ==")
     print("==============================================")
     
+    parser = argparse.ArgumentParser(description="Evaluasi MRR sistem retrieval")
+    add_engine_arguments(parser)
+    args = parser.parse_args()
+
     try:
         with open('ground_truth.json', 'r', encoding='utf-8') as f:
             ground_truth = json.load(f)
     except FileNotFoundError:
         print("❌ ERROR: File 'ground_truth.json' tidak ditemukan.")
         sys.exit(1)
-        
-    mrr_value = calculate_mrr(ground_truth)
+
+    cache = setup_engine(args)
+    mrr_value = calculate_mrr(ground_truth, workers=args.workers)
+    report_cache(cache)
     
     print("\n==============================================")
     print("== HASIL AKHIR EVALUASI ==")
@@ -0,0 +1,67 @@
+# evaluation_engine.py
+"""
+Mesin evaluasi bersama untuk evaluate_retrieval.py dan evaluate_graph.py.
+- Menjalankan query ground truth secara paralel dengan jumlah worker terbatas.
+- Menyimpan embedding query di cache SQLite pada disk (shared_cache.EmbeddingCache), sehingga run berikutnya
+  (misal saat mengubah top_k atau min_score) tidak memanggil Ollama lagi.
+Hasil dikembalikan dalam urutan input, jadi skor MRR/recall/precision/F1 identik
+dengan menjalankan query satu per satu.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'Backend')))
+
+DEFAULT_WORKERS = 8
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'query_embeddings.sqlite')
+
+
+def add_engine_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Jumlah query yang diproses bersamaan (default {DEFAULT_WORKERS})")
+    parser.add_argument("--embedding-cache", default=DEFAULT_CACHE_PATH,
+                        help="Lokasi cache embedding query di disk")
+    parser.add_argument("--no-embedding-cache", action="store_true",
+                        help="Nonaktifkan cache embedding query")
+
+
+def setup_engine(args):
+    """Memasang cache embedding query sesuai argumen CLI. Mengembalikan cache (atau None)."""
+    if args.no_embedding_cache:
+        return None
+
+    # Dalam mode record/replay embedding harus lewat fixture, bukan cache
+    from replay import FIXTURE_MODE
+    if FIXTURE_MODE:
+        return None
+
+    from groq_embedder import get_embedder
+    from retrieval.embedding import set_query_cache
+    from shared_cache import EmbeddingCache
+    cache = EmbeddingCache(args.embedding_cache, get_embedder().model)
+    set_query_cache(cache)
+    return cache
+
+
+def run_parallel(items, fn, workers=DEFAULT_WORKERS):
+    """
+    Menjalankan fn(item) untuk setiap item dengan maksimal `workers` thread.
+    Hasil dikembalikan dalam urutan yang sama dengan `items`.
+    """
+    started = time.perf_counter()
+    if workers <= 1:
+        results = [fn(item) for item in items]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(fn, items))
+    elapsed = time.perf_counter() - started
+    print(f"\n⏱️  {len(results)} query selesai dalam {elapsed:.2f} detik ({workers} worker)")
+    return results
+
+
+def report_cache(cache):
+    if cache is not None:
+        print(f"🗄️  Cache embedding query: {cache.hits} hit, {cache.misses} miss")
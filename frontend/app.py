@@ -3,6 +3,7 @@
 import streamlit as st
 import requests  # Menggunakan requests untuk memanggil backend
 import re
+import uuid
 from html import escape
 
 # --- KONFIGURASI APLIKASI ---
@@ -398,7 +399,18 @@ if st.session_state.messages and st.session_state.messages[-1]["role"] == "user"
             }
 
             # 2. Kirim permintaan POST ke API backend
-            response = requests.post(BACKEND_URL, json=payload, timeout=90)
+            # X-Client-ID membuat antrean backend adil per sesi, bukan per kontainer frontend
+            if "client_id" not in st.session_state:
+                st.session_state.client_id = uuid.uuid4().hex
+            response = requests.post(BACKEND_URL, json=payload, timeout=90,
+                                     headers={"X-Client-ID": st.session_state.client_id})
+
+            # Backend sedang penuh: tampilkan waktu tunggu, jangan langsung kirim ulang
+            if response.status_code in (429, 503):
+                retry_after = response.headers.get("Retry-After", "beberapa")
+                busy_msg = f"⏳ Server sedang sibuk. Silakan kirim ulang pertanyaan dalam {retry_after} detik."
+                st.session_state.messages.append({"role": "assistant", "content": busy_msg})
+                st.rerun()
             response.raise_for_status()
 
             # 3. Ambil jawaban dari response JSON
@@ -1,44 +1,157 @@
+import argparse
 import json
-import numpy as np
-from neo4j import GraphDatabase
 from tqdm import tqdm
-from Backend.config import driver, DIMENSION
-from Backend.groq_embedder import Embedder
-from sklearn.metrics.pairwise import cosine_similarity
+from Backend.config import get_driver, DIMENSION, NEO4J_DATABASE
 import time
 
+# Jumlah relasi (satu arah) yang ditulis per transaksi
+WRITE_BATCH_SIZE = 5000
+
+
+class RelationWriter:
+    """
+    Penulis relasi RELATED_TO yang di-key pada (surah_number, number) milik :Ayat.
+    - MATCH memakai constraint unik 'ayat_key' sehingga setiap endpoint adalah index seek.
+    - MERGE hanya pada endpoint, skor similarity di-SET, jadi rerun tidak membuat duplikat.
+    - Relasi ditampung lalu ditulis per batch dengan ukuran terbatas.
+    """
+
+    QUERY = """
+    UNWIND $batch AS rel
+    MATCH (a:Ayat {surah_number: rel.surah_number_1, number: rel.ayah_number_1})
+    MATCH (b:Ayat {surah_number: rel.surah_number_2, number: rel.ayah_number_2})
+    MERGE (a)-[r:RELATED_TO]->(b)
+    SET r.similarity = rel.similarity
+    """
+
+    def __init__(self, session, batch_size=WRITE_BATCH_SIZE):
+        self.session = session
+        self.batch_size = batch_size
+        self.buffer = {}
+        self.written = 0
+        self.write_seconds = 0.0
+
+    def add(self, surah_1, ayah_1, surah_2, ayah_2, similarity):
+        # Key arah (asal, tujuan) agar relasi yang sama tidak ditulis dua kali dalam satu run
+        self.buffer[(surah_1, ayah_1, surah_2, ayah_2)] = similarity
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def _row(self, key, similarity):
+        s1, a1, s2, a2 = key
+        return {
+            "surah_number_1": s1, "ayah_number_1": a1,
+            "surah_number_2": s2, "ayah_number_2": a2,
+            "similarity": similarity
+        }
+
+    def flush(self):
+        if not self.buffer:
+            return
+        batch = [self._row(key, similarity) for key, similarity in self.buffer.items()]
+        self.buffer = {}
+
+        start_time = time.time()
+        self.session.execute_write(lambda tx: tx.run(self.QUERY, {"batch": batch}).consume())
+        self.write_seconds += time.time() - start_time
+        self.written += len(batch)
+
+    def throughput(self):
+        return self.written / self.write_seconds if self.write_seconds > 0 else 0.0
+
+
+class HadithRelationWriter(RelationWriter):
+    """
+    Relasi RELATED_TO dua arah antara info chunk hadis (di-key pada Chunk.key, indeks
+    chunk_key) dan :Ayat, agar hit hadis juga bisa diekspansi ke ayat yang mirip.
+    """
+
+    QUERY = """
+    UNWIND $batch AS rel
+    MATCH (h:Chunk {key: rel.info_key})
+    MATCH (a:Ayat {surah_number: rel.surah_number, number: rel.ayah_number})
+    MERGE (h)-[r1:RELATED_TO]->(a)
+    SET r1.similarity = rel.similarity
+    MERGE (a)-[r2:RELATED_TO]->(h)
+    SET r2.similarity = rel.similarity
+    """
+
+    def add(self, info_key, surah_number, ayah_number, similarity):
+        self.buffer[(info_key, surah_number, ayah_number)] = similarity
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def _row(self, key, similarity):
+        info_key, surah_number, ayah_number = key
+        return {"info_key": info_key, "surah_number": surah_number, "ayah_number": ayah_number,
+                "similarity": similarity}
+
+
 class QuranRelator:
-    def __init__(self, driver, threshold=0.75, k=10):
+    def __init__(self, driver, threshold=0.75, k=10, database=NEO4J_DATABASE):
         self.driver = driver
+        self.database = database
         self.threshold = threshold
         self.k = k  # Jumlah tetangga terdekat yang akan dihubungkan
         self.ayat_embeddings = {}
         self.ayat_data = []  # Untuk menyimpan data dalam format yang mudah diolah
 
+    def ensure_ayat_key(self):
+        """
+        Pastikan setiap :Ayat punya key (surah_number, number) yang unik dan terindeks.
+        Graf lama belum menyimpan surah_number di node :Ayat, jadi nilainya diisi
+        dari relasi HAS_AYAT secara bertahap sebelum constraint dibuat.
+        """
+        try:
+            with self.driver.session(database=self.database) as session:
+                session.run("""
+                    MATCH (s:Surah)-[:HAS_AYAT]->(a:Ayat)
+                    WHERE a.surah_number IS NULL
+                    CALL {
+                        WITH s, a
+                        SET a.surah_number = s.number
+                    } IN TRANSACTIONS OF 10000 ROWS
+                """).consume()
+                session.run("""
+                    CREATE CONSTRAINT ayat_key IF NOT EXISTS
+                    FOR (a:Ayat) REQUIRE (a.surah_number, a.number) IS UNIQUE
+                """).consume()
+                session.run("CALL db.awaitIndexes(300)").consume()
+            print("✅ Key :Ayat (surah_number, number) siap digunakan")
+        except Exception as e:
+            print(f"❌ Error saat menyiapkan key ayat: {str(e)}")
+            raise
+
     def load_embeddings(self):
         """Ambil embedding semua ayat yang ada di database"""
         try:
-            with self.driver.session() as session:
+            with self.driver.session(database=self.database) as session:
+                # Ingestion tidak menyimpan embedding di :Ayat; fallback ke chunk terjemahan pertamanya
                 query = """
                     MATCH (s:Surah)-[:HAS_AYAT]->(a:Ayat)
-                    RETURN s.number AS surah_number, a.number AS ayah_number, a.embedding AS embedding
+                    WITH s, a, coalesce(a.embedding, head([
+                        (a)-[:HAS_CHUNK*1..]->(c:Chunk {source: 'translation'})
+                        WHERE coalesce(c.chunk_index, 0) = 0 | c.embedding
+                    ])) AS embedding
+                    WHERE embedding IS NOT NULL
+                    RETURN s.number AS surah_number, a.number AS ayah_number, embedding
                 """
                 result = session.run(query)
                 for record in result:
                     surah_num = record["surah_number"]
                     ayah_num = record["ayah_number"]
                     embedding = record["embedding"]
-                    
+
                     # Simpan embedding dalam dict untuk akses cepat
                     self.ayat_embeddings[(surah_num, ayah_num)] = embedding
-                    
+
                     # Simpan informasi dalam format array untuk komputasi batch
                     self.ayat_data.append({
                         'surah_number': surah_num,
                         'ayah_number': ayah_num,
                         'embedding': embedding
                     })
-            
+
             print("✅ Embedding berhasil dimuat!")
             print(f"Jumlah embedding yang dimuat: {len(self.ayat_embeddings)}")
         except Exception as e:
@@ -46,95 +159,161 @@ class QuranRelator:
             import traceback
             traceback.print_exc()
 
-    def batch_process_knn(self, batch_size=100):
+    def batch_process_knn(self, batch_size=100, write_batch_size=WRITE_BATCH_SIZE):
         """Proses KNN dalam batch untuk menghemat memori"""
+        # numpy/sklearn hanya dimuat saat KNN benar-benar dijalankan
+        import numpy as np
+        from sklearn.metrics.pairwise import cosine_similarity
+
         try:
             total_ayat = len(self.ayat_data)
-            total_relations = 0
             start_time = time.time()
-            
+
             # Siapkan array numpy untuk semua embedding
             all_embeddings = np.array([data['embedding'] for data in self.ayat_data])
-            
-            with self.driver.session() as session:
+
+            with self.driver.session(database=self.database) as session:
+                writer = RelationWriter(session, batch_size=write_batch_size)
+
                 # Proses dalam batch untuk menghemat memori
                 for i in tqdm(range(0, total_ayat, batch_size), desc="Memproses Batch KNN"):
                     end_idx = min(i + batch_size, total_ayat)
                     batch_embeddings = all_embeddings[i:end_idx]
-                    
+
                     # Hitung similarity matrix untuk batch saat ini dengan semua ayat
                     # Ini menghitung similarity dari setiap ayat di batch dengan semua ayat di dataset
                     similarity_matrix = cosine_similarity(batch_embeddings, all_embeddings)
-                    
+
                     # Untuk setiap ayat dalam batch
                     for batch_idx, sim_scores in enumerate(similarity_matrix):
                         global_idx = i + batch_idx
                         ayat1 = self.ayat_data[global_idx]
-                        
+
                         # Dapatkan K tetangga terdekat
                         # Urutkan berdasarkan similarity score
                         # -1 karena kita tidak ingin memasukkan ayat itu sendiri (similarity=1.0)
                         top_indices = np.argsort(sim_scores)[-self.k-1:-1][::-1]
-                        
-                        batch_relations = []
+
                         for neighbor_idx in top_indices:
                             # Skip jika itu adalah ayat yang sama
                             if neighbor_idx == global_idx:
                                 continue
-                                
+
                             ayat2 = self.ayat_data[neighbor_idx]
-                            similarity = sim_scores[neighbor_idx]
-                            
-                            # Hanya buat relasi jika di atas threshold
+                            similarity = float(sim_scores[neighbor_idx])
+
+                            # Hanya buat relasi jika di atas threshold (timbal balik)
                             if similarity >= self.threshold:
-                                batch_relations.append({
-                                    "surah_number_1": ayat1['surah_number'],
-                                    "ayah_number_1": ayat1['ayah_number'],
-                                    "surah_number_2": ayat2['surah_number'],
-                                    "ayah_number_2": ayat2['ayah_number'],
-                                    "similarity": float(similarity)
-                                })
-                        
-                        # Buat relasi dalam batch untuk kinerja yang lebih baik
-                        if batch_relations:
-                            query = """
-                            UNWIND $batch AS relation
-                            MATCH (a:Ayat), (b:Ayat)
-                            WHERE a.number = relation.ayah_number_1 AND EXISTS {
-                                MATCH (s:Surah)-[:HAS_AYAT]->(a) WHERE s.number = relation.surah_number_1
-                            }
-                            AND b.number = relation.ayah_number_2 AND EXISTS {
-                                MATCH (s:Surah)-[:HAS_AYAT]->(b) WHERE s.number = relation.surah_number_2
-                            }
-                            MERGE (a)-[:RELATED_TO {similarity: relation.similarity}]->(b)
-                            MERGE (b)-[:RELATED_TO {similarity: relation.similarity}]->(a)
-                            """
-                            session.run(query, {"batch": batch_relations})
-                            total_relations += len(batch_relations) * 2  # x2 karena relasi timbal balik
-                
+                                writer.add(ayat1['surah_number'], ayat1['ayah_number'],
+                                           ayat2['surah_number'], ayat2['ayah_number'], similarity)
+                                writer.add(ayat2['surah_number'], ayat2['ayah_number'],
+                                           ayat1['surah_number'], ayat1['ayah_number'], similarity)
+
+                writer.flush()
+
                 elapsed_time = time.time() - start_time
-                print(f"✅ Relasi KNN berhasil dibuat! Total relasi: {total_relations}")
-                print(f"Waktu yang dibutuhkan: {elapsed_time:.2f} detik")
-                
+                print(f"✅ Relasi KNN berhasil dibuat! Total relasi: {writer.written}")
+                print(f"Waktu yang dibutuhkan: {elapsed_time:.2f} detik "
+                      f"(tulis: {writer.write_seconds:.2f} detik, {writer.throughput():.0f} relasi/detik)")
+
         except Exception as e:
             print(f"❌ Error saat membuat relasi KNN: {str(e)}")
             import traceback
             traceback.print_exc()
 
+    def batch_process_hadith_knn(self, k=3, batch_size=500, write_batch_size=WRITE_BATCH_SIZE):
+        """
+        Relasi hadis<->ayat: setiap hadis dihubungkan ke maksimal `k` ayat termirip di atas
+        threshold. Hadis diwakili embedding chunk terjemahan pertamanya dan dibaca dari
+        Neo4j per batch, jadi seluruh koleksi tidak perlu dimuat ke memori sekaligus.
+        Memakai embedding ayat dari load_embeddings().
+        """
+        import numpy as np
+        from sklearn.metrics.pairwise import cosine_similarity
+
+        if not self.ayat_data:
+            print("⚠️ Embedding ayat belum dimuat, relasi hadis-ayat dilewati")
+            return
+        try:
+            start_time = time.time()
+            ayat_embeddings = np.array([data['embedding'] for data in self.ayat_data])
+            hadiths = 0
+
+            with self.driver.session(database=self.database) as read_session, \
+                    self.driver.session(database=self.database) as write_session:
+                writer = HadithRelationWriter(write_session, batch_size=write_batch_size)
+                # Key chunk terjemahan pertama = <unit>:translation:0, info chunk = <unit>:info:0
+                result = read_session.run("""
+                    MATCH (info:Chunk {source: 'info'})
+                    WHERE info.source_name IS NOT NULL AND info.key IS NOT NULL
+                    MATCH (t:Chunk {key: left(info.key, size(info.key) - size(':info:0')) + ':translation:0'})
+                    WHERE t.embedding IS NOT NULL
+                    RETURN info.key AS info_key, t.embedding AS embedding
+                """)
+
+                def process(batch):
+                    similarity_matrix = cosine_similarity(np.array([e for _, e in batch]), ayat_embeddings)
+                    for (info_key, _), sim_scores in zip(batch, similarity_matrix):
+                        for ayat_idx in np.argsort(sim_scores)[-k:][::-1]:
+                            similarity = float(sim_scores[ayat_idx])
+                            if similarity >= self.threshold:
+                                ayat = self.ayat_data[ayat_idx]
+                                writer.add(info_key, ayat['surah_number'], ayat['ayah_number'], similarity)
+
+                batch = []
+                for record in tqdm(result, desc="Memproses KNN Hadis-Ayat", unit="hadis"):
+                    batch.append((record["info_key"], record["embedding"]))
+                    if len(batch) >= batch_size:
+                        process(batch)
+                        hadiths += len(batch)
+                        batch = []
+                if batch:
+                    process(batch)
+                    hadiths += len(batch)
+                writer.flush()
+
+            print(f"✅ Relasi hadis-ayat berhasil dibuat untuk {hadiths} hadis! Total relasi: {writer.written * 2}")
+            print(f"Waktu yang dibutuhkan: {time.time() - start_time:.2f} detik")
+        except Exception as e:
+            print(f"❌ Error saat membuat relasi KNN hadis-ayat: {str(e)}")
+            import traceback
+            traceback.print_exc()
+
     def cleanup_old_relations(self):
         """Hapus relasi RELATED_TO yang lama sebelum membuat yang baru"""
         try:
-            with self.driver.session() as session:
+            with self.driver.session(database=self.database) as session:
                 print("Menghapus relasi lama...")
-                session.run("MATCH ()-[r:RELATED_TO]->() DELETE r")
+                session.run("""
+                    MATCH ()-[r:RELATED_TO]->()
+                    CALL {
+                        WITH r
+                        DELETE r
+                    } IN TRANSACTIONS OF 10000 ROWS
+                """).consume()
                 print("✅ Relasi lama berhasil dihapus")
         except Exception as e:
             print(f"❌ Error saat menghapus relasi lama: {str(e)}")
 
+def build_related(database=NEO4J_DATABASE, threshold=0.75, k=10, hadith_k=3, batch_size=100):
+    """Menghitung ulang seluruh relasi RELATED_TO (ayat<->ayat dan hadis<->ayat) di `database`."""
+    relator = QuranRelator(get_driver(), threshold=threshold, k=k, database=database)
+    relator.ensure_ayat_key()  # Pastikan key unik (surah_number, number) terindeks
+    relator.load_embeddings()  # Memuat embedding ayat
+    relator.cleanup_old_relations()  # Hapus relasi lama
+    relator.batch_process_knn(batch_size=batch_size)  # Buat relasi baru dengan metode batch
+    if hadith_k > 0:
+        relator.batch_process_hadith_knn(k=hadith_k)  # Relasi hadis<->ayat
+
 # Main function to run the class methods
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bangun relasi RELATED_TO antar ayat (KNN)")
+    parser.add_argument("--database", default=NEO4J_DATABASE,
+                        help="Database tujuan, misal corpus-<versi> sebelum dialihkan (default: NEO4J_DATABASE)")
     # Gunakan threshold yang lebih tinggi (0.75) dan batasi maksimal 10 tetangga terdekat
-    relator = QuranRelator(driver, threshold=0.75, k=10)
-    relator.load_embeddings()  # Memuat embedding ayat
-    relator.cleanup_old_relations()  # Hapus relasi lama
-    relator.batch_process_knn(batch_size=100)  # Buat relasi baru dengan metode batch
\ No newline at end of file
+    parser.add_argument("--threshold", type=float, default=0.75, help="Similarity minimal")
+    parser.add_argument("--k", type=int, default=10, help="Maksimal tetangga terdekat per ayat")
+    parser.add_argument("--hadith-k", type=int, default=3,
+                        help="Maksimal ayat terdekat per hadis (0 = tanpa relasi hadis-ayat)")
+    args = parser.parse_args()
+    build_related(args.database, args.threshold, args.k, args.hadith_k)
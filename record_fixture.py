@@ -0,0 +1,68 @@
+# record_fixture.py
+"""
+Merekam fixture offline untuk evaluasi: embedding query serta respons vector search
+dan traversal untuk semua query di ground_truth.json dan ground_truth_graph.json,
+ditambah traversal chunk ID contoh yang dipakai script evaluasi traversal
+(evaluate_graph_enhanced.py, traversal_completeness_checker.py,
+enhanced_evaluate_traversal.py, quick_traversal_fix.py).
+
+Jalankan sekali dengan Neo4j dan Ollama hidup:
+    python record_fixture.py --fixture fixtures/retrieval_fixture.json.gz
+
+Setelah itu evaluasi bisa dijalankan tanpa layanan apapun:
+    GRAPHRAG_FIXTURE_MODE=replay GRAPHRAG_FIXTURE=fixtures/retrieval_fixture.json.gz python evaluate_retrieval.py
+    GRAPHRAG_FIXTURE_MODE=replay GRAPHRAG_FIXTURE=fixtures/retrieval_fixture.json.gz python evaluate_graph.py
+    GRAPHRAG_FIXTURE_MODE=replay GRAPHRAG_FIXTURE=fixtures/retrieval_fixture.json.gz python traversal_completeness_checker.py
+
+Chunk ID contoh di script traversal adalah elementId dari graf saat perekaman; jika
+daftarnya diubah, fixture harus direkam ulang.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+parser = argparse.ArgumentParser(description="Rekam fixture embedding + graf untuk evaluasi offline")
+parser.add_argument("--fixture", default="fixtures/retrieval_fixture.json.gz", help="Lokasi file fixture")
+parser.add_argument("--workers", type=int, default=8, help="Jumlah query yang direkam bersamaan")
+args = parser.parse_args()
+
+# Konfirmasi penyimpanan fixture dari replay.py dicatat lewat logging
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+# Mode harus di-set sebelum config/groq_embedder diimpor
+os.environ["GRAPHRAG_FIXTURE_MODE"] = "record"
+os.environ["GRAPHRAG_FIXTURE"] = args.fixture
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'Backend')))
+
+from evaluation_engine import run_parallel
+from evaluate_retrieval import retrieve_for_item
+from evaluate_graph import run_full_retrieval
+from evaluate_graph_enhanced import GROUND_TRUTH, EnhancedGraphEvaluator
+from traversal_completeness_checker import TEST_SOURCES, TraversalCompletenessChecker
+from enhanced_evaluate_traversal import run_enhanced_evaluation
+from quick_traversal_fix import integrate_with_existing_evaluation
+
+if __name__ == "__main__":
+    with open('ground_truth.json', 'r', encoding='utf-8') as f:
+        ground_truth = json.load(f)
+    with open('ground_truth_graph.json', 'r', encoding='utf-8') as f:
+        ground_truth_graph = json.load(f)
+
+    print(f"🎙️  Merekam {len(ground_truth)} query dari ground_truth.json")
+    run_parallel(ground_truth, retrieve_for_item, workers=args.workers)
+
+    queries = [item["query"] for item in ground_truth_graph if "query" in item]
+    print(f"🎙️  Merekam {len(queries)} query dari ground_truth_graph.json")
+    run_parallel(queries, run_full_retrieval, workers=args.workers)
+
+    # Script traversal memakai chunk ID tetap (bukan hasil vector search), jadi
+    # find_info_chunk_id/get_full_context_from_info-nya direkam dengan menjalankan script itu
+    print("🎙️  Merekam traversal chunk ID contoh dari script evaluasi traversal")
+    TraversalCompletenessChecker().test_multiple_sources(TEST_SOURCES)
+    EnhancedGraphEvaluator().run_comprehensive_evaluation(GROUND_TRUTH)
+    run_enhanced_evaluation()
+    integrate_with_existing_evaluation()
+    # Fixture ditulis otomatis saat proses selesai (atexit di replay.py)
@@ -265,26 +265,26 @@ class TraversalCompletenessChecker:
         
         return issues
 
+# Example sources dari log Anda (juga direkam oleh record_fixture.py untuk mode replay)
+TEST_SOURCES = [
+    ("4:61faf3a3-1e44-4b2f-a051-c46cc91c49bc:61229", 
+     "Hadis Jami` at-Tirmidzi No. 1376 | Kitab: Hukum Hudud, Bab: Hukuman liwath (homoseksual)", 
+     0.7783),
+    ("4:61faf3a3-1e44-4b2f-a051-c46cc91c49bc:13989", 
+     "Surah: An-Nur | Ayat: 2", 
+     0.7771),
+    ("4:61faf3a3-1e44-4b2f-a051-c46cc91c49bc:4942", 
+     "Surah: Al-A'raf | Ayat: 33", 
+     0.7744)
+]
+
 # Usage example and test function
 def main():
     """Main function untuk testing"""
     checker = TraversalCompletenessChecker()
     
-    # Example sources dari log Anda
-    test_sources = [
-        ("4:61faf3a3-1e44-4b2f-a051-c46cc91c49bc:61229", 
-         "Hadis Jami` at-Tirmidzi No. 1376 | Kitab: Hukum Hudud, Bab: Hukuman liwath (homoseksual)", 
-         0.7783),
-        ("4:61faf3a3-1e44-4b2f-a051-c46cc91c49bc:13989", 
-         "Surah: An-Nur | Ayat: 2", 
-         0.7771),
-        ("4:61faf3a3-1e44-4b2f-a051-c46cc91c49bc:4942", 
-         "Surah: Al-A'raf | Ayat: 33", 
-         0.7744)
-    ]
-    
     # Run traversal test
-    results = checker.test_multiple_sources(test_sources)
+    results = checker.test_multiple_sources(TEST_SOURCES)
     
     # Analyze issues
     issues = checker.analyze_common_issues(results)